@@ -0,0 +1,139 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Measures the effect of the caption compaction on the keyword descriptions of the data source:
+the number of captions, words and model tokens per row, the rows that reach the 512 token cap of the embedded model,
+and the time to embed a sample of rows before and after the compaction.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries, and of the torch and transformers libraries for the token and latency columns.
+
+Usage:
+To execute this module from the root directory, run one of the following commands:
+    ``python benchmarks/caption_compaction.py --model none``                 (captions and words only)
+    ``python benchmarks/caption_compaction.py --model env --sample 1000``    (the model of the "EMBEDDED_MODEL" environment variable)
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dense_captioning_model.caption_compaction import compact_captions, DEFAULT_STOP_PHRASES
+from synthetic_catalog import generate_catalog
+
+
+MAX_TOKENS = 512
+
+
+def count_tokens(
+    texts: list,
+    tokenizer,
+    batch_size: int = 256
+) -> np.ndarray:
+    """
+    Returns the number of model tokens of each text, without truncation.
+    """
+    counts = []
+    for start in range(0, len(texts), batch_size):
+        batch = tokenizer(texts[start:start + batch_size], max_length=10 ** 6, padding=True, truncation=False, return_tensors="pt")
+        counts.append(batch["attention_mask"].sum(dim=1).numpy())
+    return np.concatenate(counts)
+
+
+def main(
+) -> None:
+    """
+    Runs the caption compaction benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The rows are the keyword descriptions of the data source joined with ", ", as embedded by the vector index in "sentence" mode.
+    2. "capped" is the number of rows with more than 512 tokens, whose end is truncated by the embedded model.
+    3. The embedding time is the median of the runs over the same random sample of rows, in batches of EMBEDDING_BATCH_SIZE.
+
+    Example:
+    --------
+    >>> python benchmarks/caption_compaction.py --model offline --rows 100000
+    ... # Prints the captions, words, tokens and embedding time of the rows before and after the compaction.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Measures the token and embedding latency reduction of the caption compaction.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file.")
+    parser.add_argument("--rows", type=int, default=0, help="Use a synthetic catalog of this many rows generated from the data source.")
+    parser.add_argument("--max-phrases", type=int, default=6, help="The number of captions kept per row, 0 for no cap.")
+    parser.add_argument("--stop-phrases", default="|".join(DEFAULT_STOP_PHRASES), help="The '|' separated prefixes to strip.")
+    parser.add_argument("--model", choices=("none", "offline", "env"), default="none", help="The model used for the token and latency columns.")
+    parser.add_argument("--sample", type=int, default=500, help="The number of rows embedded for the latency columns.")
+    parser.add_argument("--runs", type=int, default=3, help="The number of embedding runs.")
+    args = parser.parse_args()
+
+    data = args.data
+    if args.rows:
+        data = os.path.join(tempfile.mkdtemp(prefix="caption_compaction-"), f"catalog_{args.rows}.csv")
+        generate_catalog(data, args.rows, args.data)
+    rows = pd.read_csv(data, usecols=["keywordDescriptions"])["keywordDescriptions"].fillna("").str.split(", ").tolist()
+    stop_phrases = tuple(phrase.strip().lower() for phrase in args.stop_phrases.split("|") if phrase.strip())
+    start = time.perf_counter()
+    compacted = [compact_captions(captions, stop_phrases, args.max_phrases) for captions in rows]
+    compaction_seconds = time.perf_counter() - start
+    texts = {"before": [", ".join(captions) for captions in rows], "after": [", ".join(captions) for captions in compacted]}
+    lists = {"before": rows, "after": compacted}
+
+    tokenizer = model = None
+    if args.model == "offline":
+        from offline_stubs import load_tiny_model
+        tokenizer, model = load_tiny_model()
+    elif args.model == "env":
+        from embedded_model.semantic_textual_analysis import load_embedded_model
+        tokenizer, model = load_embedded_model()
+    sample = np.random.default_rng(0).choice(len(rows), min(args.sample, len(rows)), replace=False)
+
+    print(f"{len(rows)} rows, compacted in {compaction_seconds:.2f}s")
+    print(f"{'':<8}{'captions':>10}{'words':>11}{'tokens':>11}{'tokens/row':>12}{'p95':>7}{'capped':>8}{'embed (s)':>11}")
+    results = {}
+    for name in ("before", "after"):
+        captions = sum(map(len, lists[name]))
+        words = sum(len(text.split()) for text in texts[name])
+        tokens, mean, p95, capped, seconds = (float("nan"),) * 5
+        if model is not None:
+            from embedded_model.semantic_textual_analysis import embed_texts
+            counts = count_tokens(texts[name], tokenizer)
+            tokens, mean, p95, capped = counts.sum(), counts.mean(), np.percentile(counts, 95), int((counts > MAX_TOKENS).sum())
+            batch = [texts[name][row] for row in sample]
+            embed_texts(batch[:8], model, tokenizer)
+            durations = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                embed_texts(batch, model, tokenizer)
+                durations.append(time.perf_counter() - start)
+            seconds = float(np.median(durations))
+        results[name] = (captions, words, tokens, seconds)
+        print(f"{name:<8}{captions:>10}{words:>11}{tokens:>11.0f}{mean:>12.1f}{p95:>7.0f}{capped:>8}{seconds:>11.3f}")
+    reductions = [1 - after / before if before else float("nan") for before, after in zip(results["before"], results["after"])]
+    print(f"{'change':<8}" + "".join(f"{-reduction:>{width}.1%}" for reduction, width in zip(reductions[:3], (10, 11, 11)))
+          + f"{'':>27}{-reductions[3]:>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the load time of the data source in the CSV format against the memory-mapped Arrow IPC format.
+The shipped data source and synthetic catalogs of the given sizes are converted to Arrow and loaded the way the Database class loads them.
+
+Requirements:
+This module requires the installation of the numpy, pandas and pyarrow libraries.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/catalog_load.py --rows 100000 1000000 --runs 3``
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_source.catalog_format import convert_csv, read_catalog, read_table
+from synthetic_catalog import generate_catalog
+
+
+def load_csv(
+    path: str
+) -> pd.DataFrame:
+    """
+    Loads a CSV data source like the Database class.
+    """
+    df = pd.read_csv(path, dtype={"id": str})
+    df["keywordDescriptions"] = df["keywordDescriptions"].apply(lambda x: x.split(", ") if pd.notna(x) else [""])
+    return df
+
+
+def main(
+) -> None:
+    """
+    Runs the catalog load benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. "csv" parses the file and splits every keyword description in Python, as the Database class does for CSV data sources.
+    2. "arrow" maps the file and builds the same DataFrame, as the Database class does for Arrow data sources.
+    3. "arrow ids+kw" only loads the id and keywordDescriptions columns (what the vector index build reads),
+       and "arrow mmap" only opens the memory-mapped table without converting it.
+    4. Each time is the median of the runs. The files are read once beforehand, so they are in the page cache.
+
+    Example:
+    --------
+    >>> python benchmarks/catalog_load.py --rows 1000000
+    ... # Prints the file sizes and load times of each format.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the load time of the CSV and Arrow data source formats.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file.")
+    parser.add_argument("--rows", type=int, nargs="*", default=[100000], help="The sizes of the synthetic catalogs.")
+    parser.add_argument("--runs", type=int, default=3, help="The number of loads per format.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="catalog_load-")
+    catalogs = [args.data]
+    for rows in args.rows:
+        catalogs.append(os.path.join(directory, f"catalog_{rows}.csv"))
+        generate_catalog(catalogs[-1], rows, args.data)
+
+    loaders = {
+        "csv": lambda csv_path, arrow_path: load_csv(csv_path),
+        "arrow": lambda csv_path, arrow_path: read_catalog(arrow_path),
+        "arrow ids+kw": lambda csv_path, arrow_path: read_catalog(arrow_path, ["id", "keywordDescriptions"]),
+        "arrow mmap": lambda csv_path, arrow_path: read_table(arrow_path),
+    }
+    print(f"{'rows':>9}{'csv (MiB)':>11}{'arrow (MiB)':>13}{'convert (s)':>13}" + "".join(f"{name + ' (s)':>17}" for name in loaders))
+    for csv_path in catalogs:
+        arrow_path = os.path.join(directory, os.path.splitext(os.path.basename(csv_path))[0] + ".arrow")
+        start = time.perf_counter()
+        rows = convert_csv(csv_path, arrow_path)
+        convert_seconds = time.perf_counter() - start
+        timings = {}
+        for name, loader in loaders.items():
+            loader(csv_path, arrow_path)
+            durations = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                loader(csv_path, arrow_path)
+                durations.append(time.perf_counter() - start)
+            timings[name] = np.median(durations)
+        assert load_csv(csv_path)["keywordDescriptions"].tolist() == read_catalog(arrow_path)["keywordDescriptions"].tolist()
+        print(f"{rows:>9}{os.path.getsize(csv_path) / 2 ** 20:>11.1f}{os.path.getsize(arrow_path) / 2 ** 20:>13.1f}{convert_seconds:>13.2f}"
+              + "".join(f"{timings[name]:>17.3f}" for name in loaders))
+
+
+if __name__ == "__main__":
+    main()
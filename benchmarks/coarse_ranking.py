@@ -0,0 +1,96 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the latency and recall@k of the two-stage coarse-then-fine ranking of the VectorStore.
+The benchmark runs fully offline on synthetic, clustered unit vectors, so no model or data source is required.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/coarse_ranking.py --rows 100000 --dimensions 64 128 256 --candidates 100 300 1000``
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from embedded_model.vector_store import VectorStore, top_k
+from vector_encoding import synthetic_vectors, recall_at_k
+
+
+def main(
+) -> None:
+    """
+    Runs the coarse ranking benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The exact float32 ranking is used as the ground truth for recall@k.
+    2. The first row of the table is the single stage full dimension scan, for comparison.
+    3. Latency is the median over all queries, excluding the first (warm-up) query.
+
+    Example:
+    --------
+    >>> python benchmarks/coarse_ranking.py --rows 100000
+    ... # Prints latency and recall@k per coarse dimension and candidate count.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the latency and recall of the coarse-then-fine ranking.")
+    parser.add_argument("--rows", type=int, default=100000, help="The number of catalog vectors.")
+    parser.add_argument("--full-dimensions", type=int, default=768, help="The dimension of the vectors.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[64, 128, 256], help="The coarse dimensions to test.")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[100, 300, 1000], help="The coarse candidate counts to test.")
+    parser.add_argument("--encoding", default="float32", help="The encoding of the vectors rescored by the second stage.")
+    parser.add_argument("--queries", type=int, default=50, help="The number of queries to run.")
+    parser.add_argument("--k", type=int, default=10, help="The number of results per query.")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.full_dimensions)
+    queries = synthetic_vectors(args.queries + 1, args.full_dimensions, seed=1)
+    ids = [str(i) for i in range(args.rows)]
+    truth = [[ids[i] for i in top_k(vectors @ query, args.k)] for query in queries]
+
+    print(f"{'dimensions':<12}{'candidates':>11}{'memory (MB)':>14}{'p50 (ms)':>11}{f'recall@{args.k}':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        VectorStore.create(directory, ids, vectors, {"model": "synthetic"})
+        configurations = [(0, 0)] + [(d, c) for d in args.dimensions for c in args.candidates]
+        for dimensions, candidates in configurations:
+            if dimensions and os.path.exists(os.path.join(directory, "pca.npz")):
+                os.remove(os.path.join(directory, "pca.npz"))
+            store = VectorStore(directory, args.encoding, coarse_dimensions=dimensions, coarse_candidates=candidates)
+            latencies, recalls = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                result_ids, _ = store.search(query, args.k)
+                latencies.append(time.perf_counter() - start)
+                recalls.append(recall_at_k(expected, result_ids))
+            print(
+                f"{dimensions or args.full_dimensions:<12}{candidates or args.rows:>11}{store.memory_usage() / 2 ** 20:>14.1f}"
+                f"{np.median(latencies[1:]) * 1000:>11.2f}{np.mean(recalls):>12.3f}"
+            )
+            del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the latency (p50/p95/p99) and throughput of the API endpoints end to end, over HTTP, fully offline.
+For each catalog size, the server is started in a subprocess with the tiny embedding model of offline_stubs.py in place of the embedded model,
+and with a stub Azure Vision server of configurable latency in place of the dense captioning service.
+/search, /keyword_search, /items/<id> and the write endpoints are then loaded at each concurrency level, and the results are written as JSON.
+
+Requirements:
+This module requires the installation of the server requirements (see server/requirements.txt) and the numpy library.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/end_to_end.py --rows 2744 27440 --concurrency 1 4 16 --requests 200``
+Compare two runs with:
+    ``python benchmarks/end_to_end.py --compare benchmarks/results/old.json benchmarks/results/new.json``
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lexical_search import load_catalog
+
+
+READ_ENDPOINTS = ("search", "keyword_search", "items")
+
+
+def build_catalog(
+    source: str,
+    rows: int,
+    path: str
+) -> list:
+    """
+    Writes a catalog of `rows` rows, tiled from a data source CSV file with fresh ids.
+
+    Args:
+    -----
+    source : ``str``
+        The data source CSV file.
+    rows : ``int``
+        The number of rows of the catalog.
+    path : ``str``
+        The CSV file the catalog is written to.
+
+    Returns:
+    --------
+    ``list``
+        The distinct keyword phrases of the catalog, used to build the keyword searches.
+
+    Author: ``@ChinaiArman``
+    """
+    repeat = math.ceil(rows / len(load_catalog(source, 1)))
+    df = load_catalog(source, repeat).head(rows)
+    phrases = sorted({phrase for keywords in df["keywordDescriptions"] for phrase in keywords if phrase})
+    df.assign(keywordDescriptions=df["keywordDescriptions"].str.join(", ")).to_csv(path, index=False)
+    return phrases
+
+
+def serve(
+    port: int
+) -> None:
+    """
+    Runs the API server on a local port with the tiny embedding model.
+
+    Args:
+    -----
+    port : ``int``
+        The port of the server.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The data source, index directory and Azure endpoint are read from the environment set by `start_server`.
+    2. The embedded model loader is replaced before the app is imported, so the GarmentRecognizer loads the tiny model.
+
+    Author: ``@ChinaiArman``
+    """
+    import embedded_model.semantic_textual_analysis as sta
+    from offline_stubs import load_tiny_model
+    sta.load_embedded_model = load_tiny_model
+    from app import app
+    app.run(host="127.0.0.1", port=port, threaded=True, use_reloader=False)
+
+
+def free_port(
+) -> int:
+    """
+    Returns a free local TCP port.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(
+    data: str,
+    vision_url: str,
+    cache: bool,
+    timeout: float = 600
+) -> tuple:
+    """
+    Starts the API server in a subprocess and waits until it answers.
+
+    Args:
+    -----
+    data : ``str``
+        The data source CSV file of the server.
+    vision_url : ``str``
+        The url of the stub Azure Vision server.
+    cache : ``bool``
+        Whether the search result cache is enabled.
+    timeout : ``float``
+        The maximum time to wait for the server to load, in seconds.
+
+    Returns:
+    --------
+    ``tuple``
+        The subprocess, the base url of the server and its load time in seconds.
+
+    Raises:
+    -------
+    ``RuntimeError``
+        If the server exits or does not answer before the timeout. The output of the server is kept in a .log file next to the data source.
+
+    Author: ``@ChinaiArman``
+    """
+    port = free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.getenv("PYTHONPATH", "server"),
+        "DATA_SOURCE_FILE": data,
+        "VECTOR_INDEX_DIR": os.path.splitext(data)[0] + "_index",
+        "EMBEDDED_MODEL": "offline-tiny",
+        "AZURE_VISION_ENDPOINT": vision_url,
+        "AZURE_VISION_KEY_1": "offline",
+        "RESULT_CACHE_ENTRIES": os.getenv("RESULT_CACHE_ENTRIES", "1024") if cache else "0",
+    }
+    log = os.path.splitext(data)[0] + ".log"
+    start = time.perf_counter()
+    with open(log, "w") as file:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port)], env=env, stdout=file, stderr=file)
+    url = f"http://127.0.0.1:{port}"
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}, see {log}.")
+        try:
+            urllib.request.urlopen(f"{url}/metrics", timeout=1)
+            return process, url, time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("The server did not start in time.")
+
+
+def call(
+    method: str,
+    url: str,
+    body: dict = None
+) -> tuple:
+    """
+    Sends a request and returns its status code, latency in seconds and JSON body.
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        payload, status = error.read(), error.code
+    latency = time.perf_counter() - start
+    try:
+        payload = json.loads(payload) if payload else None
+    except ValueError:
+        payload = None
+    return status, latency, payload
+
+
+def run_load(
+    operation: callable,
+    requests: int,
+    concurrency: int
+) -> dict:
+    """
+    Runs `requests` operations from `concurrency` closed-loop client threads.
+
+    Args:
+    -----
+    operation : ``callable``
+        A function of the request index returning a list of (endpoint, status, latency in seconds) tuples.
+    requests : ``int``
+        The total number of operations.
+    concurrency : ``int``
+        The number of client threads.
+
+    Returns:
+    --------
+    ``dict``
+        A dictionary mapping each endpoint to its latencies, error count and the wall time of the run.
+
+    Author: ``@ChinaiArman``
+    """
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    results = {}
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            for endpoint, status, latency in operation(index):
+                with lock:
+                    result = results.setdefault(endpoint, {"latencies": [], "errors": 0})
+                    result["latencies"].append(latency)
+                    result["errors"] += status >= 400
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    for result in results.values():
+        result["wall"] = wall
+    return results
+
+
+def summarize(
+    endpoint: str,
+    rows: int,
+    concurrency: int,
+    result: dict
+) -> dict:
+    """
+    Returns the percentiles and throughput of the latencies of an endpoint.
+    """
+    latencies = np.array(result["latencies"]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "endpoint": endpoint,
+        "rows": rows,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": result["errors"],
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "throughput_rps": round(len(latencies) / result["wall"], 2),
+    }
+
+
+def compare(
+    baseline: str,
+    current: str
+) -> None:
+    """
+    Prints the p95 latency and throughput of two result files side by side.
+    """
+    with open(baseline) as file:
+        old = {(r["endpoint"], r["rows"], r["concurrency"]): r for r in json.load(file)["results"]}
+    with open(current) as file:
+        new = json.load(file)["results"]
+    print(f"{'endpoint':<16}{'rows':>9}{'conc':>6}{'p95 old':>10}{'p95 new':>10}{'rps old':>10}{'rps new':>10}")
+    for result in new:
+        previous = old.get((result["endpoint"], result["rows"], result["concurrency"]))
+        if previous is not None:
+            print(f"{result['endpoint']:<16}{result['rows']:>9}{result['concurrency']:>6}{previous['p95_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                  f"{previous['throughput_rps']:>10.1f}{result['throughput_rps']:>10.1f}")
+
+
+def main(
+) -> None:
+    """
+    Runs the end-to-end benchmark and writes the results as JSON.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The search result cache is disabled unless --cache is given, so every search reaches the models and the index.
+    2. Each write operation inserts an item (captioned by the stub server), edits it, then deletes it, so the catalog size is unchanged.
+    3. The clients are closed loop: each thread sends its next request when the previous one returns.
+
+    Example:
+    --------
+    >>> python benchmarks/end_to_end.py --rows 2744 --concurrency 1 8
+    ... # Prints the p50/p95/p99 latency and throughput of each endpoint and writes them to benchmarks/results/.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the API endpoints end to end with offline stubs.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file the catalogs are tiled from.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[2744], help="The catalog sizes.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="The numbers of concurrent clients.")
+    parser.add_argument("--requests", type=int, default=200, help="The number of requests per read endpoint and concurrency.")
+    parser.add_argument("--write-requests", type=int, default=20, help="The number of insert/edit/delete operations per concurrency.")
+    parser.add_argument("--size", type=int, default=10, help="The number of items per search.")
+    parser.add_argument("--vision-latency-ms", type=float, default=50, help="The latency of the stub Azure Vision server.")
+    parser.add_argument("--vision-jitter-ms", type=float, default=0, help="The standard deviation of the stub latency.")
+    parser.add_argument("--cache", action="store_true", help="Enable the search result cache.")
+    parser.add_argument("--output", default=None, help="The JSON results file. Default is benchmarks/results/end_to_end-<time>.json.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files and exit.")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    from offline_stubs import StubVisionServer
+    vision = StubVisionServer(args.vision_latency_ms, args.vision_jitter_ms).start()
+    directory = tempfile.mkdtemp(prefix="end_to_end-")
+    results, load_times = [], {}
+    rng = random.Random(0)
+    print(f"{'endpoint':<16}{'rows':>9}{'conc':>6}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'rps':>9}{'errors':>8}")
+    for rows in args.rows:
+        data = os.path.join(directory, f"catalog_{rows}.csv")
+        phrases = build_catalog(args.data, rows, data)
+        process, url, load_times[rows] = start_server(data, vision.url, args.cache)
+        ids = [str(id) for id in range(rows)]
+        operations = {
+            "search": lambda i: [("search", *call("POST", f"{url}/search", {"url": vision.image_url(rng.randrange(10 ** 6)), "size": args.size})[:2])],
+            "keyword_search": lambda i: [("keyword_search", *call("POST", f"{url}/keyword_search", {"keywords": rng.sample(phrases, 3), "size": args.size})[:2])],
+            "items": lambda i: [("items", *call("GET", f"{url}/items/{rng.choice(ids)}")[:2])],
+        }
+
+        def write(i):
+            item = {"name": f"benchmark item {i}", "description": "Black", "imageUrl": vision.image_url(i)}
+            status, latency, row = call("POST", f"{url}/add_item", item)
+            timings = [("add_item", status, latency)]
+            if status < 400 and row:
+                timings.append(("edit_item", *call("PUT", f"{url}/edit_item", {**item, "id": row["id"], "description": "White"})[:2]))
+                timings.append(("delete_item", *call("DELETE", f"{url}/items/{row['id']}")[:2]))
+            return timings
+
+        try:
+            for concurrency in args.concurrency:
+                runs = [(name, run_load(operations[name], args.requests, concurrency)) for name in READ_ENDPOINTS]
+                runs.append(("write", run_load(write, args.write_requests, concurrency)))
+                for _, run in runs:
+                    for endpoint, result in run.items():
+                        summary = summarize(endpoint, rows, concurrency, result)
+                        results.append(summary)
+                        print(f"{endpoint:<16}{rows:>9}{concurrency:>6}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}"
+                              f"{summary['p99_ms']:>10.1f}{summary['throughput_rps']:>9.1f}{summary['errors']:>8}")
+        finally:
+            process.terminate()
+            process.wait()
+    vision.stop()
+
+    output = args.output or os.path.join("benchmarks", "results", f"end_to_end-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump({
+            "config": {key: value for key, value in vars(args).items() if key not in ("serve", "compare", "output")},
+            "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "load_seconds": load_times,
+            "results": results,
+        }, file, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the memory used by the keyword descriptions of the data source as a column of Python lists of strings,
+against the interned KeywordStore (a shared phrase vocabulary and CSR arrays of phrase ids).
+The shipped data source and synthetic catalogs of the given sizes are measured, along with the time to load and join the keyword descriptions.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/keyword_memory.py --rows 1000000``
+"""
+
+import argparse
+import tempfile
+import time
+import pandas as pd
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_source.keyword_store import KeywordStore
+from synthetic_catalog import generate_catalog
+
+
+def list_column_bytes(
+    values: list
+) -> int:
+    """
+    Returns the bytes used by a column of lists of strings: the column's pointers, the lists and every distinct string object.
+    """
+    seen = set()
+    total = 8 * len(values)
+    for phrases in values:
+        total += sys.getsizeof(phrases)
+        for phrase in phrases:
+            if id(phrase) not in seen:
+                seen.add(id(phrase))
+                total += sys.getsizeof(phrase)
+    return total
+
+
+def timed(
+    function
+) -> tuple:
+    """
+    Returns the result of a function and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(
+) -> None:
+    """
+    Runs the keyword memory benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. "lists" is the column built by splitting every keyword description, as the Database class did before the KeywordStore.
+       Split strings are separate objects even when equal, so every occurrence of a phrase is counted.
+    2. "store" counts the offset and id arrays, the vocabulary strings and the phrase lookup dictionary.
+    3. The join columns time building the ", " joined text of every row, as written to the CSV file and embedded.
+
+    Example:
+    --------
+    >>> python benchmarks/keyword_memory.py --rows 1000000
+    ... # Prints the phrase counts, memory and timings of both representations for each catalog.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the memory of the keyword descriptions as lists and as a KeywordStore.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file.")
+    parser.add_argument("--rows", type=int, nargs="*", default=[1000000], help="The sizes of the synthetic catalogs.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="keyword_memory-")
+    catalogs = [args.data]
+    for rows in args.rows:
+        catalogs.append(os.path.join(directory, f"catalog_{rows}.csv"))
+        generate_catalog(catalogs[-1], rows, args.data)
+
+    print(f"{'rows':>9}{'phrases':>11}{'distinct':>10}{'lists (MiB)':>13}{'store (MiB)':>13}{'ratio':>8}"
+          f"{'split (s)':>11}{'intern (s)':>12}{'join lists (s)':>16}{'join store (s)':>16}")
+    for path in catalogs:
+        column = pd.read_csv(path, usecols=["keywordDescriptions"])["keywordDescriptions"]
+        lists, split_seconds = timed(lambda: column.apply(lambda x: x.split(", ") if pd.notna(x) else [""]).tolist())
+        store, intern_seconds = timed(lambda: KeywordStore.from_strings(column))
+        _, join_lists_seconds = timed(lambda: [", ".join(phrases) for phrases in lists])
+        _, join_store_seconds = timed(store.joined)
+        assert store.lists() == lists
+        list_bytes = list_column_bytes(lists)
+        store_bytes = store.memory_usage()
+        print(f"{len(store):>9}{len(store.ids):>11}{len(store.phrases):>10}{list_bytes / 2 ** 20:>13.1f}{store_bytes / 2 ** 20:>13.1f}"
+              f"{list_bytes / store_bytes:>7.1f}x{split_seconds:>11.2f}{intern_seconds:>12.2f}{join_lists_seconds:>16.2f}{join_store_seconds:>16.2f}")
+        del lists, store
+
+
+if __name__ == "__main__":
+    main()
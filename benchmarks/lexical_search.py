@@ -0,0 +1,177 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the speed/quality trade-off of the semantic, lexical and hybrid keyword search modes.
+The benchmark runs fully offline on the shipped data source, using hashed character trigram vectors in place of the embedded model.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/lexical_search.py --data server/data_source/data.csv --repeat 10 --queries 200``
+"""
+
+import argparse
+import tempfile
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from embedded_model.vector_store import VectorStore
+from data_source.lexical_index import LexicalIndex, tokenize
+from vector_encoding import recall_at_k
+
+
+def hashed_embedding(
+    texts: list,
+    dimensions: int = 256
+) -> np.ndarray:
+    """
+    Embeds texts as normalized hashed character trigram counts, a deterministic stand-in for the embedded model.
+
+    Args:
+    -----
+    texts : ``list``
+        The texts to embed.
+
+    Keyword Args:
+    -------------
+    dimensions : ``int``
+        The dimension of the vectors. Default is 256.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        A float32 matrix of shape (len(texts), dimensions) with unit L2 norm rows.
+
+    Example:
+    --------
+    >>> vectors = hashed_embedding(["a black shirt", "a pair of jeans"])
+
+    Author: ``@ChinaiArman``
+    """
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        text = f"  {text.lower()} "
+        for start in range(len(text) - 2):
+            vectors[row, zlib.crc32(text[start:start + 3].encode()) % dimensions] += 1
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def load_catalog(
+    path: str,
+    repeat: int
+) -> pd.DataFrame:
+    """
+    Loads a data source CSV file, tiled `repeat` times with fresh ids.
+    """
+    df = pd.read_csv(path, dtype={"id": str})
+    df["keywordDescriptions"] = df["keywordDescriptions"].apply(
+        lambda x: x.split(", ") if pd.notna(x) else [""]
+    )
+    df = pd.concat([df] * repeat, ignore_index=True)
+    df["id"] = df.index.astype(str)
+    return df
+
+
+def main(
+) -> None:
+    """
+    Runs the keyword search mode benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Queries are built from two or three tokens of the name and captions of random catalog rows.
+    2. Quality is reported as the overlap@k of each mode with the semantic ranking, and as the hit rate of the source row (or one of its tiled copies).
+    3. Latency covers ranking only. In the server, the lexical mode additionally skips the model forward pass of the query.
+
+    Example:
+    --------
+    >>> python benchmarks/lexical_search.py --repeat 10
+    ... # Prints latency and quality per search mode.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the semantic, lexical and hybrid keyword search modes.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file.")
+    parser.add_argument("--repeat", type=int, default=10, help="The number of times the catalog is tiled.")
+    parser.add_argument("--queries", type=int, default=200, help="The number of queries to run.")
+    parser.add_argument("--k", type=int, default=10, help="The number of results per query.")
+    parser.add_argument("--candidates", type=int, default=1000, help="The number of lexical candidates of the hybrid mode.")
+    parser.add_argument("--weight", type=float, default=0.3, help="The lexical weight of the hybrid mode.")
+    args = parser.parse_args()
+
+    df = load_catalog(args.data, args.repeat)
+    ids = df["id"].tolist()
+    base_rows = len(df) // args.repeat
+    start = time.perf_counter()
+    lexical_index = LexicalIndex.from_data_frame(df)
+    print(f"Lexical index: {len(ids)} rows, {len(lexical_index.vocabulary)} terms, "
+          f"{len(lexical_index.postings)} postings, built in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(0)
+    queries, sources = [], []
+    for row in rng.choice(len(df), args.queries, replace=False):
+        tokens = tokenize(f"{df['name'][row]} {df['keywordDescriptions'][row][0]}")
+        if tokens:
+            queries.append(list(rng.choice(tokens, min(len(tokens), rng.integers(2, 4)), replace=False)))
+            sources.append(row % base_rows)
+    query_vectors = hashed_embedding([", ".join(query) for query in queries])
+
+    def semantic(query, vector):
+        return store.search(vector, args.k)[0]
+
+    def lexical(query, vector):
+        return lexical_index.search(query, args.k)[0]
+
+    def hybrid(query, vector):
+        lexical_ids, lexical_scores = lexical_index.search(query, args.candidates)
+        if not lexical_ids:
+            return semantic(query, vector)
+        candidate_ids, scores = store.search(vector, len(lexical_ids), store.positions_of(lexical_ids))
+        lexical_scores = pd.Series(lexical_scores / lexical_scores.max() * 100, index=lexical_ids)
+        fused = (1 - args.weight) * scores + args.weight * lexical_scores.reindex(candidate_ids).to_numpy()
+        return [candidate_ids[i] for i in np.argsort(-fused, kind="stable")[:args.k]]
+
+    with tempfile.TemporaryDirectory() as directory:
+        vectors = hashed_embedding([", ".join(keywords) for keywords in df["keywordDescriptions"]])
+        store = VectorStore.create(directory, ids, vectors, {"model": "hashed"})
+        reference = [semantic(query, vector) for query, vector in zip(queries, query_vectors)]
+        print(f"{'mode':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}{f'overlap@{args.k}':>12}{'source hit':>12}")
+        for name, search in (("semantic", semantic), ("lexical", lexical), ("hybrid", hybrid)):
+            latencies, overlaps, hits = [], [], []
+            for query, vector, expected, source in zip(queries, query_vectors, reference, sources):
+                start = time.perf_counter()
+                result_ids = search(query, vector)
+                latencies.append(time.perf_counter() - start)
+                overlaps.append(recall_at_k(expected, result_ids) if expected else 0)
+                hits.append(source in {int(id) % base_rows for id in result_ids})
+            print(
+                f"{name:<10}{np.percentile(latencies, 50) * 1000:>10.2f}{np.percentile(latencies, 95) * 1000:>10.2f}"
+                f"{np.mean(overlaps):>12.3f}{np.mean(hits):>12.3f}"
+            )
+        del store
+
+
+if __name__ == "__main__":
+    main()
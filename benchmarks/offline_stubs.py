@@ -0,0 +1,339 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Offline stand-ins for the external dependencies of the server, used by the end-to-end benchmarks.
+The StubVisionServer answers the Azure Image Analysis dense captioning requests (and serves the images) with a configurable latency.
+The TinyTokenizer and TinyModel replace the embedded model with a deterministic hashed bag-of-words model of the same interface.
+
+Requirements:
+This module requires the installation of the torch and transformers libraries.
+
+Usage:
+To use the stubs, start a StubVisionServer, point the "AZURE_VISION_ENDPOINT" environment variable at its url,
+and replace ``load_embedded_model`` with ``load_tiny_model`` before the server modules are imported.
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/offline_stubs.py``
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+import torch
+from transformers import BatchEncoding
+
+
+COLOURS = ("black", "white", "blue", "red", "green", "beige", "grey", "pink", "brown", "yellow")
+GARMENTS = ("shirt", "t-shirt", "dress", "jeans", "jacket", "coat", "skirt", "sweater", "hoodie", "trousers", "shorts", "blazer")
+DETAILS = ("with buttons", "with a collar", "with a zipper", "with long sleeves", "with a hood", "with pockets", "with a pattern")
+
+
+def caption_image(
+    image_data: bytes,
+    count: int = 5
+) -> list:
+    """
+    Returns deterministic dense captions of an image, derived from a checksum of its bytes.
+
+    Args:
+    -----
+    image_data : ``bytes``
+        The image.
+    count : ``int``
+        The number of captions.
+
+    Returns:
+    --------
+    ``list``
+        A list of caption strings, e.g. "a black shirt with buttons".
+
+    Example:
+    --------
+    >>> caption_image(b"image-1", 2)
+    ... ['a blue jacket with a hood', 'a close-up of a blue jacket']
+
+    Author: ``@ChinaiArman``
+    """
+    rng = random.Random(zlib.crc32(image_data))
+    colour, garment = rng.choice(COLOURS), rng.choice(GARMENTS)
+    captions = [f"a {colour} {garment} {rng.choice(DETAILS)}", f"a close-up of a {colour} {garment}", f"a person wearing a {colour} {garment}"]
+    while len(captions) < count:
+        captions.append(f"a {rng.choice(COLOURS)} {rng.choice(GARMENTS)} {rng.choice(DETAILS)}")
+    return captions[:count]
+
+
+class StubVisionServer:
+    """
+    Class to serve the Azure Image Analysis dense captioning API and test images locally.
+
+    Args:
+    -----
+    latency_ms : ``float``
+        The delay added to every analysis request, in milliseconds.
+    jitter_ms : ``float``
+        The standard deviation of a normal jitter added to the delay, in milliseconds.
+
+    Attributes:
+    -----------
+    url : ``str``
+        The base url of the server, to use as the "AZURE_VISION_ENDPOINT" environment variable.
+    requests : ``int``
+        The number of analysis requests served.
+
+    Methods:
+    --------
+    >>> start()
+    ... # Starts the server in a background thread.
+    >>> stop()
+    ... # Stops the server.
+    >>> image_url(n)
+    ... # Returns the url of the n-th test image.
+
+    Notes:
+    ------
+    1. POST .../imageanalysis:analyze answers with the JSON of the 2023-10-01 API, with the captions of `caption_image`.
+    2. GET /images/<name> answers with a few deterministic bytes, so the image urls of the benchmark can be fetched by the server.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        jitter_ms: float = 0
+    ) -> None:
+        """
+        Initializes the StubVisionServer class.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/images/"):
+                    self._send(200, "image/jpeg", b"\xff\xd8\xff" + self.path.encode())
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+            def do_POST(self):
+                image_data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if ":analyze" not in self.path:
+                    self._send(404, "text/plain", b"not found")
+                    return
+                stub.requests += 1
+                time.sleep(max(0.0, random.gauss(stub.latency_ms, stub.jitter_ms)) / 1000)
+                body = {
+                    "modelVersion": "2023-10-01",
+                    "metadata": {"width": 512, "height": 512},
+                    "denseCaptionsResult": {"values": [
+                        {"text": text, "confidence": 0.9, "boundingBox": {"x": 0, "y": 0, "w": 512, "h": 512}}
+                        for text in caption_image(image_data)
+                    ]},
+                }
+                self._send(200, "application/json", json.dumps(body).encode())
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(
+        self
+    ) -> "StubVisionServer":
+        """
+        Starts the server in a background thread.
+        """
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(
+        self
+    ) -> None:
+        """
+        Stops the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def image_url(
+        self,
+        n: int
+    ) -> str:
+        """
+        Returns the url of the n-th test image.
+        """
+        return f"{self.url}/images/{n}.jpg"
+
+
+class TinyTokenizer:
+    """
+    Class to tokenize texts into hashed word ids, with the call interface of a transformers tokenizer.
+
+    Args:
+    -----
+    vocab_size : ``int``
+        The number of hashed word ids, id 0 is the padding.
+
+    Notes:
+    ------
+    1. A word is lowercased and hashed with crc32, so the ids are the same in every process and run.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        vocab_size: int = 2 ** 15
+    ) -> None:
+        """
+        Initializes the TinyTokenizer class.
+        """
+        self.vocab_size = vocab_size
+
+    def __call__(
+        self,
+        texts: list,
+        max_length: int = 512,
+        padding: bool = True,
+        truncation: bool = True,
+        return_tensors: str = "pt"
+    ) -> BatchEncoding:
+        """
+        Tokenizes a batch of texts into padded input ids and an attention mask.
+        """
+        tokens = [
+            [zlib.crc32(word.encode()) % (self.vocab_size - 1) + 1 for word in re.findall(r"[\w-]+", text.lower())][:max_length] or [0]
+            for text in texts
+        ]
+        length = max(len(ids) for ids in tokens)
+        return BatchEncoding({
+            "input_ids": [ids + [0] * (length - len(ids)) for ids in tokens],
+            "attention_mask": [[1] * len(ids) + [0] * (length - len(ids)) for ids in tokens],
+        }, tensor_type=return_tensors)
+
+
+class TinyModel(torch.nn.Module):
+    """
+    Class of a deterministic bag-of-words embedding model, with the forward interface of a transformers AutoModel.
+
+    Args:
+    -----
+    vocab_size : ``int``
+        The number of word ids.
+    hidden_size : ``int``
+        The dimensions of the embeddings.
+    seed : ``int``
+        The seed of the random word embeddings.
+
+    Notes:
+    ------
+    1. The last hidden state is the embedding of each word, so the average pooled embedding of a text is the mean of its words.
+    2. Texts sharing words are close, which keeps the rankings meaningful while costing almost nothing to compute.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        vocab_size: int = 2 ** 15,
+        hidden_size: int = 64,
+        seed: int = 0
+    ) -> None:
+        """
+        Initializes the TinyModel class.
+        """
+        super().__init__()
+        self.config = SimpleNamespace(hidden_size=hidden_size)
+        self.embeddings = torch.nn.Embedding(vocab_size, hidden_size)
+        with torch.no_grad():
+            self.embeddings.weight.copy_(torch.randn(vocab_size, hidden_size, generator=torch.Generator().manual_seed(seed)))
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor = None,
+        **kwargs
+    ) -> SimpleNamespace:
+        """
+        Returns the word embeddings of the input ids as the last hidden state.
+        """
+        return SimpleNamespace(last_hidden_state=self.embeddings(input_ids))
+
+
+def load_tiny_model(
+) -> tuple:
+    """
+    Returns a TinyTokenizer and a TinyModel, in place of ``load_embedded_model``.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the tokenizer and model objects.
+
+    Example:
+    --------
+    >>> import embedded_model.semantic_textual_analysis as sta
+    >>> sta.load_embedded_model = load_tiny_model
+
+    Author: ``@ChinaiArman``
+    """
+    return TinyTokenizer(), TinyModel()
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the offline stubs.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function captions a test image through the stub server and embeds the captions with the tiny model.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the captions of a test image and the shape of their embeddings.
+
+    Author: ``@ChinaiArman``
+    """
+    import urllib.request
+    server = StubVisionServer(latency_ms=20).start()
+    image = urllib.request.urlopen(server.image_url(1)).read()
+    request = urllib.request.Request(f"{server.url}/computervision/imageanalysis:analyze?features=denseCaptions", data=image, method="POST")
+    captions = [value["text"] for value in json.load(urllib.request.urlopen(request))["denseCaptionsResult"]["values"]]
+    print(captions)
+    tokenizer, model = load_tiny_model()
+    batch = tokenizer(captions)
+    print(model(**batch).last_hidden_state.shape)
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Compares the "sentence" and "phrase" embedding modes of the vector index on the data source, for latency and ranking quality.
+The index build, the ingestion of held-out rows and the embedding of keyword queries are timed in both modes,
+and the rankings of the phrase mode are compared with the rankings of the sentence mode.
+
+Requirements:
+This module requires the installation of the numpy, pandas, torch and transformers libraries.
+
+Usage:
+To execute this module from the root directory with the model of the "EMBEDDED_MODEL" environment variable, run the following command:
+    ``python benchmarks/phrase_embeddings.py --holdout 0.1 --queries 200``
+Add ``--offline`` to use the tiny offline model instead (its timings are meaningful, its rankings are not).
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_source.keyword_store import KeywordStore
+from embedded_model.phrase_embeddings import PhraseEmbeddings
+from embedded_model.semantic_textual_analysis import embed_texts, load_embedded_model
+from embedded_model.vector_store import top_k
+from synthetic_catalog import generate_catalog
+
+
+def timed(
+    function
+) -> tuple:
+    """
+    Returns the result of a function and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def overlap(
+    vectors: np.ndarray,
+    reference: np.ndarray,
+    queries: np.ndarray,
+    k: int
+) -> float:
+    """
+    Returns the mean fraction of the top k neighbours of the queries in `reference` also found in `vectors`, excluding the query row.
+    """
+    fractions = []
+    for query in queries:
+        found = [set(top_k(np.delete(matrix @ matrix[query], query), k)) for matrix in (vectors, reference)]
+        fractions.append(len(found[0] & found[1]) / k)
+    return float(np.mean(fractions))
+
+
+def main(
+) -> None:
+    """
+    Runs the embedding mode comparison and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. A random fraction of the rows is held out. The phrase cache is built from the other rows, then the held-out rows are ingested one at a time,
+       as by POST /add_item, so their known phrases are read from the cache and only the new ones go through the model.
+    2. On the shipped data source there are about as many distinct phrases as rows, so the build embeds shorter texts but not fewer of them.
+       Synthetic catalogs (--rows) have the phrase repetition of a large catalog.
+    3. The queries are pairs of phrases drawn from the catalog vocabulary, as sent to POST /keyword_search.
+    4. "overlap@k" is the fraction of the top k neighbours of a row in the sentence mode index also in its top k in the phrase mode index,
+       "cosine" the mean cosine similarity between the sentence and phrase embedding of the same row.
+
+    Example:
+    --------
+    >>> python benchmarks/phrase_embeddings.py --offline
+    ... # Prints the build, ingest and query latencies of both modes and their agreement.
+    >>> python benchmarks/phrase_embeddings.py --offline --rows 100000
+    ... # Compares the modes on a synthetic catalog, which repeats phrases across many more rows.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Compares the sentence and phrase embedding modes of the vector index.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file.")
+    parser.add_argument("--rows", type=int, default=0, help="Use a synthetic catalog of this many rows generated from the data source.")
+    parser.add_argument("--holdout", type=float, default=0.1, help="The fraction of rows ingested one at a time.")
+    parser.add_argument("--queries", type=int, default=200, help="The number of keyword queries and quality probes.")
+    parser.add_argument("--k", type=int, default=10, help="The number of neighbours compared.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the held-out rows and queries.")
+    parser.add_argument("--offline", action="store_true", help="Use the tiny offline model instead of EMBEDDED_MODEL.")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.offline:
+        from offline_stubs import load_tiny_model
+        tokenizer, model = load_tiny_model()
+    else:
+        tokenizer, model = load_embedded_model()
+    embed = lambda texts: embed_texts(texts, model, tokenizer)
+    rng = np.random.default_rng(args.seed)
+    data = args.data
+    if args.rows:
+        data = os.path.join(tempfile.mkdtemp(prefix="phrase_embeddings-"), f"catalog_{args.rows}.csv")
+        generate_catalog(data, args.rows, args.data, args.seed)
+    store = KeywordStore.from_strings(pd.read_csv(data, usecols=["keywordDescriptions"])["keywordDescriptions"])
+    order = rng.permutation(len(store))
+    held_out = order[:int(len(store) * args.holdout)]
+    catalog = np.sort(order[len(held_out):])
+    rows = store.lists()
+    queries = [list(rng.choice(store.phrases, 2, replace=False)) for _ in range(args.queries)]
+    results = {}
+
+    sentence_vectors, build_seconds = timed(lambda: embed(store.take(catalog).joined()))
+    ingested, ingest_seconds = timed(lambda: [embed([", ".join(rows[row])])[0] for row in held_out])
+    _, query_seconds = timed(lambda: [embed([", ".join(query)]) for query in queries])
+    results["sentence"] = {
+        "build_s": build_seconds,
+        "build_texts": len(catalog),
+        "ingest_ms": ingest_seconds / max(len(held_out), 1) * 1000,
+        "ingest_texts_per_row": 1.0,
+        "ingest_without_model": 0.0,
+        "query_ms": query_seconds / len(queries) * 1000,
+    }
+    sentence = np.empty((len(store), sentence_vectors.shape[1]), dtype=np.float32)
+    sentence[catalog] = sentence_vectors
+    if len(held_out):
+        sentence[held_out] = np.stack(ingested)
+
+    cache = PhraseEmbeddings()
+    phrase_vectors, build_seconds = timed(lambda: cache.pool(store.take(catalog), embed))
+    build_texts = cache.embedded
+    counts = []
+
+    def ingest(row):
+        before = cache.embedded
+        vector = cache.embed_rows([rows[row]], embed)[0]
+        counts.append(cache.embedded - before)
+        return vector
+
+    ingested, ingest_seconds = timed(lambda: [ingest(row) for row in held_out])
+    _, query_seconds = timed(lambda: [cache.embed_rows([query], embed, add=False) for query in queries])
+    results["phrase"] = {
+        "build_s": build_seconds,
+        "build_texts": build_texts,
+        "ingest_ms": ingest_seconds / max(len(held_out), 1) * 1000,
+        "ingest_texts_per_row": float(np.mean(counts)) if counts else 0.0,
+        "ingest_without_model": float(np.mean(np.array(counts) == 0)) if counts else 0.0,
+        "query_ms": query_seconds / len(queries) * 1000,
+    }
+    phrase = np.empty_like(sentence)
+    phrase[catalog] = phrase_vectors
+    if len(held_out):
+        phrase[held_out] = np.stack(ingested)
+
+    probes = rng.choice(len(store), min(args.queries, len(store)), replace=False)
+    quality = {
+        f"overlap@{args.k}": overlap(phrase, sentence, probes, args.k),
+        "cosine": float(np.mean(np.sum(phrase * sentence, axis=1))),
+    }
+
+    print(f"{len(store)} rows, {len(store.phrases)} distinct phrases, {len(held_out)} rows ingested one at a time, {len(queries)} queries")
+    print(f"{'mode':<10}{'build (s)':>11}{'build texts':>13}{'ingest (ms)':>13}{'texts/ingest':>14}{'no model':>10}{'query (ms)':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['build_s']:>11.2f}{result['build_texts']:>13}{result['ingest_ms']:>13.2f}"
+              f"{result['ingest_texts_per_row']:>14.2f}{result['ingest_without_model']:>9.0%}{result['query_ms']:>12.2f}")
+    print("Phrase vs sentence: " + ", ".join(f"{name} {value:.3f}" for name, value in quality.items()))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"config": vars(args), "results": results, "quality": quality}, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
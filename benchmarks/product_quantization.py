@@ -0,0 +1,99 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the training time, memory usage, query latency and recall@k of the product quantized VectorStore.
+The benchmark runs fully offline on synthetic, clustered unit vectors, so no model or data source is required.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/product_quantization.py --rows 100000 --subspaces 48 96 192 --rerank 0 200``
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from embedded_model.vector_store import VectorStore, top_k
+from embedded_model.product_quantization import PQ_FILE
+from vector_encoding import synthetic_vectors, recall_at_k
+
+
+def main(
+) -> None:
+    """
+    Runs the product quantization benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The exact float32 ranking is used as the ground truth for recall@k.
+    2. The training time includes encoding every row and writing pq.bin.
+    3. Latency is the median over all queries, excluding the first (warm-up) query.
+
+    Example:
+    --------
+    >>> python benchmarks/product_quantization.py --rows 100000
+    ... # Prints training time, memory, latency and recall@k per subspace count.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the product quantized vector store.")
+    parser.add_argument("--rows", type=int, default=100000, help="The number of catalog vectors.")
+    parser.add_argument("--dimensions", type=int, default=768, help="The dimension of the vectors.")
+    parser.add_argument("--subspaces", type=int, nargs="+", default=[48, 96, 192], help="The subspace counts to test.")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 200], help="The exact rerank candidate counts to test.")
+    parser.add_argument("--queries", type=int, default=50, help="The number of queries to run.")
+    parser.add_argument("--k", type=int, default=10, help="The number of results per query.")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dimensions)
+    queries = synthetic_vectors(args.queries + 1, args.dimensions, seed=1)
+    ids = [str(i) for i in range(args.rows)]
+    truth = [[ids[i] for i in top_k(vectors @ query, args.k)] for query in queries]
+
+    print(f"{'subspaces':<11}{'rerank':>8}{'train (s)':>11}{'memory (MB)':>14}{'p50 (ms)':>11}{f'recall@{args.k}':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        VectorStore.create(directory, ids, vectors, {"model": "synthetic"})
+        for subspaces in args.subspaces:
+            if os.path.exists(os.path.join(directory, PQ_FILE)):
+                os.remove(os.path.join(directory, PQ_FILE))
+            start = time.perf_counter()
+            VectorStore(directory, "pq", pq_subspaces=subspaces)
+            training_time = time.perf_counter() - start
+            for rerank in args.rerank:
+                store = VectorStore(directory, "pq", rerank, pq_subspaces=subspaces)
+                latencies, recalls = [], []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    result_ids, _ = store.search(query, args.k)
+                    latencies.append(time.perf_counter() - start)
+                    recalls.append(recall_at_k(expected, result_ids))
+                print(
+                    f"{subspaces:<11}{rerank:>8}{training_time:>11.1f}{store.memory_usage() / 2 ** 20:>14.1f}"
+                    f"{np.median(latencies[1:]) * 1000:>11.2f}{np.mean(recalls):>12.3f}"
+                )
+                del store
+
+
+if __name__ == "__main__":
+    main()
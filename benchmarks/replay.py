@@ -0,0 +1,324 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Replays a recorded request trace against a running server, with open-loop arrivals, to measure latency under realistic contention.
+Each request is sent at its recorded arrival time (divided by the speed-up factor) whether or not the previous requests have returned,
+and its latency is measured from that intended send time, so queueing delays are not hidden by a slow client (coordinated omission).
+The read/write mix of the trace can be changed, and the results are printed per endpoint and optionally written as JSON.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+Record a trace by starting the server with ``REQUEST_CAPTURE_FILE=trace.jsonl``, or generate one from the data source, then replay it:
+    ``python benchmarks/replay.py --generate trace.jsonl --requests 2000 --rate 20``
+    ``python benchmarks/replay.py trace.jsonl --url http://127.0.0.1:5000 --speedup 4 --write-ratio 0.05``
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lexical_search import load_catalog
+
+
+WRITE_METHODS = ("POST", "PUT", "DELETE")
+READ_POSTS = ("/search", "/keyword_search")
+
+
+def is_write(
+    entry: dict
+) -> bool:
+    """
+    Returns whether a trace entry changes the catalog (the search endpoints are POST requests but only read).
+    """
+    return entry["method"] in WRITE_METHODS and entry["path"].split("?")[0] not in READ_POSTS
+
+
+def endpoint(
+    entry: dict
+) -> str:
+    """
+    Returns the endpoint of a trace entry, e.g. "GET /items/<id>".
+    """
+    path = entry["path"].split("?")[0]
+    path = re.sub(r"^/items/[^/]+", "/items/<id>", path)
+    return f"{entry['method']} {path}"
+
+
+def load_trace(
+    path: str
+) -> list:
+    """
+    Loads a JSONL trace of {"method", "path", "body", "interarrival"} objects.
+    """
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def generate_trace(
+    path: str,
+    data: str,
+    requests: int,
+    rate: float,
+    seed: int = 0
+) -> None:
+    """
+    Writes a synthetic trace of keyword searches, item lookups and writes with Poisson arrivals.
+
+    Args:
+    -----
+    path : ``str``
+        The JSONL trace file.
+    data : ``str``
+        The data source the keywords and ids are drawn from.
+    requests : ``int``
+        The number of requests.
+    rate : ``float``
+        The mean number of requests per second.
+    seed : ``int``
+        The seed of the generator.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The trace is 60% keyword searches, 30% item lookups and 10% item inserts, use --write-ratio at replay time to change the mix.
+
+    Author: ``@ChinaiArman``
+    """
+    rng = random.Random(seed)
+    df = load_catalog(data, 1)
+    ids = df["id"].tolist()
+    phrases = sorted({phrase for keywords in df["keywordDescriptions"] for phrase in keywords if phrase})
+    with open(path, "w") as file:
+        for i in range(requests):
+            draw = rng.random()
+            if draw < 0.6:
+                entry = {"method": "POST", "path": "/keyword_search", "body": {"keywords": rng.sample(phrases, 2), "size": 10}}
+            elif draw < 0.9:
+                entry = {"method": "GET", "path": f"/items/{rng.choice(ids)}", "body": None}
+            else:
+                row = df.iloc[rng.randrange(len(df))]
+                entry = {"method": "POST", "path": "/add_item", "body": {"name": row["name"], "description": "Black", "imageUrl": row["imageUrl"]}}
+            entry["interarrival"] = 0.0 if i == 0 else round(rng.expovariate(rate), 6)
+            file.write(json.dumps(entry) + "\n")
+
+
+def mix(
+    trace: list,
+    write_ratio: float,
+    requests: int,
+    seed: int = 0
+) -> list:
+    """
+    Builds a schedule with the inter-arrival times of the trace and a given fraction of writes.
+
+    Args:
+    -----
+    trace : ``list``
+        The trace entries.
+    write_ratio : ``float``
+        The fraction of writes, or None to keep the mix of the trace.
+    requests : ``int``
+        The number of requests of the schedule, the trace is cycled if it is shorter.
+    seed : ``int``
+        The seed of the read/write draws.
+
+    Returns:
+    --------
+    ``list``
+        The entries of the schedule, in order.
+
+    Notes:
+    ------
+    1. Each slot keeps the inter-arrival time of the corresponding trace entry, and takes the next read or write of the trace
+       depending on a draw against the ratio, so the reads and writes each stay in their recorded order.
+
+    Author: ``@ChinaiArman``
+    """
+    if write_ratio is None:
+        return [trace[i % len(trace)] for i in range(requests)]
+    rng = random.Random(seed)
+    reads = [entry for entry in trace if not is_write(entry)] or trace
+    writes = [entry for entry in trace if is_write(entry)] or trace
+    counters = {"read": 0, "write": 0}
+    schedule = []
+    for i in range(requests):
+        kind, pool = ("write", writes) if rng.random() < write_ratio else ("read", reads)
+        entry = pool[counters[kind] % len(pool)]
+        counters[kind] += 1
+        schedule.append({**entry, "interarrival": trace[i % len(trace)]["interarrival"]})
+    return schedule
+
+
+def replay(
+    url: str,
+    schedule: list,
+    speedup: float,
+    max_workers: int,
+    timeout: float = 120
+) -> dict:
+    """
+    Sends the requests of a schedule at their intended times (open loop) and records their latencies.
+
+    Args:
+    -----
+    url : ``str``
+        The base url of the server.
+    schedule : ``list``
+        The entries to send, with their inter-arrival times in seconds.
+    speedup : ``float``
+        The factor the inter-arrival times are divided by.
+    max_workers : ``int``
+        The maximum number of requests in flight. Requests beyond it wait for a worker, and the wait is counted in their latency.
+    timeout : ``float``
+        The timeout of each request, in seconds.
+
+    Returns:
+    --------
+    ``dict``
+        A dictionary with the wall time and, for each endpoint, the corrected latencies, service times, statuses and maximum send lag.
+
+    Notes:
+    ------
+    1. The corrected latency is measured from the intended send time, the service time from the actual send time.
+       Their difference is the time the request spent waiting because of the client or earlier requests.
+
+    Author: ``@ChinaiArman``
+    """
+    results = {}
+    lock = threading.Lock()
+
+    def send(entry, intended):
+        sent = time.perf_counter()
+        data = json.dumps(entry["body"]).encode() if entry.get("body") is not None else None
+        request = urllib.request.Request(url + entry["path"], data=data, method=entry["method"], headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        except (urllib.error.URLError, OSError):
+            status = 599
+        done = time.perf_counter()
+        with lock:
+            result = results.setdefault(endpoint(entry), {"latencies": [], "service": [], "statuses": [], "lag": 0.0})
+            result["latencies"].append(done - intended)
+            result["service"].append(done - sent)
+            result["statuses"].append(status)
+            result["lag"] = max(result["lag"], sent - intended)
+
+    start = time.perf_counter()
+    intended = start
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for entry in schedule:
+            intended += entry["interarrival"] / speedup
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, entry, intended)
+    return {"wall": time.perf_counter() - start, "intended": intended - start, "endpoints": results}
+
+
+def main(
+) -> None:
+    """
+    Replays a trace (or generates one) and prints the latency percentiles per endpoint.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The p50/p95/p99 columns are the coordinated omission corrected latencies, "svc p99" is the p99 of the service time alone.
+    2. "lag" is the largest delay between the intended and actual send time of a request of the endpoint.
+
+    Example:
+    --------
+    >>> python benchmarks/replay.py trace.jsonl --speedup 10
+    ... # Prints the latency percentiles, throughput and errors of each endpoint.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Replays a recorded request trace against a running server.")
+    parser.add_argument("trace", nargs="?", help="The JSONL trace, recorded with REQUEST_CAPTURE_FILE or --generate.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="The base url of the server.")
+    parser.add_argument("--speedup", type=float, default=1.0, help="The factor the inter-arrival times are divided by.")
+    parser.add_argument("--write-ratio", type=float, default=None, help="The fraction of writes, default is the mix of the trace.")
+    parser.add_argument("--requests", type=int, default=None, help="The number of requests, default is the length of the trace.")
+    parser.add_argument("--max-workers", type=int, default=256, help="The maximum number of requests in flight.")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file.")
+    parser.add_argument("--generate", metavar="TRACE", help="Generate a synthetic trace to this file and exit.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source of the generated trace.")
+    parser.add_argument("--rate", type=float, default=20, help="The mean request rate of the generated trace.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the generated trace and of the read/write mix.")
+    args = parser.parse_args()
+    if args.generate:
+        generate_trace(args.generate, args.data, args.requests or 1000, args.rate, args.seed)
+        print(f"Trace written to {args.generate}")
+        return
+    if not args.trace:
+        parser.error("a trace file or --generate is required")
+
+    trace = load_trace(args.trace)
+    schedule = mix(trace, args.write_ratio, args.requests or len(trace), args.seed)
+    run = replay(args.url, schedule, args.speedup, args.max_workers)
+    print(f"Sent {len(schedule)} requests in {run['wall']:.1f}s (intended {run['intended']:.1f}s, "
+          f"{len(schedule) / run['wall']:.1f} req/s)")
+    print(f"{'endpoint':<28}{'count':>7}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'svc p99':>10}{'lag (ms)':>10}{'errors':>8}")
+    summary = []
+    for name, result in sorted(run["endpoints"].items()):
+        latencies = np.array(result["latencies"]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        service_p99 = np.percentile(np.array(result["service"]) * 1000, 99)
+        errors = sum(status >= 400 for status in result["statuses"])
+        summary.append({
+            "endpoint": name,
+            "requests": len(latencies),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(latencies.max()), 3),
+            "service_p99_ms": round(float(service_p99), 3),
+            "max_lag_ms": round(result["lag"] * 1000, 3),
+            "errors": errors,
+        })
+        print(f"{name:<28}{len(latencies):>7}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{service_p99:>10.1f}{result['lag'] * 1000:>10.1f}{errors:>8}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "config": {key: value for key, value in vars(args).items() if key not in ("generate", "output")},
+                "wall_seconds": round(run["wall"], 3),
+                "results": summary,
+            }, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
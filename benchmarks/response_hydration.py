@@ -0,0 +1,98 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the time to build a search response from a list of ranked ids.
+The per-item DataFrame hydration encoded with json (as jsonify does) is compared with the concatenation of pre-rendered rows.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/response_hydration.py --data server/data_source/data.csv --repeat 1 --runs 20``
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from data_source.rendered_rows import RenderedRows
+from lexical_search import load_catalog
+
+
+def main(
+) -> None:
+    """
+    Runs the response hydration benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The DataFrame path filters the catalog by id, runs fillna("") and to_dict("records") per item, then encodes the list with sorted keys.
+    2. The DataFrame path does not include the CSV read of the Database class, which the server previously paid once per request.
+    3. Both paths are checked to produce the same JSON document.
+
+    Example:
+    --------
+    >>> python benchmarks/response_hydration.py
+    ... # Prints the median build time per response size.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the response build time of the search endpoints.")
+    parser.add_argument("--data", default="server/data_source/data.csv", help="The data source CSV file.")
+    parser.add_argument("--repeat", type=int, default=1, help="The number of times the catalog is tiled.")
+    parser.add_argument("--runs", type=int, default=20, help="The number of responses built per size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="The response sizes.")
+    args = parser.parse_args()
+
+    df = load_catalog(args.data, args.repeat)
+    start = time.perf_counter()
+    rendered_rows = RenderedRows.from_data_frame(df)
+    print(f"Rendered {len(df)} rows in {time.perf_counter() - start:.2f}s "
+          f"({sum(len(fragment) for fragment in rendered_rows.fragments.values()) / 2 ** 20:.1f} MiB)")
+
+    def dataframe(ids):
+        items = [df.loc[df["id"] == id].fillna("").to_dict("records")[0] for id in ids]
+        return json.dumps(items, sort_keys=True, separators=(",", ":")).encode()
+
+    def rendered(ids):
+        return rendered_rows.array(ids)
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>6}{'dataframe (ms)':>16}{'rendered (ms)':>16}{'speed-up':>10}")
+    for size in args.sizes:
+        timings = {}
+        for name, build in (("dataframe", dataframe), ("rendered", rendered)):
+            runs = args.runs if name == "rendered" or size <= 100 else max(1, args.runs // 10)
+            latencies = []
+            for _ in range(runs):
+                ids = df["id"].to_numpy()[rng.choice(len(df), min(size, len(df)), replace=False)].tolist()
+                start = time.perf_counter()
+                build(ids)
+                latencies.append(time.perf_counter() - start)
+            timings[name] = np.median(latencies)
+        assert json.loads(dataframe(ids)) == json.loads(rendered(ids))
+        print(f"{size:>6}{timings['dataframe'] * 1000:>16.2f}{timings['rendered'] * 1000:>16.3f}"
+              f"{timings['dataframe'] / timings['rendered']:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the sharded vector search with local shard processes on one machine: the query latency, recall@k and memory per process for several
+shard counts against the in-process float32 search, and the latency and recall of the searches when a shard is stopped, stalled or every shard is stopped.
+The benchmark runs fully offline on synthetic, clustered unit vectors, so no model or data source is required.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/sharded_search.py --rows 500000 --dimensions 768 --shards 1 2 4 8 --queries 50 --k 10``
+"""
+
+import argparse
+import signal
+import tempfile
+import time
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from embedded_model.vector_store import VectorStore
+from embedded_model.sharded_search import ShardedSearch
+from vector_encoding import synthetic_vectors, recall_at_k
+
+
+def measure(
+    store,
+    queries: np.ndarray,
+    truth: list,
+    k: int,
+    positions: np.ndarray = None
+) -> tuple:
+    """
+    Returns the median and 95th percentile latency in milliseconds and the mean recall@k of the queries, excluding the warm-up query.
+    """
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids, _ = store.search(query, k, positions)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(recall_at_k(expected, ids))
+    return np.median(latencies[1:]) * 1000, np.percentile(latencies[1:], 95) * 1000, np.mean(recalls[1:])
+
+
+def main(
+) -> None:
+    """
+    Runs the sharded search benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The exact float32 ranking of the in-process index is the ground truth for recall@k.
+    2. The sharded searches go through a "mapped" index, as the server's in-process index when it has shards, so the memory column is
+       the vectors held by the server process, and the shard column the vectors held by the largest shard.
+    3. With --filter, every search is restricted to a random fraction of the rows, as by the attribute filters.
+    4. The refresh after a write (one removed and one edited row) sends only the changes to the shards of the largest shard count.
+    5. The failure scenarios use the largest shard count: one shard process killed, one stalled with SIGSTOP
+       (every search waits for the timeout), and every shard killed (the mapped in-process index answers from the vector file).
+
+    Example:
+    --------
+    >>> python benchmarks/sharded_search.py --rows 500000 --shards 1 2 4
+    ... # Prints the latency and recall per shard count and per failure scenario.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the latency, recall and failure handling of the sharded vector search.")
+    parser.add_argument("--rows", type=int, default=200000, help="The number of catalog vectors.")
+    parser.add_argument("--dimensions", type=int, default=768, help="The dimension of the vectors.")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="The shard counts to measure.")
+    parser.add_argument("--queries", type=int, default=50, help="The number of queries to run.")
+    parser.add_argument("--k", type=int, default=10, help="The number of results per query.")
+    parser.add_argument("--filter", type=float, default=0, help="The fraction of the rows each search is restricted to, 0 for every row.")
+    parser.add_argument("--timeout", type=float, default=0.5, help="The number of seconds a search waits for the shards.")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dimensions)
+    queries = synthetic_vectors(args.queries + 1, args.dimensions, seed=1)
+    ids = [str(i) for i in range(args.rows)]
+    positions = None
+    if args.filter:
+        positions = np.sort(np.random.default_rng(2).choice(args.rows, int(args.rows * args.filter), replace=False))
+    with tempfile.TemporaryDirectory() as directory:
+        in_process = VectorStore.create(directory, ids, vectors, {"model": "synthetic"})
+        store = VectorStore(directory, "mapped")
+        truth = [in_process.search(query, args.k, positions)[0] for query in queries]
+        row_bytes = 4 * args.dimensions
+
+        print(f"{'search':<22}{'load (s)':>10}{'p50 (ms)':>11}{'p95 (ms)':>11}{f'recall@{args.k}':>12}{'memory (MB)':>13}{'shard (MB)':>12}")
+        p50, p95, recall = measure(in_process, queries, truth, args.k, positions)
+        print(f"{'in-process':<22}{'':>10}{p50:>11.2f}{p95:>11.2f}{recall:>12.3f}{in_process.memory_usage() / 2 ** 20:>13.1f}{'':>12}")
+        sharded_search = None
+        for count in args.shards:
+            if sharded_search is not None:
+                sharded_search.close()
+            sharded_search = ShardedSearch.local(count, args.timeout)
+            start = time.perf_counter()
+            sharded_search.refresh(store)
+            load_seconds = time.perf_counter() - start
+            p50, p95, recall = measure(sharded_search.view(store), queries, truth, args.k, positions)
+            shard_bytes = max(shard["rows"] for shard in sharded_search.status()["shards"]) * row_bytes
+            print(f"{f'{count} shards':<22}{load_seconds:>10.2f}{p50:>11.2f}{p95:>11.2f}{recall:>12.3f}"
+                  f"{store.memory_usage() / 2 ** 20:>13.1f}{shard_bytes / 2 ** 20:>12.1f}")
+
+        updated = store.copy()
+        updated.remove(ids[0], save=False)
+        updated.add(ids[1], vectors[1], save=False)
+        start = time.perf_counter()
+        sharded_search.refresh(updated)
+        load_seconds = time.perf_counter() - start
+        print(f"{'refresh after a write':<22}{load_seconds:>10.3f}")
+        sharded_search.refresh(store)
+
+        view = sharded_search.view(store)
+        processes = [shard.process for shard in sharded_search.shards]
+        if len(processes) > 1:
+            processes[0].kill()
+            processes[0].wait()
+            p50, p95, recall = measure(view, queries, truth, args.k, positions)
+            print(f"{'1 shard killed':<22}{'':>10}{p50:>11.2f}{p95:>11.2f}{recall:>12.3f}")
+            os.kill(processes[-1].pid, signal.SIGSTOP)
+            p50, p95, recall = measure(view, queries[:6], truth[:6], args.k, positions)
+            print(f"{'1 shard stalled':<22}{'':>10}{p50:>11.2f}{p95:>11.2f}{recall:>12.3f}")
+            os.kill(processes[-1].pid, signal.SIGCONT)
+        for process in processes:
+            process.kill()
+            process.wait()
+        p50, p95, recall = measure(view, queries, truth, args.k, positions)
+        print(f"{'every shard killed':<22}{'':>10}{p50:>11.2f}{p95:>11.2f}{recall:>12.3f}")
+        sharded_search.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Generates synthetic catalogs in the exact schema of the data source (id,name,description,imageUrl,keywordDescriptions),
+from 10 thousand to 10 million rows, to test the server at production scale.
+The rows are composed from the vocabulary of the shipped data source: each row takes the name and description pattern of a source row
+with a new colour, and captions drawn from the caption patterns of source rows of the same article type.
+The catalog is written in chunks, so the memory used does not grow with the number of rows.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/synthetic_catalog.py --rows 1000000 --output benchmarks/data/catalog_1m.csv``
+"""
+
+import argparse
+import csv
+import hashlib
+import re
+import time
+import numpy as np
+import pandas as pd
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from data_source.attribute_index import row_attributes
+
+
+COLUMNS = ["id", "name", "description", "imageUrl", "keywordDescriptions"]
+LOWER, TITLE, UPPER = "\x00l", "\x00t", "\x00u"
+MAX_CAPTIONS = 8
+
+
+def _template(
+    text: str,
+    colours: set
+) -> str:
+    """
+    Replaces the colour words of a text with case preserving colour slots.
+    """
+    if not text or not colours:
+        return text
+    pattern = re.compile(r"\b(" + "|".join(sorted(colours)) + r")\b", re.IGNORECASE)
+    return pattern.sub(lambda match: UPPER if match.group().isupper() else TITLE if match.group()[0].isupper() else LOWER, text)
+
+
+def _fill(
+    template: str,
+    colour: str
+) -> str:
+    """
+    Fills the colour slots of a template.
+    """
+    if "\x00" not in template:
+        return template
+    return template.replace(LOWER, colour).replace(TITLE, colour.title()).replace(UPPER, colour.upper())
+
+
+def build_vocabulary(
+    source: str
+) -> dict:
+    """
+    Extracts the row patterns, caption patterns and colours of a data source.
+
+    Args:
+    -----
+    source : ``str``
+        The data source CSV file.
+
+    Returns:
+    --------
+    ``dict``
+        A dictionary with:
+            - "rows": a list of (retailer, name, description, captions, article type) patterns, one per source row.
+            - "captions": for each article type, the list of its distinct caption patterns.
+            - "colours" and "weights": the colours of the source and their frequencies.
+
+    Notes:
+    ------
+    1. The colour words of a row (see `row_attributes`) are replaced by slots in its name, description and captions.
+    2. A row is grouped under its first article type, or the last word of its name if it has none (e.g. "tunic").
+
+    Example:
+    --------
+    >>> vocabulary = build_vocabulary("server/data_source/data.csv")
+    >>> len(vocabulary["rows"])
+    ... 2744
+
+    Author: ``@ChinaiArman``
+    """
+    df = pd.read_csv(source, dtype={"id": str})
+    rows, captions, colour_counts = [], {}, {}
+    for row in df.to_dict("records"):
+        attributes = row_attributes(pd.Series(row))
+        colours = attributes["colour"]
+        article = min(attributes["articleType"], default=None) or (re.findall(r"[a-z]+", str(row["name"]).lower()) or ["other"])[-1]
+        retailer = next(iter(attributes["retailer"]))
+        for colour in colours:
+            colour_counts[colour] = colour_counts.get(colour, 0) + 1
+        row_captions = [_template(caption, colours) for caption in str(row["keywordDescriptions"]).split(", ") if caption]
+        description = row["description"] if pd.notna(row["description"]) else ""
+        rows.append((retailer, _template(row["name"], colours), _template(description, colours), row_captions, article))
+        captions.setdefault(article, set()).update(row_captions)
+    colours = sorted(colour_counts)
+    weights = np.array([colour_counts[colour] for colour in colours], dtype=np.float64)
+    return {
+        "rows": rows,
+        "captions": {article: sorted(patterns) for article, patterns in captions.items()},
+        "colours": colours,
+        "weights": weights / weights.sum(),
+    }
+
+
+def image_url(
+    retailer: str,
+    name: str,
+    colour: str,
+    key: str
+) -> str:
+    """
+    Returns a synthetic image URL in the format of a retailer.
+
+    Args:
+    -----
+    retailer : ``str``
+        The retailer of the row ("hm", "asos", "free_clothes" or "other").
+    name : ``str``
+        The name of the row.
+    colour : ``str``
+        The colour of the row.
+    key : ``str``
+        A unique key of the row, hashed into the path.
+
+    Returns:
+    --------
+    ``str``
+        The URL, on the retailer's image host so the retailer attribute of the row is preserved.
+
+    Example:
+    --------
+    >>> image_url("hm", "Slim Fit Shirt", "black", "0:1")
+    ... 'https://image.hm.com/assets/hm/3f/9a/3f9a....jpg'
+
+    Author: ``@ChinaiArman``
+    """
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    if retailer == "hm":
+        return f"https://image.hm.com/assets/hm/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    if retailer == "asos":
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+        return f"https://images.asos-media.com/products/{slug}/{int(digest[:8], 16) % 10 ** 9:09d}-1-{colour}"
+    return f"http://assets.myntassets.com/v1/images/style/properties/{digest[:32]}_images.jpg"
+
+
+def generate_catalog(
+    path: str,
+    rows: int,
+    source: str = "server/data_source/data.csv",
+    seed: int = 0,
+    chunk_rows: int = 100000,
+    start_id: int = 0
+) -> dict:
+    """
+    Writes a synthetic catalog to a CSV file.
+
+    Args:
+    -----
+    path : ``str``
+        The CSV file the catalog is written to.
+    rows : ``int``
+        The number of rows of the catalog.
+
+    Keyword Args:
+    -------------
+    source : ``str``
+        The data source CSV file the vocabulary is extracted from.
+    seed : ``int``
+        The seed of the generator, the same seed always writes the same catalog.
+    chunk_rows : ``int``
+        The number of rows generated and written at once.
+    start_id : ``int``
+        The id of the first row, the ids are consecutive integers.
+
+    Returns:
+    --------
+    ``dict``
+        The number of rows, the size of the file in bytes, the generation time in seconds and the number of distinct rows patterns.
+
+    Notes:
+    ------
+    1. Each row copies the retailer, name and description pattern of a random source row, with a colour drawn from the source colour frequencies.
+    2. The captions are the first caption of the source row followed by captions of random source rows of the same article type,
+       with as many captions as the source row (at most 8).
+    3. Only one chunk of rows is held in memory at a time.
+
+    Example:
+    --------
+    >>> generate_catalog("catalog_1m.csv", 1000000)
+    ... {'rows': 1000000, 'bytes': 214000000, 'seconds': 21.4, 'patterns': 2744}
+
+    Author: ``@ChinaiArman``
+    """
+    vocabulary = build_vocabulary(source)
+    patterns, pools, colours = vocabulary["rows"], vocabulary["captions"], vocabulary["colours"]
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for offset in range(0, rows, chunk_rows):
+            count = min(chunk_rows, rows - offset)
+            pattern_choices = rng.integers(0, len(patterns), count)
+            colour_choices = rng.choice(len(colours), count, p=vocabulary["weights"])
+            draws = rng.random((count, MAX_CAPTIONS))
+            chunk = []
+            for i in range(count):
+                id = str(start_id + offset + i)
+                retailer, name, description, captions, article = patterns[pattern_choices[i]]
+                colour = colours[colour_choices[i]]
+                pool = pools[article]
+                keywords = captions[:1] + [pool[int(draw * len(pool))] for draw in draws[i, 1:min(len(captions), MAX_CAPTIONS)]]
+                name = _fill(name, colour)
+                chunk.append((
+                    id,
+                    name,
+                    _fill(description, colour),
+                    image_url(retailer, name, colour, f"{seed}:{id}"),
+                    ", ".join(_fill(keyword, colour) for keyword in keywords),
+                ))
+            writer.writerows(chunk)
+    return {
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - start, 2),
+        "patterns": len(patterns),
+    }
+
+
+def main(
+) -> None:
+    """
+    Generates a synthetic catalog and prints its statistics.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Example:
+    --------
+    >>> python benchmarks/synthetic_catalog.py --rows 10000000 --output benchmarks/data/catalog_10m.csv
+    ... # Writes the catalog and prints its size and generation time.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Generates a synthetic catalog in the data source schema.")
+    parser.add_argument("--rows", type=int, default=10000, help="The number of rows, e.g. 10000 to 10000000.")
+    parser.add_argument("--output", default=None, help="The CSV file. Default is benchmarks/data/catalog_<rows>.csv.")
+    parser.add_argument("--source", default="server/data_source/data.csv", help="The data source the vocabulary is extracted from.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the generator.")
+    parser.add_argument("--chunk-rows", type=int, default=100000, help="The number of rows written at once.")
+    args = parser.parse_args()
+    output = args.output or os.path.join("benchmarks", "data", f"catalog_{args.rows}.csv")
+    stats = generate_catalog(output, args.rows, args.source, args.seed, args.chunk_rows)
+    print(f"Wrote {stats['rows']} rows ({stats['bytes'] / 2 ** 20:.1f} MiB) to {output} in {stats['seconds']:.1f}s "
+          f"({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Benchmarks the memory usage, query latency and recall@k of each VectorStore encoding.
+The benchmark runs fully offline on synthetic, clustered unit vectors, so no model or data source is required.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To execute this module from the root directory, run the following command:
+    ``python benchmarks/vector_encoding.py --rows 100000 --dimensions 768 --queries 50 --k 10``
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from embedded_model.vector_store import VectorStore, ENCODINGS, top_k
+
+
+def synthetic_vectors(
+    rows: int,
+    dimensions: int,
+    clusters: int = 200,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Generates clustered unit vectors that resemble caption embeddings.
+
+    Args:
+    -----
+    rows : ``int``
+        The number of vectors to generate.
+    dimensions : ``int``
+        The dimension of each vector.
+
+    Keyword Args:
+    -------------
+    clusters : ``int``
+        The number of cluster centers the vectors are drawn around. Default is 200.
+    seed : ``int``
+        The random seed. Default is 0.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        A float32 matrix of shape (rows, dimensions) with unit L2 norm rows.
+
+    Notes:
+    ------
+    1. Real caption embeddings are highly clustered, which makes ranking harder than with uniform random vectors.
+
+    Example:
+    --------
+    >>> vectors = synthetic_vectors(1000, 768)
+
+    Author: ``@ChinaiArman``
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(
+    expected: list,
+    actual: list
+) -> float:
+    """
+    Returns the fraction of the expected ids found in the actual ids.
+    """
+    return len(set(expected) & set(actual)) / len(expected)
+
+
+def main(
+) -> None:
+    """
+    Runs the vector encoding benchmark and prints a table of the results.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The exact float32 ranking is used as the ground truth for recall@k.
+    2. Each compressed encoding is measured with and without full precision rescoring.
+    3. Latency is the median over all queries, excluding the first (warm-up) query.
+
+    Example:
+    --------
+    >>> python benchmarks/vector_encoding.py --rows 100000
+    ... # Prints memory, latency and recall@k per encoding.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the memory, latency and recall of the vector store encodings.")
+    parser.add_argument("--rows", type=int, default=100000, help="The number of catalog vectors.")
+    parser.add_argument("--dimensions", type=int, default=768, help="The dimension of the vectors.")
+    parser.add_argument("--queries", type=int, default=50, help="The number of queries to run.")
+    parser.add_argument("--k", type=int, default=10, help="The number of results per query.")
+    parser.add_argument("--rescore", type=int, default=200, help="The number of candidates to rescore in full precision.")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dimensions)
+    queries = synthetic_vectors(args.queries + 1, args.dimensions, seed=1)
+    ids = [str(i) for i in range(args.rows)]
+    truth = [[ids[i] for i in top_k(vectors @ query, args.k)] for query in queries]
+
+    print(f"{'encoding':<10}{'rescore':>9}{'memory (MB)':>14}{'p50 (ms)':>11}{f'recall@{args.k}':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        VectorStore.create(directory, ids, vectors, {"model": "synthetic"})
+        for encoding in ENCODINGS:
+            for rescore in ([0] if encoding == "float32" else [0, args.rescore]):
+                store = VectorStore(directory, encoding, rescore)
+                latencies, recalls = [], []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    result_ids, _ = store.search(query, args.k)
+                    latencies.append(time.perf_counter() - start)
+                    recalls.append(recall_at_k(expected, result_ids))
+                print(
+                    f"{encoding:<10}{rescore:>9}{store.memory_usage() / 2 ** 20:>14.1f}"
+                    f"{np.median(latencies[1:]) * 1000:>11.2f}{np.mean(recalls):>12.3f}"
+                )
+                del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Admission control of the expensive endpoints of the server, e.g. the image search with its Azure round trip and forward pass.
+Each limited endpoint serves a bounded number of requests at a time and queues a bounded number of others. A request that finds the queue
+full, or waits longer than the queue timeout, is rejected at once with a 503 and a "Retry-After" header instead of piling up server threads.
+The endpoints without a limit, e.g. GET /items/<id>, are never queued. The queue wait and the rejections are exported by the /metrics endpoint.
+
+Requirements:
+This module requires the installation of the flask library.
+The admission control is enabled unless the "ADMISSION_CONTROL" environment variable is set to "false".
+The limits are read from the "ADMISSION_LIMITS" environment variable, a comma separated list of "endpoint=concurrency:queue" entries
+where the endpoint is the name of the view function, e.g. "search_items=4:16". A request waits at most "ADMISSION_QUEUE_TIMEOUT_SECONDS"
+seconds (default 5) for a slot, and a rejected client is asked to retry after "ADMISSION_RETRY_AFTER_SECONDS" seconds (default 1).
+
+Usage:
+To limit the endpoints of a Flask app, call ``init_app(app)``. The state of the limits is returned by ``stats()``.
+To execute this module from the root directory, run the following command:
+    ``python server/admission.py``
+"""
+
+import threading
+import time
+
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+import metrics
+
+
+DEFAULT_LIMITS = "search_items=4:16,search_items_by_keywords=8:32,add_item=2:8,edit_item=2:8"
+ENABLED = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 5))
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is not admitted, with the reason ("queue_full" or "timeout").
+    """
+
+
+class ConcurrencyLimit:
+    """
+    Class to serve at most `concurrency` requests of an endpoint at a time, with at most `queue_size` others waiting.
+
+    Args:
+    -----
+    endpoint : ``str``
+        The name of the endpoint in the metrics.
+    concurrency : ``int``
+        The number of requests served at a time.
+    queue_size : ``int``
+        The number of requests waiting for a slot, 0 to reject every request beyond `concurrency`.
+
+    Keyword Args:
+    -------------
+    queue_timeout : ``float``
+        The number of seconds a request waits for a slot before it is rejected. Default is QUEUE_TIMEOUT_SECONDS.
+
+    Attributes:
+    -----------
+    active : ``int``
+        The number of requests being served.
+    queued : ``int``
+        The number of requests waiting for a slot.
+    admitted : ``int``
+        The number of requests admitted since the start.
+    rejected : ``dict``
+        The number of requests rejected since the start, by reason.
+
+    Methods:
+    --------
+    >>> acquire()
+    ... # Waits for a slot and returns the wait in seconds, or raises Overloaded.
+    >>> release()
+    ... # Frees the slot of a request.
+    >>> stats()
+    ... # Returns the limits and counts of the endpoint.
+
+    Notes:
+    ------
+    1. The queued requests are woken one at a time as slots are freed. The order in which they are admitted is not guaranteed.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        endpoint: str,
+        concurrency: int,
+        queue_size: int,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS
+    ) -> None:
+        """
+        Initializes the ConcurrencyLimit class.
+        """
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = self.queued = self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self.condition = threading.Condition()
+
+    def _reject(
+        self,
+        reason: str
+    ) -> None:
+        """
+        Counts a rejection and raises Overloaded, called with the condition held.
+        """
+        self.rejected[reason] += 1
+        metrics.ADMISSION_REJECTIONS.inc(endpoint=self.endpoint, reason=reason)
+        raise Overloaded(reason)
+
+    def acquire(
+        self
+    ) -> float:
+        """
+        Takes a slot for a request, waiting in the queue if every slot is taken.
+
+        Args:
+        -----
+        None.
+
+        Returns:
+        --------
+        ``float``
+            The number of seconds the request waited for the slot.
+
+        Raises:
+        -------
+        ``Overloaded``
+            If the queue is full, or no slot was freed within `queue_timeout` seconds.
+
+        Example:
+        --------
+        >>> limit = ConcurrencyLimit("search_items", 4, 16)
+        >>> limit.acquire()
+        ... 0.0
+
+        Author: ``@ChinaiArman``
+        """
+        start = time.perf_counter()
+        with self.condition:
+            if self.active >= self.concurrency:
+                if self.queued >= self.queue_size:
+                    self._reject("queue_full")
+                self.queued += 1
+                metrics.ADMISSION_QUEUED.inc(endpoint=self.endpoint)
+                try:
+                    admitted = self.condition.wait_for(lambda: self.active < self.concurrency, self.queue_timeout)
+                finally:
+                    self.queued -= 1
+                    metrics.ADMISSION_QUEUED.dec(endpoint=self.endpoint)
+                if not admitted:
+                    self._reject("timeout")
+            self.active += 1
+            self.admitted += 1
+        wait = time.perf_counter() - start
+        metrics.ADMISSION_ACTIVE.inc(endpoint=self.endpoint)
+        metrics.ADMISSION_QUEUE_WAIT.observe(wait, endpoint=self.endpoint)
+        return wait
+
+    def release(
+        self
+    ) -> None:
+        """
+        Frees the slot of a request and wakes the next queued request.
+        """
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+        metrics.ADMISSION_ACTIVE.dec(endpoint=self.endpoint)
+
+    def stats(
+        self
+    ) -> dict:
+        """
+        Returns the concurrency, queue size and timeout, and the active, queued, admitted and rejected requests of the endpoint.
+        """
+        with self.condition:
+            return {
+                "concurrency": self.concurrency,
+                "queue_size": self.queue_size,
+                "queue_timeout_seconds": self.queue_timeout,
+                "active": self.active,
+                "queued": self.queued,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+            }
+
+
+def parse_limits(
+    specification: str
+) -> dict:
+    """
+    Parses "endpoint=concurrency:queue" comma separated entries into a dictionary of ConcurrencyLimit by endpoint.
+
+    Args:
+    -----
+    specification : ``str``
+        The limits, e.g. "search_items=4:16,add_item=2:8".
+
+    Returns:
+    --------
+    ``dict``
+        The ConcurrencyLimit of each endpoint.
+
+    Raises:
+    -------
+    ``ValueError``
+        If an entry is malformed, or a concurrency is not positive or a queue size is negative.
+
+    Example:
+    --------
+    >>> parse_limits("search_items=4:16")["search_items"].concurrency
+    ... 4
+
+    Author: ``@ChinaiArman``
+    """
+    limits = {}
+    for entry in specification.split(","):
+        if not entry.strip():
+            continue
+        endpoint, _, values = entry.partition("=")
+        concurrency, _, queue_size = values.partition(":")
+        concurrency, queue_size = int(concurrency), int(queue_size or 0)
+        if concurrency < 1 or queue_size < 0:
+            raise ValueError(f"Invalid admission limit: {entry.strip()}")
+        limits[endpoint.strip()] = ConcurrencyLimit(endpoint.strip(), concurrency, queue_size)
+    return limits
+
+
+LIMITS = parse_limits(os.getenv("ADMISSION_LIMITS", DEFAULT_LIMITS)) if ENABLED else {}
+
+
+def stats(
+) -> dict:
+    """
+    Returns whether the admission control is enabled, the retry delay of the rejected requests and the state of each limited endpoint.
+    """
+    return {
+        "enabled": ENABLED,
+        "retry_after_seconds": RETRY_AFTER_SECONDS,
+        "endpoints": {endpoint: limit.stats() for endpoint, limit in LIMITS.items()},
+    }
+
+
+def init_app(
+    app
+) -> None:
+    """
+    Limits the concurrent requests of the limited endpoints of a Flask app.
+
+    Args:
+    -----
+    app : ``Flask``
+        The Flask app.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Nothing is registered if the admission control is disabled or no endpoint is limited.
+    2. The limits apply to every route of an endpoint, e.g. /search and /catalogs/<catalog>/search share the "search_items" slots.
+    3. A rejected request is answered by the 503 error handler of the app, with a "Retry-After" header of RETRY_AFTER_SECONDS.
+    4. The slot is freed when the request is torn down, whether it succeeded or failed.
+    5. Call this function after ``metrics.init_app(app)``, so the queue wait is counted in the request latency and the rejections in the request metrics.
+
+    Example:
+    --------
+    >>> init_app(app)
+
+    Author: ``@ChinaiArman``
+    """
+    if not LIMITS:
+        return
+    from flask import g, request
+    from werkzeug.exceptions import ServiceUnavailable
+
+    @app.before_request
+    def admit_request():
+        limit = LIMITS.get(request.endpoint)
+        if limit is None:
+            return
+        try:
+            limit.acquire()
+        except Overloaded as e:
+            raise ServiceUnavailable(f"The server is busy ({e}), retry later.", retry_after=RETRY_AFTER_SECONDS)
+        g.admission_limit = limit
+
+    @app.teardown_request
+    def release_request(exception):
+        limit = g.pop("admission_limit", None)
+        if limit is not None:
+            limit.release()
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the ConcurrencyLimit class with a burst of concurrent requests.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Twenty requests of 0.2 seconds arrive at once at an endpoint serving 2 requests at a time with 4 queued,
+       so 6 are served and 14 are rejected at once.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the outcome of every request and the stats of the endpoint.
+
+    Author: ``@ChinaiArman``
+    """
+    limit = ConcurrencyLimit("search_items", 2, 4, queue_timeout=1.0)
+    outcomes = []
+
+    def request():
+        try:
+            wait = limit.acquire()
+        except Overloaded as e:
+            outcomes.append(f"503 {e}")
+            return
+        time.sleep(0.2)
+        limit.release()
+        outcomes.append(f"200 after {wait:.2f}s in the queue")
+
+    threads = [threading.Thread(target=request) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for outcome in sorted(outcomes):
+        print(outcome)
+    print(limit.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -17,20 +17,110 @@ To execute this module from the root directory, run the following command:
     ``python server/app.py``
 """
 
-from flask import Flask, jsonify, request, abort, render_template
+from flask import Flask, Response, jsonify, request, abort, render_template, g
 from werkzeug.exceptions import BadRequest
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, validate, ValidationError
 from flask_cors import CORS
-from garment_recognizer import GarmentRecognizer
+from garment_recognizer import GarmentRecognizer, CatalogReloading
+from catalog_reload import CatalogReloader
+from catalog_registry import CatalogRegistry
+from embedded_model.sharded_search import ShardedSearch
+from data_source.attribute_index import FILTER_ATTRIBUTES
+import instrumentation
+import metrics
+import profiling
+import admission
 from torch.cuda import OutOfMemoryError
+import hmac
+import json
+import os
+import threading
+import time
 
 
 # Flask server configuration
 app = Flask(__name__, template_folder="../ui/templates", static_folder="../ui/static")
 CORS(app)
 
-# Garment recognizer instance
-garment_recognizer = GarmentRecognizer()
+# Request capture (replayed with benchmarks/replay.py)
+capture_file = open(os.getenv("REQUEST_CAPTURE_FILE"), "a", buffering=1) if os.getenv("REQUEST_CAPTURE_FILE") else None
+capture_lock = threading.Lock()
+last_arrival = None
+
+
+def capture_request(
+) -> None:
+    """
+    Appends the method, path, JSON body and inter-arrival time of the request to the capture file.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The hook is only registered if the "REQUEST_CAPTURE_FILE" environment variable is set.
+    2. Each line is a JSON object {"method", "path", "body", "interarrival"}, the inter-arrival time is in seconds since the previous captured request.
+    3. The static files, the /metrics endpoint and the /admin endpoints are not captured.
+    4. The hook is registered before the admission control, so the requests rejected with a 503 are captured too.
+
+    Example:
+    --------
+    >>> REQUEST_CAPTURE_FILE=trace.jsonl python server/app.py
+    ... # Captures every API request to trace.jsonl.
+
+    Author: ``@ChinaiArman``
+    """
+    global last_arrival
+    if request.path.startswith(("/static", "/metrics", "/admin")):
+        return
+    body = request.get_json(silent=True) if request.is_json else None
+    with capture_lock:
+        now = time.monotonic()
+        interarrival = 0.0 if last_arrival is None else now - last_arrival
+        last_arrival = now
+        capture_file.write(json.dumps({"method": request.method, "path": request.full_path.rstrip("?"), "body": body, "interarrival": round(interarrival, 6)}) + "\n")
+
+
+if capture_file is not None:
+    app.before_request(capture_request)
+
+# Request instrumentation, metrics, profiling and admission control, registered after the request capture
+instrumentation.init_app(app)
+metrics.init_app(app)
+profiling.init_app(app)
+admission.init_app(app)
+
+# Garment recognizer instance, searching the vector index through the shards of "SEARCH_SHARDS" or "SHARD_ADDRESSES" if set
+garment_recognizer = GarmentRecognizer(shards=ShardedSearch.from_env())
+metrics.CATALOG_ROWS.set_function(lambda: len(garment_recognizer.vector_store.ids))
+metrics.CATALOG_VERSION.set_function(lambda: garment_recognizer.catalog_version)
+for metric, stat in (
+    (metrics.CACHE_HITS, "hits"),
+    (metrics.CACHE_STALE_HITS, "stale_hits"),
+    (metrics.CACHE_MISSES, "misses"),
+    (metrics.CACHE_EVICTIONS, "evictions"),
+    (metrics.CACHE_BYTES, "bytes"),
+):
+    metric.set_function(lambda stat=stat: garment_recognizer.result_cache.stats()[stat])
+
+# Catalog reloads (POST /admin/reload with the "ADMIN_TOKEN" in the "ADMIN_HEADER" header, or a change of the data source file)
+catalog_reloader = CatalogReloader(garment_recognizer, float(os.getenv("CATALOG_WATCH_SECONDS", 0)))
+catalog_reloader.watch()
+ADMIN_HEADER = os.getenv("ADMIN_HEADER", "X-Admin-Token")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+RELOAD_RETRY_AFTER_SECONDS = int(os.getenv("RELOAD_RETRY_AFTER_SECONDS", 5))
+
+# Named catalogs (/catalogs/<catalog>/...), loaded on first use and sharing the embedded model of the default catalog
+catalog_registry = CatalogRegistry(
+    os.getenv("CATALOGS_DIR"),
+    int(os.getenv("CATALOG_MEMORY_BUDGET", 2 ** 30)),
+    (garment_recognizer.tokenizer, garment_recognizer.model)
+)
 
 
 # JSON VALIDATION SCHEMAS
@@ -48,6 +138,10 @@ class SemanticSearchSchema(Schema):
         The URL of the image to search for garments.
     size : ``int``
         The maximum number of items to return in the list.
+    filters : ``dict``
+        The accepted values of "retailer", "colour" or "articleType". Defaults to no filter.
+    page_size : ``int``
+        The number of items of the first page. Defaults to no pagination.
 
     Methods:
     --------
@@ -64,6 +158,8 @@ class SemanticSearchSchema(Schema):
 
     url = fields.Str(required=True)
     size = fields.Int(required=True, strict=True)
+    filters = fields.Dict(keys=fields.Str(validate=validate.OneOf(FILTER_ATTRIBUTES)), values=fields.List(fields.Str()), load_default=None)
+    page_size = fields.Int(strict=True, load_default=None, validate=validate.Range(min=1))
 
 
 class KeywordSearchSchema(Schema):
@@ -80,6 +176,12 @@ class KeywordSearchSchema(Schema):
         A list of keywords to search for garments.
     size : ``int``
         The maximum number of items to return in the list.
+    mode : ``str``
+        The search mode, one of "semantic", "lexical" or "hybrid". Defaults to "semantic".
+    filters : ``dict``
+        The accepted values of "retailer", "colour" or "articleType". Defaults to no filter.
+    page_size : ``int``
+        The number of items of the first page. Defaults to no pagination.
 
     Methods:
     --------
@@ -96,6 +198,40 @@ class KeywordSearchSchema(Schema):
 
     keywords = fields.List(fields.Str(), required=True)
     size = fields.Int(required=True, strict=True)
+    mode = fields.Str(load_default="semantic", validate=validate.OneOf(["semantic", "lexical", "hybrid"]))
+    filters = fields.Dict(keys=fields.Str(validate=validate.OneOf(FILTER_ATTRIBUTES)), values=fields.List(fields.Str()), load_default=None)
+    page_size = fields.Int(strict=True, load_default=None, validate=validate.Range(min=1))
+
+
+class PageSchema(Schema):
+    """
+    Class to validate the request body for the following pages of a paginated search.
+
+    Args:
+    -----
+    None.
+
+    Attributes:
+    -----------
+    cursor : ``str``
+        The cursor returned with the previous page.
+    page_size : ``int``
+        The number of items of the page. Defaults to the page size of the first request.
+
+    Methods:
+    --------
+    >>> load(request.json)
+    ... # Validates the request body for the following pages of a paginated search.
+
+    Notes:
+    ------
+    1. The schema is used by both search endpoints when the request body contains a cursor.
+
+    Author: ``@ChinaiArman``
+    """
+
+    cursor = fields.Str(required=True)
+    page_size = fields.Int(strict=True, load_default=None, validate=validate.Range(min=1))
 
 
 class AddGarmentSchema(Schema):
@@ -162,6 +298,118 @@ class EditGarmentSchema(AddGarmentSchema):
     id = fields.Str(required=True)
 
 
+class SimilarItemsSchema(Schema):
+    """
+    Class to validate the query string of the similar items endpoint.
+
+    Args:
+    -----
+    None.
+
+    Attributes:
+    -----------
+    size : ``int``
+        The maximum number of items to return in the list.
+
+    Methods:
+    --------
+    >>> load(request.args)
+    ... # Validates the query string of the similar items endpoint.
+
+    Notes:
+    ------
+    1. The size is parsed from the query string, so it is not validated strictly.
+
+    Author: ``@ChinaiArman``
+    """
+
+    size = fields.Int(required=True, validate=validate.Range(min=1))
+
+
+# CONTENT NEGOTIATION
+def accepts_ndjson(
+) -> bool:
+    """
+    Checks whether the client prefers newline delimited JSON over a JSON document.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``bool``
+        True if the Accept header ranks "application/x-ndjson" above "application/json".
+
+    Notes:
+    ------
+    1. Clients that accept any type (*/*) receive a JSON document.
+
+    Example:
+    --------
+    >>> client.post("/keyword_search", json=body, headers={"Accept": "application/x-ndjson"})
+    ... # The route streams one garment per line.
+
+    Author: ``@ChinaiArman``
+    """
+    return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+
+# CATALOGS
+def get_recognizer(
+    catalog: str = None
+) -> GarmentRecognizer:
+    """
+    Returns the recognizer of the catalog targeted by a request.
+
+    Args:
+    -----
+    catalog : ``str``
+        The name of the catalog, None for the default catalog.
+
+    Returns:
+    --------
+    ``GarmentRecognizer``
+        The recognizer of the catalog.
+
+    Raises:
+    -------
+    ``404``
+        If the named catalog does not exist.
+
+    Notes:
+    ------
+    1. A named catalog is loaded on its first request, and again after it has been evicted to keep the catalogs within their memory budget.
+    2. The function must be called outside the try blocks of the routes, so the 404 is not turned into a 500.
+    3. A named catalog is held until the request is torn down (see release_catalogs), so it is not evicted while the request uses it.
+
+    Example:
+    --------
+    >>> get_recognizer("hm").get_items_by_keywords(["black shirt"], 5)
+
+    Author: ``@ChinaiArman``
+    """
+    if catalog is None:
+        return garment_recognizer
+    try:
+        recognizer = catalog_registry.get(catalog)
+    except KeyError:
+        abort(404, description=f"Catalog '{catalog}' not found.")
+    g.setdefault("catalogs", []).append(catalog)
+    return recognizer
+
+
+@app.teardown_request
+def release_catalogs(
+    exception: Exception
+) -> None:
+    """
+    Releases the named catalogs held by a request, whether it succeeded or failed.
+    """
+    for catalog in g.pop("catalogs", []):
+        catalog_registry.release(catalog)
+
+
 # ERROR HANDLERS
 @app.errorhandler(400)
 def bad_request(
@@ -265,6 +513,109 @@ def internal_server_error(
     return {"Error": str(e)}, 500
 
 
+@app.errorhandler(403)
+def forbidden(
+    e: Exception,
+) -> tuple:
+    """
+    Forbidden error handler.
+
+    Args:
+    -----
+    e : ``Exception``
+        The exception raised.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the error message and the error code.
+
+    Notes:
+    ------
+    1. The function returns a tuple containing the error message and a 403 status code.
+    2. The error message is extracted from the exception and converted to a string.
+
+    Example:
+    --------
+    >>> e = Exception("Forbidden.")
+    >>> response = forbidden(e)
+    >>> print(response)
+    ... # {'Error': 'Forbidden.'}
+
+    Author: ``@ChinaiArman``
+    """
+    return {"Error": str(e)}, 403
+
+
+@app.errorhandler(409)
+def conflict(
+    e: Exception,
+) -> tuple:
+    """
+    Conflict error handler.
+
+    Args:
+    -----
+    e : ``Exception``
+        The exception raised.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the error message and the error code.
+
+    Notes:
+    ------
+    1. The function returns a tuple containing the error message and a 409 status code.
+    2. The error message is extracted from the exception and converted to a string.
+
+    Example:
+    --------
+    >>> e = Exception("Conflict.")
+    >>> response = conflict(e)
+    >>> print(response)
+    ... # {'Error': 'Conflict.'}
+
+    Author: ``@ChinaiArman``
+    """
+    return {"Error": str(e)}, 409
+
+
+@app.errorhandler(503)
+def service_unavailable(
+    e: Exception,
+) -> tuple:
+    """
+    Service unavailable error handler.
+
+    Args:
+    -----
+    e : ``Exception``
+        The exception raised.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the error message, the error code and the "Retry-After" header.
+
+    Notes:
+    ------
+    1. The function returns a tuple containing the error message, a 503 status code and the headers.
+    2. The requests rejected by the admission control are retried after the number of seconds of the "Retry-After" header.
+
+    Example:
+    --------
+    >>> e = ServiceUnavailable("The server is busy.", retry_after=1)
+    >>> response = service_unavailable(e)
+    >>> print(response)
+    ... # ({'Error': '503 Service Unavailable: The server is busy.'}, 503, {'Retry-After': '1'})
+
+    Author: ``@ChinaiArman``
+    """
+    retry_after = getattr(e, "retry_after", None)
+    return {"Error": str(e)}, 503, {"Retry-After": str(retry_after)} if retry_after is not None else {}
+
+
 @app.errorhandler(405)
 def method_not_allowed(
     e: Exception,
@@ -331,14 +682,17 @@ def root(
 
 
 @app.route("/search", methods=["POST"])
+@app.route("/catalogs/<catalog>/search", methods=["POST"])
 def search_items(
+    catalog: str = None
 ) -> tuple:
     """
     Searches for garments by image from url.
 
     Args:
     -----
-    None.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
 
     Request Body:
     -------------
@@ -346,16 +700,26 @@ def search_items(
         The URL of the image to search for garments.
     size : ``int``
         The maximum number of items to return in the list.
+    filters : ``dict``
+        The accepted values of "retailer", "colour" or "articleType" (optional), e.g. {"retailer": ["hm"], "colour": ["black"]}.
+    page_size : ``int``
+        The number of garments of the first page (optional), which paginates the `size` results.
+    cursor : ``str``
+        The cursor of a following page, sent instead of the search parameters.
     
     Returns:
     --------
     ``tuple``
         A list of matching garments in JSON format and a 200 status code.
+        With pagination, an object with the "items" of the page and the "cursor" of the next page.
+        With an "Accept: application/x-ndjson" header and no pagination, a stream of one garment per line.
     
     Notes:
     ------
     1. The function retrieves garments that match the provided image using the GarmentRecognizer.
     2. If the image URL is not provided, it aborts with a 400 status code and an error message.
+    3. With filters, only the garments matching every filter are ranked.
+    4. The following pages are served from the ranking stored by the first page, the cursor expires after a few minutes.
 
     Example:
     --------
@@ -365,11 +729,18 @@ def search_items(
 
     Author: ``@cc-dev-65535``
     """
+    recognizer = get_recognizer(catalog)
     try:
-        data = SemanticSearchSchema().load(request.json)
-        response = garment_recognizer.get_item_by_semantic_search(
-            data["url"], data["size"]
-        )
+        stream = False
+        if isinstance(request.json, dict) and "cursor" in request.json:
+            data = PageSchema().load(request.json)
+            response = recognizer.get_page(data["cursor"], data["page_size"])
+        else:
+            data = SemanticSearchSchema().load(request.json)
+            stream = accepts_ndjson() and data["page_size"] is None
+            response = recognizer.get_item_by_semantic_search(
+                data["url"], data["size"], data["filters"], data["page_size"], stream
+            )
     except BadRequest:
         abort(
             400,
@@ -378,18 +749,22 @@ def search_items(
     except ValidationError:
         abort(
             400,
-            description="Invalid request format. Please provide 'url' and 'size' in the request body.",
+            description="Invalid request format. Please provide 'url' and 'size' in the request body, and optional 'filters' on 'retailer', 'colour' or 'articleType'.",
         )
     except OutOfMemoryError:
         abort(500, description="Out of memory error.")
     except Exception as e:
         abort(500, description=str(e))
-    return jsonify(response), 200
+    if response is None:
+        abort(404, description="The cursor is invalid or has expired.")
+    return Response(response, mimetype="application/x-ndjson" if stream else "application/json"), 200
 
 
 @app.route("/items/<id>", methods=["GET"])
+@app.route("/catalogs/<catalog>/items/<id>", methods=["GET"])
 def get_item_by_id(
-    id: str
+    id: str,
+    catalog: str = None
 ) -> tuple:
     """
     Retrieves a garment by its ID.
@@ -398,6 +773,8 @@ def get_item_by_id(
     -----
     id : ``str``
         The ID of the garment to retrieve.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
 
     Returns:
     --------
@@ -417,39 +794,113 @@ def get_item_by_id(
 
     Author: ``@nataliecly``
     """
+    recognizer = get_recognizer(catalog)
     try:
-        response = garment_recognizer.get_item_by_id(id)
+        response = recognizer.get_item_by_id(id)
         if response is None:
             raise Exception("Garment not found.")
     except Exception as e:
         abort(404, description=str(e))
-    return jsonify(response), 200
+    return Response(response, mimetype="application/json"), 200
+
+
+@app.route("/items/<id>/similar", methods=["GET"])
+@app.route("/catalogs/<catalog>/items/<id>/similar", methods=["GET"])
+def get_similar_items(
+    id: str,
+    catalog: str = None
+) -> tuple:
+    """
+    Retrieves the garments most similar to a garment of the catalog.
+
+    Args:
+    -----
+    id : ``str``
+        The ID of the garment.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
+
+    Query Parameters:
+    -----------------
+    size : ``int``
+        The maximum number of items to return in the list.
+
+    Returns:
+    --------
+    ``tuple``
+        A list of similar garments in JSON format and a 200 status code.
+
+    Notes:
+    ------
+    1. The function ranks the catalog against the stored embedding of the garment, without calling the captioning or embedded models.
+    2. The garment itself is excluded from the list.
+    3. If the garment is not found, it aborts with a 404 status code and an error message.
+
+    Example:
+    --------
+    >>> response = client.get("/items/1/similar?size=5")
+    >>> print(response.json)
+    ... # Prints the 5 garments most similar to the garment with ID 1 in JSON format.
+
+    Author: ``@ChinaiArman``
+    """
+    recognizer = get_recognizer(catalog)
+    try:
+        data = SimilarItemsSchema().load(request.args)
+        response = recognizer.get_similar_items(id, data["size"])
+    except ValidationError:
+        abort(
+            400,
+            description="Invalid request format. Please provide a positive 'size' in the query string.",
+        )
+    except Exception as e:
+        abort(500, description=str(e))
+    if response is None:
+        abort(404, description="Garment not found.")
+    return Response(response, mimetype="application/json"), 200
 
 
 @app.route("/keyword_search", methods=["POST"])
+@app.route("/catalogs/<catalog>/keyword_search", methods=["POST"])
 def search_items_by_keywords(
+    catalog: str = None
 ) -> tuple:
     """
     Searches for garments by keywords.
 
     Args:
     -----
-    None.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
 
     Request Body:
     -------------
     keywords : ``list``
         A list of keywords to search for garments.
+    size : ``int``
+        The maximum number of items to return in the list.
+    mode : ``str``
+        The search mode, one of "semantic", "lexical" or "hybrid" (optional, defaults to "semantic").
+    filters : ``dict``
+        The accepted values of "retailer", "colour" or "articleType" (optional), e.g. {"articleType": ["shirt"]}.
+    page_size : ``int``
+        The number of garments of the first page (optional), which paginates the `size` results.
+    cursor : ``str``
+        The cursor of a following page, sent instead of the search parameters.
 
     Returns:
     --------
     ``tuple``
         A list of matching garments in JSON format and a 200 status code.
+        With pagination, an object with the "items" of the page and the "cursor" of the next page.
+        With an "Accept: application/x-ndjson" header and no pagination, a stream of one garment per line.
 
     Notes:
     ------
     1. The function retrieves garments that match the provided keywords using the GarmentRecognizer.
     2. If the keywords are not provided, it aborts with a 400 status code and an error message.
+    3. With filters, only the garments matching every filter are ranked.
+    4. The following pages are served from the ranking stored by the first page, the cursor expires after a few minutes.
 
     Example:
     --------
@@ -459,11 +910,18 @@ def search_items_by_keywords(
 
     Author: ``@ChinaiArman``
     """
+    recognizer = get_recognizer(catalog)
     try:
-        data = KeywordSearchSchema().load(request.json)
-        response = garment_recognizer.get_items_by_keywords(
-            data["keywords"], data["size"]
-        )
+        stream = False
+        if isinstance(request.json, dict) and "cursor" in request.json:
+            data = PageSchema().load(request.json)
+            response = recognizer.get_page(data["cursor"], data["page_size"])
+        else:
+            data = KeywordSearchSchema().load(request.json)
+            stream = accepts_ndjson() and data["page_size"] is None
+            response = recognizer.get_items_by_keywords(
+                data["keywords"], data["size"], data["mode"], data["filters"], data["page_size"], stream
+            )
     except BadRequest:
         abort(
             400,
@@ -472,24 +930,29 @@ def search_items_by_keywords(
     except ValidationError:
         abort(
             400,
-            description="Invalid request format. Please provide 'keywords' and 'size' in the request body.",
+            description="Invalid request format. Please provide 'keywords' and 'size' in the request body, an optional 'mode' of 'semantic', 'lexical' or 'hybrid', and optional 'filters' on 'retailer', 'colour' or 'articleType'.",
         )
     except OutOfMemoryError:
         abort(500, description="Out of memory error.")
     except Exception as e:
         abort(500, description=str(e))
-    return jsonify(response), 200
+    if response is None:
+        abort(404, description="The cursor is invalid or has expired.")
+    return Response(response, mimetype="application/x-ndjson" if stream else "application/json"), 200
 
 
 @app.route("/add_item", methods=["POST"])
+@app.route("/catalogs/<catalog>/add_item", methods=["POST"])
 def add_item(
+    catalog: str = None
 ) -> tuple:
     """
     Adds a new garment to the database.
 
     Args:
     -----
-    None.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
 
     Request Body:
     -------------
@@ -519,9 +982,10 @@ def add_item(
 
     Author: ``@levxxvi``
     """
+    recognizer = get_recognizer(catalog)
     try:
         data = AddGarmentSchema().load(request.json)
-        response = garment_recognizer.insert_row(data)
+        response = recognizer.insert_row(data)
     except BadRequest:
         abort(
             400,
@@ -532,14 +996,18 @@ def add_item(
             400,
             description="Invalid request format. Please provide the new item details in the request body.",
         )
+    except CatalogReloading as e:
+        abort(503, description=str(e), retry_after=RELOAD_RETRY_AFTER_SECONDS)
     except Exception as e:
         abort(500, description=str(e))
     return jsonify(response), 201
 
 
 @app.route("/items/<id>", methods=["DELETE"])
+@app.route("/catalogs/<catalog>/items/<id>", methods=["DELETE"])
 def delete_item(
-    id : str
+    id : str,
+    catalog: str = None
 ) -> tuple:
     """
     Deletes a garment by its ID.
@@ -548,6 +1016,8 @@ def delete_item(
     -----
     id : ``str``
         The ID of the garment to delete.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
 
     Returns:
     --------
@@ -568,23 +1038,29 @@ def delete_item(
 
     Author: ``@Ehsan138``
     """
+    recognizer = get_recognizer(catalog)
     try:
-        response = garment_recognizer.delete_row(id)
+        response = recognizer.delete_row(id)
         if not response:
             abort(400, description="Garment not found.")
+    except CatalogReloading as e:
+        abort(503, description=str(e), retry_after=RELOAD_RETRY_AFTER_SECONDS)
     except Exception as e:
         abort(500, description=str(e))
     return jsonify({"message": "Garment deleted successfully"}), 204
 
 @app.route("/edit_item", methods=["PUT"])
+@app.route("/catalogs/<catalog>/edit_item", methods=["PUT"])
 def edit_item(
+    catalog: str = None
 ) -> tuple:
     """
     Edits a garment in the database.
 
     Args:
     -----
-    None.
+    catalog : ``str``
+        The name of the catalog, from the /catalogs/<catalog> routes. Default is None, which uses the default catalog.
 
     Request Body:
     -------------
@@ -615,9 +1091,10 @@ def edit_item(
 
     Author: ``@levxxvi``
     """
+    recognizer = get_recognizer(catalog)
     try:
         data = EditGarmentSchema().load(request.json)
-        response = garment_recognizer.edit_row(data["id"], data)
+        response = recognizer.edit_row(data["id"], data)
     except BadRequest:
         abort(
             400,
@@ -628,10 +1105,292 @@ def edit_item(
             400,
             description="Invalid request format. Please provide the item details in the request body.",
         )
+    except CatalogReloading as e:
+        abort(503, description=str(e), retry_after=RELOAD_RETRY_AFTER_SECONDS)
     except Exception as e:
         abort(500, description=str(e))
     return jsonify(response), 201
 
 
+@app.route("/admin/cache", methods=["GET"])
+def get_cache_stats(
+) -> tuple:
+    """
+    Retrieves the statistics of the search result cache.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The cache statistics and catalog version in JSON format and a 200 status code.
+
+    Notes:
+    ------
+    1. The statistics include the number of entries, their size in bytes, the hits, stale hits, misses, evictions and hit rate.
+
+    Example:
+    --------
+    >>> response = client.get("/admin/cache")
+    >>> print(response.json["hit_rate"])
+    ... 0.75
+
+    Author: ``@ChinaiArman``
+    """
+    return jsonify({**garment_recognizer.result_cache.stats(), "catalog_version": garment_recognizer.catalog_version}), 200
+
+
+@app.route("/admin/catalogs", methods=["GET"])
+def get_catalogs(
+) -> tuple:
+    """
+    Retrieves the residency and load statistics of the named catalogs.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The memory budget and use, and the statistics of every catalog, in JSON format and a 200 status code.
+
+    Notes:
+    ------
+    1. Each catalog has whether it is loaded, and once loaded its rows, estimated memory, last load time, load and eviction counts and last use.
+
+    Example:
+    --------
+    >>> response = client.get("/admin/catalogs")
+    >>> print(response.json["catalogs"]["hm"]["resident"])
+    ... True
+
+    Author: ``@ChinaiArman``
+    """
+    return jsonify(catalog_registry.stats()), 200
+
+
+@app.route("/admin/shards", methods=["GET"])
+def get_shards(
+) -> tuple:
+    """
+    Retrieves the state of the search shards.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The timeout, the number of rows loaded by the shards and the address, rows and state of every shard, in JSON format and a 200 status code.
+
+    Raises:
+    -------
+    ``404``
+        If the search is not sharded.
+
+    Notes:
+    ------
+    1. A shard that is not loaded is left out of the searches until the shards are refreshed, after the next write or within 10 seconds.
+
+    Example:
+    --------
+    >>> response = client.get("/admin/shards")
+    >>> print(response.json["shards"][0]["loaded"])
+    ... True
+
+    Author: ``@ChinaiArman``
+    """
+    if garment_recognizer.shards is None:
+        abort(404, description="The search is not sharded.")
+    return jsonify(garment_recognizer.shards.status()), 200
+
+
+@app.route("/admin/admission", methods=["GET"])
+def get_admission(
+) -> tuple:
+    """
+    Retrieves the state of the admission control of the expensive endpoints.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        Whether the admission control is enabled, the retry delay and the state of each limited endpoint, in JSON format and a 200 status code.
+
+    Notes:
+    ------
+    1. Each endpoint has its concurrency, queue size and timeout, and its active, queued, admitted and rejected requests.
+    2. The distribution of the queue wait is exported by GET /metrics as "admission_queue_wait_seconds", to tune the limits.
+
+    Example:
+    --------
+    >>> response = client.get("/admin/admission")
+    >>> print(response.json["endpoints"]["search_items"]["rejected"])
+    ... {'queue_full': 0, 'timeout': 0}
+
+    Author: ``@ChinaiArman``
+    """
+    return jsonify(admission.stats()), 200
+
+
+@app.route("/admin/reload", methods=["POST"])
+def reload_catalog(
+) -> tuple:
+    """
+    Starts a reload of the catalog from the data source file.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The reload status in JSON format and a 202 status code.
+
+    Raises:
+    -------
+    ``403``
+        If the "ADMIN_HEADER" header of the request does not match the "ADMIN_TOKEN" environment variable.
+    ``404``
+        If no "ADMIN_TOKEN" is set, which disables the endpoint.
+    ``409``
+        If a reload is already running.
+
+    Notes:
+    ------
+    1. The catalog and its indexes are rebuilt in the background while the current catalog keeps serving the requests, then swapped in at once.
+    2. The inserts, edits and deletes are rejected with a 503 and a "Retry-After" header of "RELOAD_RETRY_AFTER_SECONDS" until the reload is done.
+       The progress is read from GET /admin/reload.
+    3. The token is compared in constant time, so its value cannot be guessed from the response times.
+
+    Example:
+    --------
+    >>> response = client.post("/admin/reload", headers={"X-Admin-Token": os.getenv("ADMIN_TOKEN")})
+    >>> print(response.json["running"])
+    ... True
+
+    Author: ``@ChinaiArman``
+    """
+    if not ADMIN_TOKEN:
+        abort(404, description="Catalog reloads through the API are disabled.")
+    token = request.headers.get(ADMIN_HEADER)
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        abort(403, description="Invalid admin token.")
+    if not catalog_reloader.reload("admin"):
+        abort(409, description="A catalog reload is already running.")
+    return jsonify(catalog_reloader.status()), 202
+
+
+@app.route("/admin/reload", methods=["GET"])
+def get_reload_status(
+) -> tuple:
+    """
+    Retrieves the status of the catalog reloads.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The reload status in JSON format and a 200 status code.
+
+    Notes:
+    ------
+    1. The status has whether a reload is running, whether the data source file is watched, the served catalog version,
+       and the trigger, start time, duration, version, row count and error of the last reload.
+
+    Example:
+    --------
+    >>> response = client.get("/admin/reload")
+    >>> print(response.json["last_reload"]["seconds"])
+    ... 12.8
+
+    Author: ``@ChinaiArman``
+    """
+    return jsonify(catalog_reloader.status()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics(
+) -> tuple:
+    """
+    Retrieves the metrics of the server in the Prometheus text exposition format.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The metrics as plain text and a 200 status code.
+
+    Notes:
+    ------
+    1. The metrics include the request counters and latency histograms per route, the latency histograms per pipeline stage,
+       the in-flight requests, the embedding batch sizes, the catalog row count, version and reloads, and the search result cache counters.
+    2. The metrics are aggregated in process, so each server process exports its own metrics.
+
+    Example:
+    --------
+    >>> response = client.get("/metrics")
+    >>> print(response.text)
+    ... # HELP http_requests_total Number of HTTP requests.
+    ... # TYPE http_requests_total counter
+    ... http_requests_total{route="/keyword_search",method="POST",status="200"} 3
+
+    Author: ``@ChinaiArman``
+    """
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE), 200
+
+
+@app.route("/admin/profiles", methods=["GET"])
+def get_profiles(
+) -> tuple:
+    """
+    Lists the recent profiling dumps.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``tuple``
+        The dumps, most recent first, in JSON format and a 200 status code.
+
+    Raises:
+    -------
+    ``404``
+        If the profiling is disabled.
+
+    Notes:
+    ------
+    1. Each dump has its name, size in bytes, creation time and whether an allocation report exists.
+    2. A request is profiled when it carries the "PROFILING_HEADER" header with the "PROFILING_TOKEN" value, or when it is sampled.
+
+    Example:
+    --------
+    >>> response = client.get("/admin/profiles")
+    >>> print(response.json[0]["name"])
+    ... 20240101-120000-123456-POST-search-812ms.prof
+
+    Author: ``@ChinaiArman``
+    """
+    if not profiling.ENABLED:
+        abort(404, description="Profiling is disabled.")
+    return jsonify(profiling.list_dumps()), 200
+
+
 if __name__ == "__main__":
     app.run(debug=True, threaded=True)
@@ -0,0 +1,380 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Serves several named catalogs, e.g. one per retailer, from the data source files of a directory.
+A catalog and its vector index are loaded on the first request that targets it, and the least recently used catalogs
+are evicted from memory when the loaded catalogs exceed a memory budget. Every catalog shares the embedded model of the server.
+
+Requirements:
+This module has no third party requirements.
+The catalogs are the "<name>.csv" and "<name>.arrow" files of the "CATALOGS_DIR" directory,
+kept within "CATALOG_MEMORY_BUDGET" bytes (default 1 GiB).
+
+Usage:
+To use this class, create a CatalogRegistry with the directory, the memory budget and the embedded model, and call its get method with a catalog name.
+To execute this module from the root directory, run the following command:
+    ``python server/catalog_registry.py``
+"""
+
+from collections import OrderedDict
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+import metrics
+
+
+CATALOG_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+CATALOG_EXTENSIONS = (".csv", ".arrow")
+
+
+class CatalogRegistry:
+    """
+    Class to load named catalogs lazily and keep the recently used ones in memory within a budget.
+
+    Args:
+    -----
+    directory : ``str``
+        The directory of the data source files of the catalogs, or None for no named catalogs.
+    memory_budget : ``int``
+        The number of bytes the loaded catalogs are kept within.
+
+    Keyword Args:
+    -------------
+    embedded_model : ``tuple``
+        The tokenizer and model shared by the catalogs. Default is None, which loads the embedded model for each catalog.
+    factory : ``callable``
+        The function creating the recognizer of a catalog from its file path and the embedded model. Default is GarmentRecognizer.
+
+    Attributes:
+    -----------
+    resident : ``OrderedDict``
+        The recognizers of the loaded catalogs, least recently used first.
+    records : ``dict``
+        The rows, memory, load time, load and eviction counts and last use of every catalog loaded since the start.
+    in_use : ``dict``
+        The number of requests holding the recognizer of each loaded catalog, from `get` to `release`.
+    measured : ``dict``
+        The version and the measured memory of the snapshot of each loaded catalog.
+    lock : ``threading.Lock``
+        The lock guarding `resident`, `records`, `in_use` and `load_locks`, held only to look up, insert, release or evict a catalog.
+    load_locks : ``dict``
+        The lock of each catalog requested since the start, held while it is loaded so it is loaded once.
+
+    Raises:
+    -------
+    ``KeyError``
+        If a requested catalog has no data source file.
+
+    Methods:
+    --------
+    >>> names()
+    ... # Returns the names of the catalogs of the directory.
+    >>> get(name)
+    ... # Returns the recognizer of a catalog, loading it if needed.
+    >>> release(name)
+    ... # Releases the recognizer of a catalog returned by get.
+    >>> stats()
+    ... # Returns the residency and load statistics of the catalogs.
+
+    Notes:
+    ------
+    1. The memory of a catalog is estimated from its data source, indexes, rendered rows and cached results.
+       The full precision vectors are memory-mapped and not counted.
+    2. After each load and each release, the catalogs are measured again and the least recently used ones are evicted until the loaded ones fit the budget.
+       The catalog just loaded, or else the most recently used one, is never evicted, even if it alone exceeds the budget.
+       Different catalogs are loaded concurrently, so the loaded ones may exceed the budget until the last of the loads is done.
+    3. Only idle catalogs are evicted: a catalog held by a request stays loaded until it is released, so no request
+       writes to a recognizer that a later request no longer sees.
+    4. The snapshot of a catalog is only measured again after a write or reload changed its version, its cached results at every release.
+    5. The writes to a catalog are saved to its files, so they survive its eviction.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        directory: str,
+        memory_budget: int,
+        embedded_model: tuple = None,
+        factory: callable = None
+    ) -> None:
+        """
+        Initializes the CatalogRegistry class.
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.embedded_model = embedded_model
+        self.factory = factory
+        self.resident = OrderedDict()
+        self.records = {}
+        self.in_use = {}
+        self.measured = {}
+        self.lock = threading.Lock()
+        self.load_locks = {}
+
+    def file_path(
+        self,
+        name: str
+    ) -> str:
+        """
+        Returns the data source file of a catalog, or None if the name is invalid or the catalog does not exist.
+        """
+        if self.directory is None or not CATALOG_NAME_PATTERN.match(name):
+            return None
+        for extension in CATALOG_EXTENSIONS:
+            path = os.path.join(self.directory, name + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def names(
+        self
+    ) -> list:
+        """
+        Returns the sorted names of the catalogs of the directory.
+        """
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        names = {os.path.splitext(entry)[0] for entry in os.listdir(self.directory) if entry.endswith(CATALOG_EXTENSIONS)}
+        return sorted(name for name in names if CATALOG_NAME_PATTERN.match(name))
+
+    def _memory_usage(
+        self,
+        name: str,
+        recognizer
+    ) -> int:
+        """
+        Returns the estimated number of bytes used by the catalog of a recognizer, measuring its snapshot again only if its version changed.
+        """
+        version, snapshot_bytes = self.measured.get(name, (None, 0))
+        if version != recognizer.catalog_version:
+            version, snapshot_bytes = recognizer.catalog_version, recognizer.snapshot.memory_usage()
+            self.measured[name] = (version, snapshot_bytes)
+        return snapshot_bytes + recognizer.result_cache.stats()["bytes"]
+
+    def _load(
+        self,
+        name: str,
+        file_path: str
+    ):
+        """
+        Loads a catalog and records its load time.
+        """
+        if self.factory is None:
+            from garment_recognizer import GarmentRecognizer
+            self.factory = GarmentRecognizer
+        start = time.perf_counter()
+        recognizer = self.factory(file_path, self.embedded_model)
+        seconds = time.perf_counter() - start
+        metrics.CATALOG_LOAD_DURATION.observe(seconds, catalog=name)
+        with self.lock:
+            record = self.records.setdefault(name, {"loads": 0, "evictions": 0})
+            record.update(loads=record["loads"] + 1, load_seconds=seconds, loaded_at=time.time())
+        return recognizer
+
+    def _evict(
+        self,
+        keep: str = None
+    ) -> None:
+        """
+        Measures the loaded catalogs and evicts the least recently used idle ones until they fit the budget, except `keep`,
+        by default the most recently used one.
+        """
+        with self.lock:
+            resident = list(self.resident.items())
+        memory = {name: self._memory_usage(name, recognizer) for name, recognizer in resident}
+        with self.lock:
+            for name, usage in memory.items():
+                if name in self.resident:
+                    self.records[name]["memory_bytes"] = usage
+                    metrics.CATALOG_MEMORY.set(usage, catalog=name)
+            total = sum(memory[name] for name in self.resident if name in memory)
+            keep = keep or next(reversed(self.resident), None)
+            for name in list(self.resident):
+                if total <= self.memory_budget:
+                    break
+                if name == keep or self.in_use.get(name):
+                    continue
+                del self.resident[name]
+                self.measured.pop(name, None)
+                total -= memory.get(name, 0)
+                self.records[name]["evictions"] += 1
+                self.records[name]["memory_bytes"] = 0
+                metrics.CATALOG_EVICTIONS.inc(catalog=name)
+                metrics.CATALOG_RESIDENT.set(0, catalog=name)
+                metrics.CATALOG_MEMORY.set(0, catalog=name)
+
+    def get(
+        self,
+        name: str
+    ):
+        """
+        Returns the recognizer of a catalog, loading it on first use or after its eviction, and holds it until `release` is called.
+
+        Args:
+        -----
+        name : ``str``
+            The name of the catalog, the name of its data source file without the extension.
+
+        Returns:
+        --------
+        ``GarmentRecognizer``
+            The recognizer serving the catalog.
+
+        Raises:
+        -------
+        ``KeyError``
+            If the catalog has no data source file.
+
+        Notes:
+        ------
+        1. A loaded catalog is returned without waiting for any load, and a catalog is loaded without waiting for the loads of other catalogs.
+        2. Requests for a catalog being loaded wait for its load instead of loading it again.
+        3. The catalog is not evicted until every `get` of it is matched by a `release`.
+
+        Example:
+        --------
+        >>> registry = CatalogRegistry("catalogs", 2 ** 30, (tokenizer, model))
+        >>> registry.get("hm").get_items_by_keywords(["black shirt"], 5)
+        >>> registry.release("hm")
+
+        Author: ``@ChinaiArman``
+        """
+        with self.lock:
+            recognizer = self.resident.get(name)
+            if recognizer is not None:
+                self.resident.move_to_end(name)
+                self.records[name]["last_used"] = time.time()
+                self.in_use[name] = self.in_use.get(name, 0) + 1
+                return recognizer
+        file_path = self.file_path(name)
+        if file_path is None:
+            raise KeyError(name)
+        with self.lock:
+            load_lock = self.load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            with self.lock:
+                recognizer = self.resident.get(name)
+                if recognizer is not None:
+                    self.in_use[name] = self.in_use.get(name, 0) + 1
+            if recognizer is None:
+                recognizer = self._load(name, file_path)
+                with self.lock:
+                    self.resident[name] = recognizer
+                    self.records[name]["rows"] = len(recognizer.vector_store.ids)
+                    self.in_use[name] = self.in_use.get(name, 0) + 1
+                metrics.CATALOG_RESIDENT.set(1, catalog=name)
+                self._evict(name)
+        with self.lock:
+            if name in self.resident:
+                self.resident.move_to_end(name)
+            self.records[name]["last_used"] = time.time()
+        return recognizer
+
+    def release(
+        self,
+        name: str
+    ) -> None:
+        """
+        Releases the recognizer of a catalog returned by `get`, and evicts the idle catalogs if the loaded ones exceed the budget.
+
+        Args:
+        -----
+        name : ``str``
+            The name of the catalog.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. The catalogs are measured again, so the growth of their cached results and their writes count towards the budget.
+
+        Example:
+        --------
+        >>> recognizer = registry.get("hm")
+        >>> registry.release("hm")
+
+        Author: ``@ChinaiArman``
+        """
+        with self.lock:
+            self.in_use[name] -= 1
+            if not self.in_use[name]:
+                del self.in_use[name]
+        self._evict()
+
+    def stats(
+        self
+    ) -> dict:
+        """
+        Returns the memory budget and use, and the residency, requests in flight, rows, memory, load time, loads, evictions and last use of every catalog.
+        """
+        names = self.names()
+        with self.lock:
+            catalogs = {
+                name: {"resident": name in self.resident, "in_use": self.in_use.get(name, 0), **self.records.get(name, {"loads": 0, "evictions": 0})}
+                for name in sorted(set(names) | set(self.records))
+            }
+        return {
+            "memory_budget": self.memory_budget,
+            "memory_bytes": sum(catalog.get("memory_bytes", 0) for catalog in catalogs.values() if catalog["resident"]),
+            "catalogs": catalogs,
+        }
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the CatalogRegistry class with stand-in catalogs.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Three catalog files are created in a temporary directory and served by stand-in recognizers of 400 bytes each,
+       so a budget of 1000 bytes keeps two of them loaded.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the residency of the catalogs after each request.
+
+    Author: ``@ChinaiArman``
+    """
+    import tempfile
+    from types import SimpleNamespace
+
+    def factory(file_path, embedded_model):
+        snapshot = SimpleNamespace(memory_usage=lambda: 400)
+        return SimpleNamespace(
+            snapshot=snapshot, catalog_version=0, result_cache=SimpleNamespace(stats=lambda: {"bytes": 0}), vector_store=SimpleNamespace(ids=[])
+        )
+
+    directory = tempfile.mkdtemp(prefix="catalogs-")
+    for name in ("asos", "hm", "zara"):
+        open(os.path.join(directory, f"{name}.csv"), "w").close()
+    registry = CatalogRegistry(directory, 1000, factory=factory)
+    for name in ("hm", "asos", "hm", "zara", "asos"):
+        registry.get(name)
+        registry.release(name)
+        print(name, {catalog: record["resident"] for catalog, record in registry.stats()["catalogs"].items()})
+
+
+if __name__ == "__main__":
+    main()
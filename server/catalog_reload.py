@@ -0,0 +1,242 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Reloads the catalog of a running server when the data source file is rewritten, e.g. by the offline pipeline of data_source/main.py.
+A reload is started by POST /admin/reload or by a watcher polling the data source file, and runs in the background:
+the current catalog snapshot keeps serving the requests until the new one is built and swapped in.
+The duration, result and version of the reloads are exported by the /metrics endpoint.
+
+Requirements:
+This module has no third party requirements.
+The data source file is watched every "CATALOG_WATCH_SECONDS" seconds if the environment variable is set (default "0", not watched).
+
+Usage:
+To use this class, create a CatalogReloader with the GarmentRecognizer, call its reload method, and start its watcher with the watch method.
+To execute this module from the root directory, run the following command:
+    ``python server/catalog_reload.py``
+"""
+
+import threading
+import time
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from data_source.data_access import file_signature
+import metrics
+
+
+class CatalogReloader:
+    """
+    Class to reload the catalog of a GarmentRecognizer in the background, on request or when the data source file changes.
+
+    Args:
+    -----
+    garment_recognizer : ``GarmentRecognizer``
+        The recognizer whose catalog is reloaded.
+
+    Keyword Args:
+    -------------
+    poll_seconds : ``float``
+        The interval between two checks of the data source file by the watcher, 0 to disable it. Default is 0.
+
+    Attributes:
+    -----------
+    last_reload : ``dict``
+        The trigger, start time, duration, version and error of the last reload, or None.
+    lock : ``threading.Lock``
+        The lock held while a reload runs, so at most one reload runs at a time.
+
+    Methods:
+    --------
+    >>> reload(trigger, wait)
+    ... # Reloads the catalog, in the background unless `wait` is True.
+    >>> watch()
+    ... # Starts the thread watching the data source file.
+    >>> status()
+    ... # Returns the state of the reloads.
+
+    Notes:
+    ------
+    1. The watcher compares the signature of the data source file with the one recorded by the data source of the current snapshot,
+       so the writes of the server itself do not trigger a reload. The file is not checked while a write is being applied.
+    2. A change is only reloaded once the file has kept the same signature for one more interval, so a file being written is not read.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        garment_recognizer,
+        poll_seconds: float = 0
+    ) -> None:
+        """
+        Initializes the CatalogReloader class.
+        """
+        self.garment_recognizer = garment_recognizer
+        self.poll_seconds = poll_seconds
+        self.last_reload = None
+        self.lock = threading.Lock()
+        self.watcher = None
+
+    def _reload(
+        self,
+        trigger: str
+    ) -> None:
+        """
+        Reloads the catalog and records the reload, releasing the lock acquired by the caller.
+        """
+        started_at, start = time.time(), time.perf_counter()
+        version = rows = error = None
+        try:
+            snapshot = self.garment_recognizer.reload()
+            version, rows = snapshot.version, len(snapshot.vector_store.ids)
+        except Exception as e:
+            error = str(e)
+            print(f"Catalog reload failed: {e}")
+        finally:
+            seconds = time.perf_counter() - start
+            self.last_reload = {"trigger": trigger, "started_at": started_at, "seconds": seconds, "version": version, "rows": rows, "error": error}
+            self.lock.release()
+        metrics.CATALOG_RELOADS.inc(trigger=trigger, result="failure" if error else "success")
+        metrics.CATALOG_RELOAD_DURATION.observe(seconds, trigger=trigger)
+        if error is None:
+            metrics.CATALOG_RELOADED_AT.set(started_at + seconds)
+
+    def reload(
+        self,
+        trigger: str = "admin",
+        wait: bool = False
+    ) -> bool:
+        """
+        Reloads the catalog from the data source file, unless a reload is already running.
+
+        Args:
+        -----
+        None.
+
+        Keyword Args:
+        -------------
+        trigger : ``str``
+            The label of the reload in the metrics, e.g. "admin" or "watcher". Default is "admin".
+        wait : ``bool``
+            Whether to return once the reload is done instead of running it in a background thread. Default is False.
+
+        Returns:
+        --------
+        ``bool``
+            True if the reload was started, False if another reload is running.
+
+        Notes:
+        ------
+        1. A failed reload leaves the current catalog in place, its error is reported by `status` and counted in the metrics.
+
+        Example:
+        --------
+        >>> reloader.reload(wait=True)
+        ... True
+        >>> reloader.status()["last_reload"]["version"]
+        ... 4
+
+        Author: ``@ChinaiArman``
+        """
+        if not self.lock.acquire(blocking=False):
+            return False
+        if wait:
+            self._reload(trigger)
+        else:
+            threading.Thread(target=self._reload, args=(trigger,), daemon=True).start()
+        return True
+
+    def _watch(
+        self
+    ) -> None:
+        """
+        Polls the data source file and reloads the catalog once a change has settled.
+        """
+        pending = None
+        while True:
+            time.sleep(self.poll_seconds)
+            database = self.garment_recognizer.snapshot.database
+            signature = file_signature(database.file_path)
+            if signature is None or signature == database.signature or self.garment_recognizer.snapshots.lock.locked():
+                pending = None
+            elif signature != pending:
+                pending = signature
+            elif self.reload("watcher", wait=True):
+                pending = None
+
+    def watch(
+        self
+    ) -> bool:
+        """
+        Starts the daemon thread watching the data source file, if `poll_seconds` is set and it is not already started.
+        """
+        if self.poll_seconds <= 0 or self.watcher is not None:
+            return False
+        self.watcher = threading.Thread(target=self._watch, daemon=True)
+        self.watcher.start()
+        return True
+
+    def status(
+        self
+    ) -> dict:
+        """
+        Returns whether a reload is running, whether the file is watched, the served catalog version and the last reload.
+        """
+        return {
+            "running": self.lock.locked(),
+            "watching": self.watcher is not None,
+            "catalog_version": self.garment_recognizer.catalog_version,
+            "last_reload": self.last_reload,
+        }
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the CatalogReloader class with a stand-in recognizer.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The stand-in reload takes half a second, so the second reload request is refused while the first one runs.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the result of both reload requests and the status after the reload.
+
+    Author: ``@ChinaiArman``
+    """
+    from types import SimpleNamespace
+
+    class Recognizer:
+        catalog_version = 0
+
+        def reload(self):
+            time.sleep(0.5)
+            self.catalog_version += 1
+            return SimpleNamespace(version=self.catalog_version, vector_store=SimpleNamespace(ids=["1", "2"]))
+
+    reloader = CatalogReloader(Recognizer())
+    print(reloader.reload(), reloader.reload())
+    while reloader.status()["running"]:
+        time.sleep(0.1)
+    print(reloader.status())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Immutable, versioned snapshots of the catalog and its indexes, swapped atomically by serialized writers.
+A request reads the current snapshot once and uses it throughout, so it always sees one consistent version of the catalog
+while writers build the next version from copies and publish it with a single reference assignment.
+
+Requirements:
+This module has no third party requirements.
+
+Usage:
+To use this class, create a SnapshotStore with the first CatalogSnapshot, read its current attribute in the request handlers,
+and publish new versions from the update method.
+To execute this module from the root directory, run the following command:
+    ``python server/catalog_snapshot.py``
+"""
+
+from typing import NamedTuple
+import threading
+import time
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    One version of the catalog and of the indexes built from it.
+
+    Attributes:
+    -----------
+    version : ``int``
+        The version of the catalog, bumped by every insert, edit, delete and reload.
+    database : ``Database``
+        The data source at this version.
+    vector_store : ``VectorStore``
+        The vector index of the data source.
+    lexical_index : ``LexicalIndex``
+        The BM25 index of the data source, in the row order of the vector index.
+    attribute_index : ``AttributeIndex``
+        The bitmap index of the data source, in the row order of the vector index.
+    rendered_rows : ``RenderedRows``
+        The pre-rendered JSON encoding of every row of the data source.
+
+    Methods:
+    --------
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the snapshot in memory.
+
+    Notes:
+    ------
+    1. The snapshot and its components are never modified once published. Writers modify copies of the components
+       (see the copy methods of Database, VectorStore and RenderedRows) and publish a new snapshot.
+
+    Author: ``@ChinaiArman``
+    """
+    version: int
+    database: object
+    vector_store: object
+    lexical_index: object
+    attribute_index: object
+    rendered_rows: object
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used in memory by the data source, its indexes and its rendered rows.
+        """
+        return sum(component.memory_usage() for component in self[1:])
+
+
+class SnapshotStore:
+    """
+    Class to publish catalog snapshots to lock-free readers, from writers serialized by a lock.
+
+    Args:
+    -----
+    snapshot : ``CatalogSnapshot``
+        The first snapshot.
+
+    Attributes:
+    -----------
+    current : ``CatalogSnapshot``
+        The latest published snapshot.
+    lock : ``threading.Lock``
+        The lock serializing the writers.
+
+    Methods:
+    --------
+    >>> update(write)
+    ... # Builds and publishes the next snapshot from the current one, under the writer lock.
+
+    Notes:
+    ------
+    1. Reading `current` is a single attribute read, so readers never wait for a writer and never see a partially built snapshot.
+    2. Writers wait for each other, so each one builds on the snapshot published by the previous one and no update is lost.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        snapshot: CatalogSnapshot
+    ) -> None:
+        """
+        Initializes the SnapshotStore class.
+        """
+        self.current = snapshot
+        self.lock = threading.Lock()
+
+    def update(
+        self,
+        write: callable
+    ) -> object:
+        """
+        Builds the next snapshot from the current one and publishes it, one writer at a time.
+
+        Args:
+        -----
+        write : ``callable``
+            A function taking the current snapshot and returning a tuple of the new snapshot (or None to publish nothing) and a result.
+
+        Returns:
+        --------
+        ``object``
+            The result returned by `write`.
+
+        Notes:
+        ------
+        1. If `write` raises, nothing is published and the exception is propagated.
+
+        Example:
+        --------
+        >>> snapshots.update(lambda snapshot: (snapshot._replace(version=snapshot.version + 1), True))
+        ... True
+
+        Author: ``@ChinaiArman``
+        """
+        with self.lock:
+            snapshot, result = write(self.current)
+            if snapshot is not None:
+                self.current = snapshot
+            return result
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the SnapshotStore class with concurrent readers and writers.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Writers append to a tuple copied from the current snapshot while readers check that every snapshot they read is consistent.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the final version and the number of consistent reads.
+
+    Author: ``@ChinaiArman``
+    """
+    snapshots = SnapshotStore(CatalogSnapshot(0, (), None, None, None, None))
+    reads = []
+
+    def write():
+        for _ in range(100):
+            snapshots.update(lambda snapshot: (snapshot._replace(version=snapshot.version + 1, database=snapshot.database + (snapshot.version,)), None))
+
+    def read():
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            snapshot = snapshots.current
+            reads.append(len(snapshot.database) == snapshot.version)
+
+    threads = [threading.Thread(target=write) for _ in range(4)] + [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Version {snapshots.current.version}, {sum(reads)} of {len(reads)} reads consistent")
+
+
+if __name__ == "__main__":
+    main()
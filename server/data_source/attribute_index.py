@@ -0,0 +1,475 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Bitmap indexes over the filterable attributes of the data source: retailer, colour and article type.
+The indexes turn a set of filters into the row positions that match them, so the search only scores matching rows.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+To use this class, create an AttributeIndex from the data source DataFrame and call the positions method with a dictionary of filters.
+To execute this module from the root directory, run the following command:
+    ``python server/data_source/attribute_index.py``
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+import re
+import sys
+from urllib.parse import urlparse
+
+
+FILTER_ATTRIBUTES = ("retailer", "colour", "articleType")
+RETAILER_HOSTS = {
+    "image.hm.com": "hm",
+    "images.asos-media.com": "asos",
+    "assets.myntassets.com": "free_clothes",
+}
+COLOURS = {
+    "black", "white", "grey", "blue", "navy", "red", "maroon", "burgundy", "pink", "purple", "lavender",
+    "orange", "yellow", "mustard", "green", "olive", "khaki", "teal", "turquoise", "brown", "tan", "beige",
+    "cream", "gold", "silver", "multi",
+}
+COLOUR_ALIASES = {"gray": "grey", "multicolour": "multi", "multicolor": "multi", "offwhite": "white"}
+ARTICLE_TYPES = {
+    "shirt", "tshirt", "top", "blouse", "polo", "tank", "vest", "hoodie", "sweatshirt", "sweater", "jumper",
+    "cardigan", "jacket", "coat", "blazer", "suit", "dress", "skirt", "jeans", "trousers", "pants", "joggers",
+    "shorts", "leggings", "kurta", "shoe", "sneaker", "trainer", "boot", "sandal", "heel", "flip", "slipper",
+    "bag", "handbag", "backpack", "wallet", "watch", "sunglasses", "belt", "cap", "hat", "scarf", "sock", "tie",
+}
+FREE_CLOTHES_ARTICLE_TYPE_FIELD = 3
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_value(
+    attribute: str,
+    value: str
+) -> str:
+    """
+    Normalizes a filter value so it matches the values stored in the index.
+
+    Args:
+    -----
+    attribute : ``str``
+        The attribute the value belongs to.
+    value : ``str``
+        The raw value.
+
+    Returns:
+    --------
+    ``str``
+        The lowercase value, with colour aliases resolved and article types reduced to their singular vocabulary form.
+
+    Example:
+    --------
+    >>> normalize_value("articleType", "Shirts")
+    ... 'shirt'
+
+    Author: ``@ChinaiArman``
+    """
+    value = re.sub(r"[^a-z0-9_]", "", str(value).lower())
+    if attribute == "colour":
+        return COLOUR_ALIASES.get(value, value)
+    if attribute == "articleType":
+        for candidate in (value, value[:-1], value[:-2]):
+            if candidate in ARTICLE_TYPES:
+                return candidate
+    return value
+
+
+def row_attributes(
+    row: pd.Series
+) -> dict:
+    """
+    Extracts the filterable attributes of a data source row.
+
+    Args:
+    -----
+    row : ``pd.Series``
+        A row of the data source.
+
+    Returns:
+    --------
+    ``dict``
+        A dictionary mapping each attribute to the set of its values for the row.
+
+    Notes:
+    ------
+    1. The retailer is derived from the host of the image URL.
+    2. The colours are the colour words of the description, or of the name if the row has no description (ASOS rows).
+    3. The article types are the garment words of the name, plus the article type field of free clothes descriptions.
+
+    Example:
+    --------
+    >>> row_attributes(db.get_item_by_id("1").iloc[0])
+    ... {'retailer': {'hm'}, 'colour': {'black'}, 'articleType': {'shirt'}}
+
+    Author: ``@ChinaiArman``
+    """
+    return item_attributes(row.get("name"), row.get("description"), row.get("imageUrl"))
+
+
+def item_attributes(
+    name: str,
+    description: str,
+    image_url: str
+) -> dict:
+    """
+    Extracts the filterable attributes of a row from its name, description and image URL, which may be missing (see row_attributes).
+    """
+    name = str(name) if pd.notna(name) else ""
+    description = str(description) if pd.notna(description) else ""
+    image_url = str(image_url) if pd.notna(image_url) else ""
+    colour_text = description or name
+    article_text = name
+    fields = description.split(", ")
+    if len(fields) > FREE_CLOTHES_ARTICLE_TYPE_FIELD:
+        article_text += " " + fields[FREE_CLOTHES_ARTICLE_TYPE_FIELD]
+    colours = {normalize_value("colour", token) for token in TOKEN_PATTERN.findall(colour_text.lower())}
+    article_types = {normalize_value("articleType", token) for token in TOKEN_PATTERN.findall(article_text.lower())}
+    return {
+        "retailer": {RETAILER_HOSTS.get(urlparse(image_url).netloc, "other")},
+        "colour": colours & COLOURS,
+        "articleType": article_types & ARTICLE_TYPES,
+    }
+
+
+class AttributeIndex:
+    """
+    Class to resolve attribute filters to matching row positions using bitmap indexes.
+
+    Args:
+    -----
+    ids : ``list``
+        The ids of the rows.
+    attributes : ``list``
+        The attributes of each row, as returned by `row_attributes`.
+
+    Attributes:
+    -----------
+    ids : ``list``
+        The ids of the rows, in row order.
+    bitmaps : ``dict``
+        For each attribute, a dictionary mapping each value to the packed bitmap of the rows that have it.
+
+    Raises:
+    -------
+    ``ValueError``
+        If a filter uses an unknown attribute.
+
+    Methods:
+    --------
+    >>> from_data_frame(df)
+    ... # Builds the index from the data source DataFrame.
+    >>> add(id, attributes)
+    ... # Adds a row after the last row.
+    >>> remove(position)
+    ... # Removes a row, shifting the rows after it.
+    >>> copy()
+    ... # Returns a copy of the index that can be added to and removed from without changing this one.
+    >>> mask(filters)
+    ... # Returns the boolean mask of the rows matching the filters.
+    >>> positions(filters)
+    ... # Returns the positions of the rows matching the filters.
+    >>> values()
+    ... # Returns the number of rows with each value of each attribute.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the bitmaps.
+
+    Notes:
+    ------
+    1. Each bitmap uses one bit per row (np.packbits), so an attribute value costs N / 8 bytes.
+    2. Values of the same attribute are combined with OR, and different attributes are combined with AND.
+    3. The rows must be in the same order as the VectorStore rows, so the positions can be passed to the search directly.
+    4. A write only sets or clears the bits of the changed row: a removed row shifts the bits after it and an added one is appended,
+       as in the vector index, so an edit moves the row to the end.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        ids: list,
+        attributes: list
+    ) -> None:
+        """
+        Initializes the AttributeIndex class.
+        """
+        self.ids = list(ids)
+        self.bitmaps = {attribute: {} for attribute in FILTER_ATTRIBUTES}
+        rows = {attribute: {} for attribute in FILTER_ATTRIBUTES}
+        for row, row_values in enumerate(attributes):
+            for attribute in FILTER_ATTRIBUTES:
+                for value in row_values[attribute]:
+                    rows[attribute].setdefault(value, []).append(row)
+        for attribute, value_rows in rows.items():
+            for value, matches in value_rows.items():
+                bits = np.zeros(len(self.ids), dtype=bool)
+                bits[matches] = True
+                self.bitmaps[attribute][value] = np.packbits(bits)
+
+    @classmethod
+    def from_data_frame(
+        cls,
+        df: pd.DataFrame
+    ) -> "AttributeIndex":
+        """
+        Builds the index from the data source DataFrame.
+
+        Args:
+        -----
+        df : ``pd.DataFrame``
+            The data source.
+
+        Returns:
+        --------
+        ``AttributeIndex``
+            The index of the retailer, colour and article type of every row.
+
+        Notes:
+        ------
+        1. The attributes are extracted from the column lists, without building a Series per row.
+
+        Example:
+        --------
+        >>> index = AttributeIndex.from_data_frame(Database().get_data_frame())
+
+        Author: ``@ChinaiArman``
+        """
+        columns = [df[column].tolist() if column in df else [None] * len(df) for column in ("name", "description", "imageUrl")]
+        return cls(df["id"].tolist(), [item_attributes(*values) for values in zip(*columns)])
+
+    def copy(
+        self
+    ) -> "AttributeIndex":
+        """
+        Returns a copy of the index that can be added to and removed from without changing this one, sharing the bitmaps that `add` and `remove` replace.
+        """
+        clone = copy.copy(self)
+        clone.ids = list(self.ids)
+        clone.bitmaps = {attribute: dict(bitmaps) for attribute, bitmaps in self.bitmaps.items()}
+        return clone
+
+    def add(
+        self,
+        id: str,
+        attributes: dict
+    ) -> None:
+        """
+        Adds a row after the last row of the index.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the row.
+        attributes : ``dict``
+            The attributes of the row, as returned by `row_attributes`.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. The bitmaps only grow by a byte every 8 rows, the other additions just set the bits of the row's values.
+
+        Example:
+        --------
+        >>> index.add("3", {"retailer": {"hm"}, "colour": {"black"}, "articleType": {"shirt"}})
+
+        Author: ``@ChinaiArman``
+        """
+        position = len(self.ids)
+        size = position // 8 + 1
+        for attribute in FILTER_ATTRIBUTES:
+            bitmaps = self.bitmaps[attribute]
+            if position % 8 == 0:
+                for value, bitmap in bitmaps.items():
+                    bitmaps[value] = np.append(bitmap, np.uint8(0))
+            for value in attributes[attribute]:
+                bitmap = bitmaps[value].copy() if value in bitmaps else np.zeros(size, dtype=np.uint8)
+                bitmap[position // 8] |= np.uint8(0x80 >> position % 8)
+                bitmaps[value] = bitmap
+        self.ids.append(id)
+
+    def remove(
+        self,
+        position: int
+    ) -> None:
+        """
+        Removes a row from the index, shifting the bits of the rows after it.
+
+        Args:
+        -----
+        position : ``int``
+            The row to remove, e.g. its position in the vector index.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. The bits are shifted a byte at a time, and the values no row has anymore are dropped.
+
+        Example:
+        --------
+        >>> index.remove(store.positions["3"])
+
+        Author: ``@ChinaiArman``
+        """
+        first, kept = position // 8, np.uint8((0xFF00 >> position % 8) & 0xFF)
+        size = (len(self.ids) + 6) // 8
+        for bitmaps in self.bitmaps.values():
+            for value, bitmap in list(bitmaps.items()):
+                shifted = (bitmap << 1) | (np.append(bitmap[1:], np.uint8(0)) >> 7)
+                bitmap = bitmap.copy()
+                bitmap[first] = (bitmap[first] & kept) | (shifted[first] & ~kept)
+                bitmap[first + 1:] = shifted[first + 1:]
+                bitmap = bitmap[:size]
+                if bitmap.any():
+                    bitmaps[value] = bitmap
+                else:
+                    del bitmaps[value]
+        del self.ids[position]
+
+    def mask(
+        self,
+        filters: dict
+    ) -> np.ndarray:
+        """
+        Returns the boolean mask of the rows matching the filters.
+
+        Args:
+        -----
+        filters : ``dict``
+            A dictionary mapping attributes to the list of accepted values.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            A boolean array with one entry per row, or None if no filter is set.
+
+        Example:
+        --------
+        >>> mask = index.mask({"retailer": ["hm"], "colour": ["black", "white"]})
+
+        Author: ``@ChinaiArman``
+        """
+        result = None
+        for attribute, values in (filters or {}).items():
+            if attribute not in self.bitmaps:
+                raise ValueError(f"Unknown filter '{attribute}'. Expected one of {FILTER_ATTRIBUTES}.")
+            if not values:
+                continue
+            bitmap = np.zeros((len(self.ids) + 7) // 8, dtype=np.uint8)
+            for value in values:
+                value_bitmap = self.bitmaps[attribute].get(normalize_value(attribute, value))
+                if value_bitmap is not None:
+                    bitmap |= value_bitmap
+            result = bitmap if result is None else result & bitmap
+        if result is None:
+            return None
+        return np.unpackbits(result, count=len(self.ids)).astype(bool)
+
+    def positions(
+        self,
+        filters: dict
+    ) -> np.ndarray:
+        """
+        Returns the positions of the rows matching the filters.
+
+        Args:
+        -----
+        filters : ``dict``
+            A dictionary mapping attributes to the list of accepted values.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            The sorted positions of the matching rows, or None if no filter is set.
+
+        Example:
+        --------
+        >>> positions = index.positions({"retailer": ["hm"]})
+
+        Author: ``@ChinaiArman``
+        """
+        mask = self.mask(filters)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the bitmaps and the id list of the index.
+        """
+        return sum(bitmap.nbytes for bitmaps in self.bitmaps.values() for bitmap in bitmaps.values()) + sys.getsizeof(self.ids)
+
+    def values(
+        self
+    ) -> dict:
+        """
+        Returns the number of rows with each value of each attribute.
+
+        Args:
+        -----
+        None.
+
+        Returns:
+        --------
+        ``dict``
+            A dictionary mapping each attribute to a dictionary of value counts.
+
+        Example:
+        --------
+        >>> index.values()["retailer"]
+        ... {'asos': 384, 'free_clothes': 2000, 'hm': 360}
+
+        Author: ``@ChinaiArman``
+        """
+        return {
+            attribute: {
+                value: int(np.unpackbits(bitmap, count=len(self.ids)).sum())
+                for value, bitmap in sorted(value_bitmaps.items())
+            }
+            for attribute, value_bitmaps in self.bitmaps.items()
+        }
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the AttributeIndex class on the data source.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function builds the index from the data source and prints the value counts of each attribute.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the retailer, colour and article type counts of the data source.
+
+    Author: ``@ChinaiArman``
+    """
+    from data_access import Database
+    index = AttributeIndex.from_data_frame(Database().get_data_frame())
+    for attribute, counts in index.values().items():
+        print(f"{attribute}: {counts}")
+    print(f"H&M black items: {len(index.positions({'retailer': ['hm'], 'colour': ['black']}))}")
+
+
+if __name__ == "__main__":
+    main()
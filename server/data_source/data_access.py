@@ -6,7 +6,7 @@ Description:
 A class to interact with the data source stored in a CSV file.
 
 Requirements:
-This class requires the installation of the pandas library.
+This class requires the installation of the numpy and pandas libraries, and of the pyarrow library for Arrow data sources.
 The data source file path must be specified in the environment variables under "DATA_SOURCE_FILE".
 
 Usage:
@@ -16,7 +16,9 @@ To execute this module from the root directory, run the following command:
 """
 
 
+import numpy as np
 import pandas as pd
+import tempfile
 import uuid
 import os.path
 from dotenv import load_dotenv
@@ -27,20 +29,53 @@ load_dotenv()
 sys.path.insert(0, os.getenv("PYTHONPATH"))
 
 from dense_captioning_model import dense_captioning as dc
+from data_source.catalog_format import is_arrow_file, read_catalog, read_table, write_catalog
+from data_source.keyword_store import KeywordStore
+from instrumentation import timed
+
+
+def create_keywords(
+    image_url: str
+) -> list:
+    """
+    Generates the keyword descriptions of an image with the dense captioning model, [""] if none are generated.
+    """
+    keywords = dc.normalize_dense_caption_response(dc.create_dense_captions(image_url))
+    return keywords if keywords is not None else [""]
+
+
+def file_signature(
+    file_path: str
+) -> tuple:
+    """
+    Returns the modification time, size and inode of a file, which change when the file is rewritten or replaced, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
 
 
 class Database:
     """
     Class to interact with the data source.
 
-    Args:
-    -----
-    None.
+    Keyword Args:
+    -------------
+    file_path : ``str``
+        The path to the data source file. Default is None, which reads the "DATA_SOURCE_FILE" environment variable.
 
     Attributes:
     -----------
     file_path : ``str``
         The path to the data source file.
+    df : ``pd.DataFrame``
+        The columns of the data source other than "keywordDescriptions".
+    keywords : ``KeywordStore``
+        The keyword descriptions of the rows of `df`, in the same order.
+    signature : ``tuple``
+        The file signature (see file_signature) of the data source file when it was last read or written by this instance.
 
     Raises:
     -------
@@ -50,9 +85,11 @@ class Database:
     Notes:
     ------
     1. The class is used to interact with the data source.
-    2. The data source is a CSV file specified in the environment variables.
+    2. The data source is a CSV file specified in the environment variables, or an Arrow IPC file (.arrow) memory-mapped by the catalog_format module.
+       The Arrow scalar columns are converted to a DataFrame when the data source is loaded, so the load is not zero-copy, only faster than parsing the CSV.
     3. The class provides methods to retrieve data from the data source.
     4. The class uses the Pandas library to read the CSV file and manipulate the data.
+    5. The keyword descriptions are kept interned in a KeywordStore, and only materialized as lists of strings by the methods returning DataFrames.
 
     Methods:
     --------
@@ -66,23 +103,76 @@ class Database:
     ... # Deletes a row from the data source by its id.
     >>> add_row(new_row)
     ... # Adds a row to the data source.
+    >>> copy()
+    ... # Returns a copy of the data source that can be modified independently.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the data source in memory.
 
     Author: ``@levxxvi``
     """
+    @timed("csv_read")
     def __init__(
-        self
+        self,
+        file_path: str = None
     ) -> None:
         """
         Initializes the Database class.
         """
         load_dotenv()
-        if not os.path.exists(os.getenv("DATA_SOURCE_FILE")):
+        file_path = file_path or os.getenv("DATA_SOURCE_FILE")
+        if not os.path.exists(file_path):
             raise FileNotFoundError("The data source file does not exist.")
-        self.file_path = os.getenv("DATA_SOURCE_FILE")
+        self.file_path = file_path
+        self.signature = file_signature(self.file_path)
+        if is_arrow_file(self.file_path):
+            table = read_table(self.file_path)
+            self.columns = table.column_names
+            self.df = read_catalog(self.file_path, [name for name in self.columns if name != "keywordDescriptions"])
+            self.keywords = KeywordStore.from_arrow(table.column("keywordDescriptions"))
+            return
         self.df = pd.read_csv(self.file_path, dtype={"id": str})
-        self.df["keywordDescriptions"] = self.df["keywordDescriptions"].apply(
-            lambda x: x.split(", ") if pd.notna(x) else [""]
-        )
+        self.columns = self.df.columns.tolist()
+        self.keywords = KeywordStore.from_strings(self.df.pop("keywordDescriptions"))
+
+    def _with_keywords(
+        self,
+        df: pd.DataFrame,
+        positions: np.ndarray = None
+    ) -> pd.DataFrame:
+        """
+        Returns a copy of rows of `df` with the keyword descriptions of the positions materialized as lists, in the column order of the file.
+        """
+        return df.assign(keywordDescriptions=self.keywords.lists(positions))[[name for name in self.columns if name in df or name == "keywordDescriptions"]]
+
+    def _append(
+        self,
+        new_row: dict
+    ) -> None:
+        """
+        Adds a row at the end of the data source, with its keyword descriptions interned.
+        """
+        self.df.loc[len(self.df)] = {column: new_row.get(column) for column in self.df.columns}
+        self.keywords.append(new_row['keywordDescriptions'])
+
+    def copy(
+        self
+    ) -> "Database":
+        """
+        Returns a copy of the data source that can be modified without changing this one, writing to the same file.
+        """
+        clone = Database.__new__(Database)
+        clone.file_path, clone.columns, clone.signature = self.file_path, self.columns, self.signature
+        clone.df = self.df.copy()
+        clone.keywords = self.keywords.copy()
+        return clone
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the columns and the keyword descriptions of the data source.
+        """
+        return int(self.df.memory_usage(deep=True).sum()) + self.keywords.memory_usage()
 
     def get_data_frame(
         self
@@ -103,6 +193,7 @@ class Database:
         ------
         1. The method reads the CSV file specified in the environment variables.
         2. The method returns the data as a pandas DataFrame.
+        3. The keyword descriptions are materialized as lists on every call, use the `keywords` attribute to read them without copies.
 
         Example:
         --------
@@ -114,8 +205,9 @@ class Database:
 
         Author: ``@levxxvi``
         """
-        return self.df
+        return self._with_keywords(self.df)
 
+    @timed("db_get_item")
     def get_item_by_id(
         self,
         id: str
@@ -147,7 +239,8 @@ class Database:
 
         Author: ``@levxxvi``
         """
-        item = self.df.loc[self.df['id'] == id]
+        positions = np.flatnonzero(self.df['id'].to_numpy() == id)
+        item = self._with_keywords(self.df.iloc[positions], positions)
         return item
 
     def get_id_keyword_description(
@@ -180,11 +273,13 @@ class Database:
 
         Author: ``@Ehsan138``
         """
-        return self.df[['id', 'keywordDescriptions']]
+        return self._with_keywords(self.df[['id']])
 
+    @timed("db_delete_row")
     def delete_row(
         self,
-        id: str
+        id: str,
+        save: bool = True
     ) -> bool:
         """
         Deletes a row from the data source by its id.
@@ -194,6 +289,11 @@ class Database:
         id : ``str``
             The id of the item to delete.
 
+        Keyword Args:
+        -------------
+        save : ``bool``
+            Whether to write the data source to the file. Default is True, False lets the caller write it with write_to_csv once its other changes are made.
+
         Returns:
         --------
         ``bool``
@@ -210,18 +310,22 @@ class Database:
 
         Author: ``@levxxvi``
         """
-        curr_len = len(self.df)
-        self.df = self.df[self.df['id'] != id]
-        if len(self.df) == curr_len:
+        keep = self.df['id'].to_numpy() != id
+        if keep.all():
             return False
         else:
-            self.df.reset_index(drop=True, inplace=True)
-            self.write_to_csv()
+            self.df = self.df[keep].reset_index(drop=True)
+            self.keywords = self.keywords.take(np.flatnonzero(keep))
+            if save:
+                self.write_to_csv()
             return True
 
+    @timed("db_add_row")
     def add_row(
         self, 
-        new_row: dict
+        new_row: dict,
+        keywords: list = None,
+        save: bool = True
     ) -> dict:
         """
         Adds a row to the data source.
@@ -231,6 +335,13 @@ class Database:
         new_row : ``dict``
             A dictionary containing the new row data.
 
+        Keyword Args:
+        -------------
+        keywords : ``list``
+            The keyword descriptions of the row. Default is None, which generates them from the image with the dense captioning model.
+        save : ``bool``
+            Whether to write the data source to the file. Default is True.
+
         Returns:
         --------
         ``dict``
@@ -242,7 +353,7 @@ class Database:
         1. The method appends the new row to the data source.
         2. The method generates a unique identifier for the new row.
         3. The method normalizes the keyword descriptions using the dense captioning model.
-        4. The method saves the updated data source to the CSV file.
+        4. The method saves the updated data source to the CSV file, unless `save` is False.
         5. The method returns the new row added to the data source.
 
         Example:
@@ -261,16 +372,19 @@ class Database:
         """
         new_row['id'] = str(uuid.uuid4())
         print(new_row)
-        keywords = dc.normalize_dense_caption_response(dc.create_dense_captions(new_row['imageUrl']))
-        new_row['keywordDescriptions'] = keywords if keywords is not None else [""]
-        self.df.loc[len(self.df)] = new_row
-        self.write_to_csv()
+        new_row['keywordDescriptions'] = keywords if keywords is not None else create_keywords(new_row['imageUrl'])
+        self._append(new_row)
+        if save:
+            self.write_to_csv()
         return new_row
 
+    @timed("db_edit_row")
     def edit_row(
         self, 
         id: str, 
-        new_row: dict
+        new_row: dict,
+        keywords: list = None,
+        save: bool = True
     ) -> dict:
         """
         Edits a row in the data source.
@@ -282,6 +396,13 @@ class Database:
         new_row : ``dict``
             A dictionary containing the new row data.
 
+        Keyword Args:
+        -------------
+        keywords : ``list``
+            The keyword descriptions of the row. Default is None, which generates them from the image with the dense captioning model.
+        save : ``bool``
+            Whether to write the data source to the file. Default is True.
+
         Returns:
         --------
         ``dict``
@@ -291,7 +412,7 @@ class Database:
         ------
         1. The method edits the row with the provided id in the data source.
         2. The method normalizes the keyword descriptions using the dense captioning model.
-        3. The method saves the updated data source to the CSV file.
+        3. The method saves the updated data source to the CSV file once, unless `save` is False.
         4. The method returns the edited row.
 
         Example:
@@ -307,14 +428,15 @@ class Database:
 
         Author: ``@levxxvi``
         """
-        self.delete_row(id)
+        self.delete_row(id, save=False)
         new_row['id'] = id
-        keywords = dc.normalize_dense_caption_response(dc.create_dense_captions(new_row['imageUrl']))
-        new_row['keywordDescriptions'] = keywords if keywords is not None else [""]
-        self.df.loc[len(self.df)] = new_row
-        self.write_to_csv()
+        new_row['keywordDescriptions'] = keywords if keywords is not None else create_keywords(new_row['imageUrl'])
+        self._append(new_row)
+        if save:
+            self.write_to_csv()
         return new_row
 
+    @timed("csv_write")
     def write_to_csv(
         self
     ) -> None:
@@ -333,6 +455,10 @@ class Database:
         ------
         1. The method writes the current data to the CSV file.
         2. The method converts the keyword descriptions to a string before writing.
+        3. If the data source is an Arrow file, the data is written to it in the Arrow format instead.
+        4. The data is written to a temporary file in the same directory and renamed over the file,
+           so a reader or a crash never sees a partially written file.
+        5. The signature of the written file is recorded, so a file watcher can tell this write from an external one.
 
         Example:
         --------
@@ -342,11 +468,21 @@ class Database:
 
         Author: ``@cc-dev-65535``
         """
-        df_to_write = self.df.copy(deep=True)
-        df_to_write["keywordDescriptions"] = df_to_write["keywordDescriptions"].apply(
-            lambda x: ", ".join(x)
-        )
-        df_to_write.to_csv(self.file_path, index=False)
+        if is_arrow_file(self.file_path):
+            write_catalog(self.get_data_frame(), self.file_path)
+            self.signature = file_signature(self.file_path)
+            return
+        df_to_write = self.df.assign(keywordDescriptions=self.keywords.joined())[self.columns]
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file_path)), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", newline="") as file:
+                df_to_write.to_csv(file, index=False)
+            os.replace(temporary, self.file_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self.signature = file_signature(self.file_path)
 
 
 def main(
@@ -0,0 +1,351 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Compact storage of the keyword descriptions of the data source.
+Every distinct phrase is stored once in a shared vocabulary, and each row is a run of phrase ids in a flat array (CSR layout),
+so the phrases repeated across thousands of rows cost 4 bytes per occurrence instead of a Python string and list slot each.
+Lists of strings are only materialized for the rows that are returned.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries, and of the pyarrow library for Arrow columns.
+
+Usage:
+To use this class, create a KeywordStore from the keyword description column of the data source and call the row or lists methods.
+To execute this module from the root directory, run the following command:
+    ``python server/data_source/keyword_store.py``
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+
+
+SEPARATOR = ", "
+
+
+class KeywordStore:
+    """
+    Class to store the keyword descriptions of every row as ids into a shared phrase vocabulary.
+
+    Args:
+    -----
+    phrases : ``list``
+        The vocabulary, the distinct phrases in order of their ids.
+    offsets : ``np.ndarray``
+        The int64 offsets of the rows into `ids`, of length rows + 1.
+    ids : ``np.ndarray``
+        The int32 phrase ids of all rows, concatenated.
+
+    Attributes:
+    -----------
+    phrases : ``list``
+        The vocabulary, the distinct phrases in order of their ids.
+    lookup : ``dict``
+        A dictionary mapping each phrase to its id.
+    offsets : ``np.ndarray``
+        The offsets of the rows into `ids`, the phrases of row i are `ids[offsets[i]:offsets[i + 1]]`.
+    ids : ``np.ndarray``
+        The phrase ids of all rows, concatenated.
+
+    Methods:
+    --------
+    >>> from_strings(values)
+    ... # Builds the store from keyword descriptions joined by ", ", as in the CSV data source.
+    >>> from_lists(values)
+    ... # Builds the store from lists of phrases.
+    >>> from_arrow(column)
+    ... # Builds the store from an Arrow list<string> column.
+    >>> row(position)
+    ... # Returns the phrases of a row as a list.
+    >>> lists(positions)
+    ... # Returns the phrases of several rows as lists.
+    >>> joined(separator)
+    ... # Returns the phrases of every row joined into one string.
+    >>> append(phrases)
+    ... # Adds a row at the end of the store.
+    >>> take(positions)
+    ... # Returns a store with only the given rows.
+    >>> copy()
+    ... # Returns a copy of the store that can be modified independently.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the store.
+
+    Notes:
+    ------
+    1. A row without keyword descriptions is materialized as [""], like the CSV and Arrow loaders of the Database class.
+    2. The vocabulary is append-only and shared by the stores returned by `take`, so their ids stay valid.
+       Phrases of deleted rows stay in the vocabulary until the data source is reloaded.
+    3. The materialized lists hold the vocabulary strings themselves, so even materialized rows share their phrases.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        phrases: list,
+        offsets: np.ndarray,
+        ids: np.ndarray
+    ) -> None:
+        """
+        Initializes the KeywordStore class.
+        """
+        self.phrases = phrases
+        self.lookup = {phrase: i for i, phrase in enumerate(phrases)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ids = np.asarray(ids, dtype=np.int32)
+
+    def __len__(
+        self
+    ) -> int:
+        """
+        Returns the number of rows of the store.
+        """
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_strings(
+        cls,
+        values: pd.Series,
+        separator: str = SEPARATOR
+    ) -> "KeywordStore":
+        """
+        Builds the store from keyword descriptions joined into strings, as in the CSV data source.
+
+        Args:
+        -----
+        values : ``pd.Series``
+            The joined keyword descriptions of every row, NaN for rows without any.
+        separator : ``str``
+            The separator of the phrases.
+
+        Returns:
+        --------
+        ``KeywordStore``
+            The keyword descriptions of every row.
+
+        Notes:
+        ------
+        1. The strings are split and the phrases assigned their ids with vectorized pandas operations, not per row in Python.
+
+        Example:
+        --------
+        >>> store = KeywordStore.from_strings(pd.Series(["a red shirt, a red shirt", "a red shirt"]))
+        >>> store.ids
+        ... array([0, 0, 0], dtype=int32)
+
+        Author: ``@ChinaiArman``
+        """
+        split = pd.Series(values, dtype=object).fillna("").astype(str).str.split(separator, regex=False)
+        lengths = split.str.len().to_numpy(dtype=np.int64)
+        codes, phrases = pd.factorize(split.explode(), sort=False)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls([str(phrase) for phrase in phrases], offsets, codes)
+
+    @classmethod
+    def from_lists(
+        cls,
+        values: list
+    ) -> "KeywordStore":
+        """
+        Builds the store from the lists of phrases of every row.
+
+        Args:
+        -----
+        values : ``list``
+            The list of phrases of every row.
+
+        Returns:
+        --------
+        ``KeywordStore``
+            The keyword descriptions of every row.
+
+        Example:
+        --------
+        >>> store = KeywordStore.from_lists([["a red shirt"], ["a red shirt", "a white background"]])
+        >>> store.phrases
+        ... ['a red shirt', 'a white background']
+
+        Author: ``@ChinaiArman``
+        """
+        store = cls([], np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        ids = [store._intern(phrase) for phrases in values for phrase in phrases]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(phrases) for phrases in values], out=offsets[1:])
+        store.offsets, store.ids = offsets, np.asarray(ids, dtype=np.int32)
+        return store
+
+    @classmethod
+    def from_arrow(
+        cls,
+        column
+    ) -> "KeywordStore":
+        """
+        Builds the store from an Arrow list<string> column, without converting the rows to Python objects.
+
+        Args:
+        -----
+        column : ``pa.ChunkedArray``
+            The keyword descriptions column of an Arrow data source.
+
+        Returns:
+        --------
+        ``KeywordStore``
+            The keyword descriptions of every row.
+
+        Notes:
+        ------
+        1. The phrases are dictionary encoded by Arrow, so only the distinct phrases become Python strings.
+
+        Example:
+        --------
+        >>> store = KeywordStore.from_arrow(read_table("server/data_source/data.arrow").column("keywordDescriptions"))
+
+        Author: ``@ChinaiArman``
+        """
+        import pyarrow.compute as pc
+        lengths = pc.fill_null(pc.list_value_length(column), 0).to_numpy().astype(np.int64)
+        encoded = pc.list_flatten(column).combine_chunks().dictionary_encode()
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(encoded.dictionary.to_pylist(), offsets, encoded.indices.to_numpy(zero_copy_only=False))
+
+    def _intern(
+        self,
+        phrase: str
+    ) -> int:
+        """
+        Returns the id of a phrase, adding it to the vocabulary if it is new.
+        """
+        phrase_id = self.lookup.get(phrase)
+        if phrase_id is None:
+            phrase_id = self.lookup[phrase] = len(self.phrases)
+            self.phrases.append(phrase)
+        return phrase_id
+
+    def _flat(
+        self
+    ) -> list:
+        """
+        Returns the phrases of all rows, concatenated, as a list of the vocabulary strings.
+        """
+        phrases = self.phrases
+        return [phrases[i] for i in self.ids.tolist()]
+
+    def row(
+        self,
+        position: int
+    ) -> list:
+        """
+        Returns the phrases of the row at a position as a list, [""] if it has none.
+        """
+        phrases = self.phrases
+        return [phrases[i] for i in self.ids[self.offsets[position]:self.offsets[position + 1]].tolist()] or [""]
+
+    def lists(
+        self,
+        positions: np.ndarray = None
+    ) -> list:
+        """
+        Returns the phrases of the rows at the positions (all rows if None) as lists, [""] for rows without any.
+        """
+        offsets = self.offsets.tolist()
+        if positions is None:
+            flat = self._flat()
+            return [flat[start:end] or [""] for start, end in zip(offsets, offsets[1:])]
+        return [self.row(position) for position in np.asarray(positions).tolist()]
+
+    def joined(
+        self,
+        separator: str = SEPARATOR
+    ) -> list:
+        """
+        Returns the phrases of every row joined into one string, as written to the CSV data source and embedded.
+        """
+        flat = self._flat()
+        offsets = self.offsets.tolist()
+        return [separator.join(flat[start:end]) for start, end in zip(offsets, offsets[1:])]
+
+    def append(
+        self,
+        phrases: list
+    ) -> None:
+        """
+        Adds a row with the given phrases at the end of the store.
+        """
+        ids = np.asarray([self._intern(phrase) for phrase in phrases], dtype=np.int32)
+        self.ids = np.concatenate([self.ids, ids])
+        self.offsets = np.append(self.offsets, self.offsets[-1] + len(ids))
+
+    def take(
+        self,
+        positions: np.ndarray
+    ) -> "KeywordStore":
+        """
+        Returns a store with the rows at the positions, in that order, sharing the vocabulary of this store.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        index = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1], dtype=np.int64)
+        store = KeywordStore.__new__(KeywordStore)
+        store.phrases, store.lookup = self.phrases, self.lookup
+        store.offsets, store.ids = offsets, self.ids[index]
+        return store
+
+    def copy(
+        self
+    ) -> "KeywordStore":
+        """
+        Returns a copy of the store, with its own vocabulary, that can be appended to without changing this store.
+        """
+        return KeywordStore(list(self.phrases), self.offsets.copy(), self.ids.copy())
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the arrays, the vocabulary strings and the lookup dictionary of the store.
+        """
+        vocabulary = sys.getsizeof(self.phrases) + sum(sys.getsizeof(phrase) for phrase in self.phrases)
+        return self.offsets.nbytes + self.ids.nbytes + vocabulary + sys.getsizeof(self.lookup)
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the KeywordStore class.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function builds the store from the data source and prints its size and the phrases of the first row.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the number of rows and phrases of the data source and the first row.
+
+    Author: ``@ChinaiArman``
+    """
+    from dotenv import load_dotenv
+    import os
+    load_dotenv()
+    df = pd.read_csv(os.getenv("DATA_SOURCE_FILE", "server/data_source/data.csv"), dtype={"id": str})
+    store = KeywordStore.from_strings(df["keywordDescriptions"])
+    print(f"{len(store)} rows, {len(store.ids)} phrases, {len(store.phrases)} distinct, {store.memory_usage() / 2 ** 10:.0f} KiB")
+    print(store.row(0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A BM25 inverted index over the text columns of the data source.
+The index answers keyword queries lexically, without passing them through the embedded model,
+and provides lexical candidates to restrict the semantic search in the hybrid search mode.
+
+Requirements:
+This module requires the installation of the numpy and pandas libraries.
+
+Usage:
+To use this class, create a LexicalIndex from the data source DataFrame and call the search method.
+To execute this module from the root directory, run the following command:
+    ``python server/data_source/lexical_index.py <keywords>``
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+import re
+import sys
+
+
+INDEXED_COLUMNS = ["keywordDescriptions", "name", "description"]
+STOP_WORDS = {"a", "an", "and", "the", "of", "on", "in", "with", "to", "for", "up", "close"}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+COMPACTION_FRACTION = 0.1
+
+
+def tokenize(
+    text: str
+) -> list:
+    """
+    Splits a text into lowercase alphanumeric tokens, dropping stop words.
+
+    Args:
+    -----
+    text : ``str``
+        The text to tokenize.
+
+    Returns:
+    --------
+    ``list``
+        The list of tokens.
+
+    Example:
+    --------
+    >>> tokenize("A close-up of black Cargo Joggers")
+    ... ['black', 'cargo', 'joggers']
+
+    Author: ``@ChinaiArman``
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def document_text(
+    row: pd.Series
+) -> str:
+    """
+    Joins the indexed columns of a data source row into a single text.
+
+    Args:
+    -----
+    row : ``pd.Series``
+        A row of the data source.
+
+    Returns:
+    --------
+    ``str``
+        The text of the keyword descriptions, name and description of the row.
+
+    Example:
+    --------
+    >>> document_text(db.get_item_by_id("0").iloc[0])
+    ... 'a black pants on a white background, ... Cargo Joggers Black'
+
+    Author: ``@ChinaiArman``
+    """
+    return join_text([row.get(column) for column in INDEXED_COLUMNS])
+
+
+def join_text(
+    values: list
+) -> str:
+    """
+    Joins the values of the indexed columns of a row, in the order of INDEXED_COLUMNS, skipping the missing ones.
+    """
+    parts = []
+    for value in values:
+        if isinstance(value, list):
+            parts.append(", ".join(value))
+        elif pd.notna(value):
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+class LexicalIndex:
+    """
+    Class to score documents against keyword queries with the BM25 ranking function.
+
+    Args:
+    -----
+    ids : ``list``
+        The ids of the documents.
+    documents : ``list``
+        The text of each document.
+
+    Attributes:
+    -----------
+    ids : ``list``
+        The ids of the documents, in row order.
+    vocabulary : ``dict``
+        The mapping of each term to its term id.
+    offsets : ``np.ndarray``
+        The start of the postings of each term id, followed by the total number of postings.
+    postings : ``np.ndarray``
+        The document numbers of every posting, grouped by term id.
+    frequencies : ``np.ndarray``
+        The term frequency of every posting.
+    delta_terms : ``np.ndarray``
+        The term ids of the postings of the documents added since the last compaction.
+    delta_postings : ``np.ndarray``
+        The document numbers of the postings of the documents added since the last compaction.
+    delta_frequencies : ``np.ndarray``
+        The term frequency of the postings of the documents added since the last compaction.
+    rows : ``np.ndarray``
+        The row of each document number, -1 for the removed documents.
+    documents : ``np.ndarray``
+        The document number of each row.
+    lengths : ``np.ndarray``
+        The number of tokens of each row.
+
+    Methods:
+    --------
+    >>> from_data_frame(df)
+    ... # Builds the index from the data source DataFrame.
+    >>> add(id, document)
+    ... # Adds a document after the last row.
+    >>> remove(position)
+    ... # Removes the document of a row, shifting the rows after it.
+    >>> copy()
+    ... # Returns a copy of the index that can be added to and removed from without changing this one.
+    >>> score(keywords)
+    ... # Returns the BM25 score of every document for the keywords.
+    >>> search(keywords, size)
+    ... # Returns the ids and scores of the best matching documents.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the index.
+
+    Notes:
+    ------
+    1. The postings are stored as flat numpy arrays indexed by per-term offsets (compressed sparse rows), not as Python lists.
+    2. Scoring a query only touches the postings of its terms, so its cost is independent of the catalog size for rare terms.
+    3. The rows follow the vector index: a removed row shifts the rows after it and an added one is appended, so an edit moves the row to the end.
+    4. A write only tokenizes the changed document. Its postings are appended to the delta postings and a removed document is marked in `rows`,
+       and both are folded into the sorted postings once they exceed COMPACTION_FRACTION of the index, without tokenizing the documents again.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        ids: list,
+        documents: list
+    ) -> None:
+        """
+        Initializes the LexicalIndex class.
+        """
+        self.ids = list(ids)
+        self.vocabulary = {}
+        term_ids, rows = [], []
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, document in enumerate(documents):
+            tokens = tokenize(document)
+            lengths[row] = len(tokens)
+            term_ids.extend(self.vocabulary.setdefault(token, len(self.vocabulary)) for token in tokens)
+            rows.extend([row] * len(tokens))
+        keys, frequencies = np.unique(
+            np.array(term_ids, dtype=np.int64) * max(len(self.ids), 1) + np.array(rows, dtype=np.int64),
+            return_counts=True
+        )
+        terms = keys // max(len(self.ids), 1)
+        self.postings = (keys % max(len(self.ids), 1)).astype(np.int32)
+        self.frequencies = frequencies.astype(np.float32)
+        self.offsets = np.searchsorted(terms, np.arange(len(self.vocabulary) + 1)).astype(np.int64)
+        self.delta_terms = np.zeros(0, dtype=np.int32)
+        self.delta_postings = np.zeros(0, dtype=np.int32)
+        self.delta_frequencies = np.zeros(0, dtype=np.float32)
+        self.rows = np.arange(len(self.ids), dtype=np.int32)
+        self.documents = self.rows.copy()
+        self.lengths = lengths
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def from_data_frame(
+        cls,
+        df: pd.DataFrame
+    ) -> "LexicalIndex":
+        """
+        Builds the index from the data source DataFrame.
+
+        Args:
+        -----
+        df : ``pd.DataFrame``
+            The data source, with the keyword descriptions split into lists.
+
+        Returns:
+        --------
+        ``LexicalIndex``
+            The index of the keyword descriptions, name and description of every row.
+
+        Notes:
+        ------
+        1. The documents are joined from the column lists, without building a Series per row.
+
+        Example:
+        --------
+        >>> index = LexicalIndex.from_data_frame(Database().get_data_frame())
+
+        Author: ``@ChinaiArman``
+        """
+        columns = [df[column].tolist() if column in df else [None] * len(df) for column in INDEXED_COLUMNS]
+        return cls(df["id"].tolist(), [join_text(values) for values in zip(*columns)])
+
+    def copy(
+        self
+    ) -> "LexicalIndex":
+        """
+        Returns a copy of the index that can be added to and removed from without changing this one, sharing the arrays that `add` and `remove` replace.
+        """
+        clone = copy.copy(self)
+        clone.ids = list(self.ids)
+        return clone
+
+    def add(
+        self,
+        id: str,
+        document: str
+    ) -> None:
+        """
+        Adds a document after the last row of the index.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the document.
+        document : ``str``
+            The text of the document, e.g. joined by document_text.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. Only the new document is tokenized, its postings are appended to the delta postings.
+
+        Example:
+        --------
+        >>> index.add("3", "a black pants on a white background Cargo Joggers Black")
+
+        Author: ``@ChinaiArman``
+        """
+        tokens = tokenize(document)
+        if any(token not in self.vocabulary for token in tokens):
+            self.vocabulary = dict(self.vocabulary)
+        term_ids, frequencies = np.unique(
+            np.array([self.vocabulary.setdefault(token, len(self.vocabulary)) for token in tokens], dtype=np.int32), return_counts=True
+        )
+        number = len(self.rows)
+        self.delta_terms = np.concatenate((self.delta_terms, term_ids.astype(np.int32)))
+        self.delta_postings = np.concatenate((self.delta_postings, np.full(len(term_ids), number, dtype=np.int32)))
+        self.delta_frequencies = np.concatenate((self.delta_frequencies, frequencies.astype(np.float32)))
+        self.rows = np.append(self.rows, np.int32(len(self.ids)))
+        self.documents = np.append(self.documents, np.int32(number))
+        self.lengths = np.append(self.lengths, np.float32(len(tokens)))
+        self.ids.append(id)
+        self.average_length = float(self.lengths.mean())
+        self._compact_if_stale()
+
+    def remove(
+        self,
+        position: int
+    ) -> None:
+        """
+        Removes the document of a row from the index, shifting the rows after it.
+
+        Args:
+        -----
+        position : ``int``
+            The row of the document, e.g. its position in the vector index.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. The postings of the document are kept until the next compaction, they are skipped by the scoring.
+
+        Example:
+        --------
+        >>> index.remove(store.positions["3"])
+
+        Author: ``@ChinaiArman``
+        """
+        rows = self.rows.copy()
+        rows[self.documents[position]] = -1
+        rows[self.documents[position + 1:]] -= 1
+        self.rows = rows
+        self.documents = np.delete(self.documents, position)
+        self.lengths = np.delete(self.lengths, position)
+        del self.ids[position]
+        self.average_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        self._compact_if_stale()
+
+    def _compact_if_stale(
+        self
+    ) -> None:
+        """
+        Folds the delta postings into the sorted postings and drops the postings of the removed documents, once they exceed COMPACTION_FRACTION of the index.
+        """
+        removed = len(self.rows) - len(self.ids)
+        if len(self.delta_postings) <= COMPACTION_FRACTION * len(self.postings) and removed <= COMPACTION_FRACTION * len(self.ids):
+            return
+        terms = np.concatenate((np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets)), self.delta_terms))
+        rows = self.rows[np.concatenate((self.postings, self.delta_postings))]
+        frequencies = np.concatenate((self.frequencies, self.delta_frequencies))
+        live = rows >= 0
+        terms, rows, frequencies = terms[live], rows[live], frequencies[live]
+        order = np.argsort(terms, kind="stable")
+        self.postings, self.frequencies = rows[order], frequencies[order]
+        self.offsets = np.searchsorted(terms[order], np.arange(len(self.vocabulary) + 1)).astype(np.int64)
+        self.delta_terms = np.zeros(0, dtype=np.int32)
+        self.delta_postings = np.zeros(0, dtype=np.int32)
+        self.delta_frequencies = np.zeros(0, dtype=np.float32)
+        self.rows = np.arange(len(self.ids), dtype=np.int32)
+        self.documents = self.rows.copy()
+
+    def score(
+        self,
+        keywords: list
+    ) -> np.ndarray:
+        """
+        Returns the BM25 score of every document for the keywords.
+
+        Args:
+        -----
+        keywords : ``list``
+            A list of keywords.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            The score of each document, 0 for documents that match none of the keywords.
+
+        Notes:
+        ------
+        1. The idf of a term is log(1 + (N - df + 0.5) / (df + 0.5)), which is always positive.
+        2. The postings of the removed documents are skipped and the delta postings of the added ones included, so the scores match a rebuilt index.
+
+        Example:
+        --------
+        >>> scores = index.score(["black", "cargo", "joggers"])
+
+        Author: ``@ChinaiArman``
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        normalization = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / max(self.average_length, 1))
+        for token in set(tokenize(" ".join(keywords))):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = self.offsets[min(term_id, len(self.offsets) - 1)], self.offsets[min(term_id + 1, len(self.offsets) - 1)]
+            rows, frequencies = self.rows[self.postings[start:end]], self.frequencies[start:end]
+            if len(self.delta_terms):
+                delta = self.delta_terms == term_id
+                rows = np.concatenate((rows, self.rows[self.delta_postings[delta]]))
+                frequencies = np.concatenate((frequencies, self.delta_frequencies[delta]))
+            live = rows >= 0
+            rows, frequencies = rows[live], frequencies[live]
+            if not len(rows):
+                continue
+            idf = np.log(1 + (len(self.ids) - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * frequencies * (BM25_K1 + 1) / (frequencies + normalization[rows])
+        return scores
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the postings, the document lengths, the vocabulary and the id list of the index.
+        """
+        arrays = sum(array.nbytes for array in (
+            self.postings, self.frequencies, self.offsets, self.delta_terms, self.delta_postings, self.delta_frequencies,
+            self.rows, self.documents, self.lengths
+        ))
+        return arrays + sys.getsizeof(self.vocabulary) + sum(map(sys.getsizeof, self.vocabulary)) + sys.getsizeof(self.ids)
+
+    def search(
+        self,
+        keywords: list,
+        size: int,
+        positions: np.ndarray = None
+    ) -> tuple[
+            list,
+            np.ndarray
+        ]:
+        """
+        Returns the ids and scores of the best matching documents.
+
+        Args:
+        -----
+        keywords : ``list``
+            A list of keywords.
+        size : ``int``
+            The maximum number of results to return.
+
+        Keyword Args:
+        -------------
+        positions : ``np.ndarray``
+            The rows allowed in the results, e.g. the rows matching the attribute filters. Default is None (all rows).
+
+        Returns:
+        --------
+        ``tuple``
+            A tuple containing the list of ids and the array of BM25 scores, from best to worst match.
+
+        Notes:
+        ------
+        1. Documents that match none of the keywords are never returned, so fewer than `size` results may be returned.
+
+        Example:
+        --------
+        >>> ids, scores = index.search(["black", "cargo", "joggers"], 5)
+
+        Author: ``@ChinaiArman``
+        """
+        scores = self.score(keywords)
+        if positions is not None:
+            allowed = np.zeros(len(self.ids), dtype=bool)
+            allowed[positions] = True
+            scores[~allowed] = 0
+        matches = np.flatnonzero(scores)
+        order = matches[np.argsort(-scores[matches], kind="stable")[:max(size, 0)]]
+        return [self.ids[row] for row in order], scores[order]
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the LexicalIndex class on the data source.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function builds the index from the data source and prints the best matches for the keywords passed on the command line.
+
+    Example:
+    --------
+    >>> python lexical_index.py black cargo joggers
+    ... # Prints the 5 best lexical matches.
+
+    Author: ``@ChinaiArman``
+    """
+    import sys
+    from data_access import Database
+    index = LexicalIndex.from_data_frame(Database().get_data_frame())
+    ids, scores = index.search(sys.argv[1:], 5)
+    for id, score in zip(ids, scores):
+        print(f"{id}: {score:.2f}")
+
+
+if __name__ == "__main__":
+    main()
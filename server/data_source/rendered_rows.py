@@ -0,0 +1,293 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Keeps the JSON encoding of every row of the data source pre-rendered as bytes.
+Responses are assembled by concatenating the rendered rows, so no DataFrame filtering, conversion or JSON encoding happens per request.
+
+Requirements:
+This module requires the installation of the pandas library.
+
+Usage:
+To use this class, create a RenderedRows from the data source DataFrame and call the array method with a list of ids.
+To execute this module from the root directory, run the following command:
+    ``python server/data_source/rendered_rows.py``
+"""
+
+import json
+import sys
+import pandas as pd
+from typing import Iterator
+
+
+def render_row(
+    row: dict
+) -> bytes:
+    """
+    Encodes a data source row as compact JSON.
+
+    Args:
+    -----
+    row : ``dict``
+        The row, with missing values already replaced by empty strings.
+
+    Returns:
+    --------
+    ``bytes``
+        The UTF-8 JSON object of the row, with sorted keys like Flask's jsonify.
+
+    Example:
+    --------
+    >>> render_row({"id": "1", "name": "shirt"})
+    ... b'{"id":"1","name":"shirt"}'
+
+    Author: ``@ChinaiArman``
+    """
+    return json.dumps(row, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+class RenderedRows:
+    """
+    Class to keep the JSON encoding of every row of the data source and assemble responses from it.
+
+    Args:
+    -----
+    fragments : ``dict``
+        A dictionary mapping each id to the JSON encoding of its row.
+
+    Attributes:
+    -----------
+    fragments : ``dict``
+        A dictionary mapping each id to the JSON encoding of its row.
+
+    Methods:
+    --------
+    >>> from_data_frame(df)
+    ... # Renders every row of the data source DataFrame.
+    >>> update(row)
+    ... # Renders a new or edited row.
+    >>> remove(id)
+    ... # Removes the rendered row of an id.
+    >>> copy()
+    ... # Returns a copy of the rendered rows that can be modified independently.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the rendered rows.
+    >>> get(id)
+    ... # Returns the rendered row of an id.
+    >>> array(ids)
+    ... # Returns the JSON array of the rows of the ids.
+    >>> stream(ids)
+    ... # Yields the rows of the ids as newline delimited JSON.
+
+    Notes:
+    ------
+    1. Rows are only rendered when they are loaded, inserted or edited.
+    2. A rendered row is identical to the `fillna("").to_dict("records")` object of the row encoded by jsonify, without whitespace.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        fragments: dict
+    ) -> None:
+        """
+        Initializes the RenderedRows class.
+        """
+        self.fragments = fragments
+
+    @classmethod
+    def from_data_frame(
+        cls,
+        df: pd.DataFrame
+    ) -> "RenderedRows":
+        """
+        Renders every row of the data source DataFrame.
+
+        Args:
+        -----
+        df : ``pd.DataFrame``
+            The data source.
+
+        Returns:
+        --------
+        ``RenderedRows``
+            The rendered rows of the data source.
+
+        Example:
+        --------
+        >>> rows = RenderedRows.from_data_frame(Database().get_data_frame())
+
+        Author: ``@ChinaiArman``
+        """
+        return cls({row["id"]: render_row(row) for row in df.fillna("").to_dict("records")})
+
+    def update(
+        self,
+        row: dict
+    ) -> None:
+        """
+        Renders a new or edited row.
+
+        Args:
+        -----
+        row : ``dict``
+            The row, as returned by the add_row and edit_row methods of the Database class.
+
+        Returns:
+        --------
+        None.
+
+        Example:
+        --------
+        >>> rows.update(db.add_row(data))
+
+        Author: ``@ChinaiArman``
+        """
+        self.fragments[row["id"]] = render_row(pd.DataFrame([row]).fillna("").to_dict("records")[0])
+
+    def remove(
+        self,
+        id: str
+    ) -> None:
+        """
+        Removes the rendered row of an id.
+        """
+        self.fragments.pop(id, None)
+
+    def copy(
+        self
+    ) -> "RenderedRows":
+        """
+        Returns a copy of the rendered rows that can be updated without changing these, sharing the rendered bytes.
+        """
+        return RenderedRows(dict(self.fragments))
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the rendered rows and their dictionary.
+        """
+        return sys.getsizeof(self.fragments) + sum(sys.getsizeof(fragment) for fragment in self.fragments.values())
+
+    def get(
+        self,
+        id: str
+    ) -> bytes:
+        """
+        Returns the rendered row of an id.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the row.
+
+        Returns:
+        --------
+        ``bytes``
+            The JSON object of the row, or None if the id does not exist.
+
+        Example:
+        --------
+        >>> rows.get("1")
+        ... b'{"description":"Black","id":"1",...}'
+
+        Author: ``@ChinaiArman``
+        """
+        return self.fragments.get(id)
+
+    def array(
+        self,
+        ids: list
+    ) -> bytes:
+        """
+        Returns the JSON array of the rows of the ids.
+
+        Args:
+        -----
+        ids : ``list``
+            The ids of the rows, in response order.
+
+        Returns:
+        --------
+        ``bytes``
+            The JSON array of the rows, skipping the ids that do not exist.
+
+        Example:
+        --------
+        >>> rows.array(["1", "2"])
+        ... b'[{"description":"Black","id":"1",...},{...}]'
+
+        Author: ``@ChinaiArman``
+        """
+        fragments = self.fragments
+        return b"[" + b",".join([fragments[id] for id in ids if id in fragments]) + b"]"
+
+    def stream(
+        self,
+        ids: list
+    ) -> Iterator[bytes]:
+        """
+        Yields the rows of the ids as newline delimited JSON.
+
+        Args:
+        -----
+        ids : ``list``
+            The ids of the rows, in response order.
+
+        Returns:
+        --------
+        ``Iterator[bytes]``
+            A generator of one JSON object line per row, skipping the ids that do not exist.
+
+        Notes:
+        ------
+        1. Each line is produced when it is consumed, so the first line is ready at once and no full document is held in memory.
+
+        Example:
+        --------
+        >>> for line in rows.stream(["1", "2"]):
+        ...     print(line)
+        ... b'{"description":"Black","id":"1",...}\\n'
+
+        Author: ``@ChinaiArman``
+        """
+        for id in ids:
+            fragment = self.fragments.get(id)
+            if fragment is not None:
+                yield fragment + b"\n"
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the RenderedRows class on the data source.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function renders the data source and prints the JSON array of its first two rows.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the JSON array of the first two rows.
+
+    Author: ``@ChinaiArman``
+    """
+    from data_access import Database
+    df = Database().get_data_frame()
+    rows = RenderedRows.from_data_frame(df)
+    print(rows.array(df["id"].head(2).tolist()).decode())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Compacts the dense captions of an image before they are stored or embedded.
+Duplicate captions are removed, boilerplate prefixes like "a close-up of" are stripped, and the number of captions per item is capped,
+so the texts passed to the embedded model are shorter and carry the same information.
+
+Requirements:
+This module has no external requirements.
+The compaction is enabled by the "CAPTION_COMPACTION" environment variable, and configured by the
+"CAPTION_STOP_PHRASES" and "CAPTION_MAX_PHRASES" environment variables.
+
+Usage:
+To use this module, call the compact function with a list of captions.
+To execute this module from the root directory, run the following command:
+    ``python server/dense_captioning_model/caption_compaction.py``
+"""
+
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+
+DEFAULT_STOP_PHRASES = (
+    "a close-up of", "a close up of", "close-up of", "close up of", "a blurry image of",
+    "a picture of", "a photo of", "an image of", "a drawing of", "a cartoon of",
+)
+DEFAULT_MAX_PHRASES = 6
+
+
+def get_compaction_settings(
+) -> dict:
+    """
+    Returns the caption compaction settings read from the environment variables, or None if the compaction is disabled.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``dict``
+        A dictionary with the "stop_phrases" tuple and the "max_phrases" cap (0 for no cap), or None.
+
+    Notes:
+    ------
+    1. The compaction is enabled when "CAPTION_COMPACTION" is "true" (default "false").
+    2. "CAPTION_STOP_PHRASES" is a "|" separated list of the prefixes to strip, "CAPTION_MAX_PHRASES" the number of captions kept.
+
+    Example:
+    --------
+    >>> get_compaction_settings()
+    ... {'stop_phrases': ('a close-up of', ...), 'max_phrases': 6}
+
+    Author: ``@ChinaiArman``
+    """
+    if os.getenv("CAPTION_COMPACTION", "false").lower() != "true":
+        return None
+    stop_phrases = os.getenv("CAPTION_STOP_PHRASES")
+    return {
+        "stop_phrases": tuple(phrase.strip().lower() for phrase in stop_phrases.split("|") if phrase.strip()) if stop_phrases is not None else DEFAULT_STOP_PHRASES,
+        "max_phrases": int(os.getenv("CAPTION_MAX_PHRASES", DEFAULT_MAX_PHRASES)),
+    }
+
+
+def compact_captions(
+    captions: list,
+    stop_phrases: tuple = DEFAULT_STOP_PHRASES,
+    max_phrases: int = DEFAULT_MAX_PHRASES
+) -> list:
+    """
+    Removes the duplicates and boilerplate prefixes of a list of captions and caps their number.
+
+    Args:
+    -----
+    captions : ``list``
+        The captions of an image, most relevant first.
+
+    Keyword Args:
+    -------------
+    stop_phrases : ``tuple``
+        The lowercase prefixes stripped from the start of the captions. Default is DEFAULT_STOP_PHRASES.
+    max_phrases : ``int``
+        The number of captions kept, 0 for no cap. Default is DEFAULT_MAX_PHRASES.
+
+    Returns:
+    --------
+    ``list``
+        The compacted captions, in their original order.
+
+    Notes:
+    ------
+    1. The prefixes are stripped repeatedly and only as whole words, so "a close-up of a pair of jeans" becomes "a pair of jeans".
+    2. Captions are duplicates if they are equal after stripping, ignoring case and whitespace. The first one is kept.
+    3. A caption that is only a stop phrase is dropped, unless every caption is, in which case the deduplicated captions are kept.
+    4. The function is idempotent, so captions compacted at ingest are unchanged when they are compacted again before embedding.
+
+    Example:
+    --------
+    >>> compact_captions(["a black shirt on a swinger", "a close-up of a black shirt on a swinger", "a close-up of a zipper"])
+    ... ['a black shirt on a swinger', 'a zipper']
+
+    Author: ``@ChinaiArman``
+    """
+    compacted, fallback, seen = [], [], set()
+    for caption in captions:
+        text = " ".join(caption.split())
+        stripped = True
+        while stripped:
+            stripped = False
+            for phrase in stop_phrases:
+                if text.lower().startswith(phrase + " "):
+                    text = text[len(phrase):].lstrip()
+                    stripped = True
+        key = text.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in stop_phrases or not key:
+            fallback.append(" ".join(caption.split()))
+        else:
+            compacted.append(text)
+    compacted = compacted or list(dict.fromkeys(fallback))
+    return compacted[:max_phrases] if max_phrases > 0 else compacted
+
+
+def compact(
+    captions: list
+) -> list:
+    """
+    Compacts a list of captions with the settings of the environment variables, or returns it unchanged if the compaction is disabled.
+    """
+    settings = get_compaction_settings()
+    if settings is None or captions is None:
+        return captions
+    return compact_captions(captions, **settings)
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the compaction of the keyword descriptions of the data source.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function compacts the keyword descriptions of every row with the default settings and prints the reduction in captions and words.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the number of captions and words before and after the compaction, and an example row.
+
+    Author: ``@ChinaiArman``
+    """
+    import pandas as pd
+    df = pd.read_csv(os.getenv("DATA_SOURCE_FILE", "server/data_source/data.csv"))
+    before = df["keywordDescriptions"].fillna("").str.split(", ").tolist()
+    after = [compact_captions(captions) for captions in before]
+    for name, lists in (("before", before), ("after", after)):
+        print(f"{name}: {sum(map(len, lists))} captions, {sum(len(caption.split()) for captions in lists for caption in captions)} words")
+    print(before[0], "->", after[0])
+
+
+if __name__ == "__main__":
+    main()
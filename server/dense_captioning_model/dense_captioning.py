@@ -21,12 +21,19 @@ where <filepath_or_url> is the file path or URL of the image.
 
 
 import os
+import sys
 import requests
 from dotenv import load_dotenv
 from azure.ai.vision.imageanalysis import ImageAnalysisClient
 from azure.ai.vision.imageanalysis.models import VisualFeatures, ImageAnalysisResult
 from azure.core.credentials import AzureKeyCredential
 
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from instrumentation import span
+from dense_captioning_model.caption_compaction import compact
+
 
 def create_dense_captions(
     filepath_or_url: str
@@ -80,22 +87,24 @@ def create_dense_captions(
     )
 
     # Load image and convert to 'bytes' object.
-    try: 
-        with open(filepath_or_url, "rb") as f:
-            image_data = f.read()
-    except:
-        try:
-            image_data = requests.get(filepath_or_url).content
+    with span("image_fetch"):
+        try: 
+            with open(filepath_or_url, "rb") as f:
+                image_data = f.read()
         except:
-            print(f"Error: Invalid Filepath or URL")
-            return
+            try:
+                image_data = requests.get(filepath_or_url).content
+            except:
+                print(f"Error: Invalid Filepath or URL")
+                return
 
     # Call dense captioning model to create keyword captions.
-    response = client.analyze(
-        image_data=image_data,
-        visual_features=[VisualFeatures.DENSE_CAPTIONS],
-        gender_neutral_caption=True,
-    )
+    with span("caption"):
+        response = client.analyze(
+            image_data=image_data,
+            visual_features=[VisualFeatures.DENSE_CAPTIONS],
+            gender_neutral_caption=True,
+        )
     return response
 
 
@@ -119,6 +128,7 @@ def normalize_dense_caption_response(
     ------
     1. The function extracts the keyword captions from the dense captioning response.
     2. The function filters the keywords based on a confidence threshold of 0.8.
+    3. If "CAPTION_COMPACTION" is enabled, duplicate captions and boilerplate prefixes are removed and the number of captions is capped (see caption_compaction).
 
     Example:
     --------
@@ -132,7 +142,7 @@ def normalize_dense_caption_response(
         keywords = [caption.text for caption in response.dense_captions.list if caption.confidence > 0.8]
         if len(keywords) == 0:
             keywords = [caption.text for caption in response.dense_captions.list]
-        return keywords
+        return compact(keywords)
 
 
 def main(
@@ -0,0 +1,223 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Fits and applies a PCA projection that reduces the dimension of the catalog embeddings.
+The projection is used by the VectorStore to score every row cheaply before rescoring the best candidates with the full vectors.
+
+Requirements:
+This module requires the installation of the numpy library.
+The data source file path must be specified in the environment variables under "DATA_SOURCE_FILE".
+
+Usage:
+To fit the projection offline on the vector index of the data source, run the following command from the root directory:
+    ``python server/embedded_model/dimensionality_reduction.py <dimensions>``
+where <dimensions> is the number of dimensions to keep.
+"""
+
+import argparse
+import numpy as np
+import os
+
+
+PROJECTION_FILE = "pca.npz"
+PCA_SAMPLE_ROWS = 50000
+
+
+def fit_projection(
+    vectors: np.ndarray,
+    dimensions: int,
+    seed: int = 0
+) -> tuple[
+        np.ndarray,
+        np.ndarray
+    ]:
+    """
+    Fits a PCA projection on a matrix of embeddings.
+
+    Args:
+    -----
+    vectors : ``np.ndarray``
+        A float32 matrix of shape (rows, full_dimensions).
+    dimensions : ``int``
+        The number of principal components to keep.
+
+    Keyword Args:
+    -------------
+    seed : ``int``
+        The random seed used to sample the rows. Default is 0.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the mean vector and the (dimensions, full_dimensions) matrix of principal components.
+
+    Notes:
+    ------
+    1. At most PCA_SAMPLE_ROWS rows are sampled to compute the covariance matrix.
+    2. The components are the eigenvectors of the covariance matrix with the largest eigenvalues.
+
+    Example:
+    --------
+    >>> mean, components = fit_projection(vectors, 128)
+    >>> print(components.shape)
+    ... (128, 768)
+
+    Author: ``@ChinaiArman``
+    """
+    if len(vectors) > PCA_SAMPLE_ROWS:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[np.sort(rng.choice(len(vectors), PCA_SAMPLE_ROWS, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float64)
+    mean = vectors.mean(axis=0)
+    centered = vectors - mean
+    eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+    components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dimensions]].T
+    return mean.astype(np.float32), np.ascontiguousarray(components, dtype=np.float32)
+
+
+def project(
+    vectors: np.ndarray,
+    mean: np.ndarray,
+    components: np.ndarray
+) -> np.ndarray:
+    """
+    Projects embeddings onto the principal components.
+
+    Args:
+    -----
+    vectors : ``np.ndarray``
+        A float32 vector or matrix of embeddings.
+    mean : ``np.ndarray``
+        The mean vector of the projection.
+    components : ``np.ndarray``
+        The principal components of the projection.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        The projected embeddings.
+
+    Example:
+    --------
+    >>> reduced = project(vectors, mean, components)
+    >>> print(reduced.shape)
+    ... (1000, 128)
+
+    Author: ``@ChinaiArman``
+    """
+    return (np.asarray(vectors, dtype=np.float32) - mean) @ components.T
+
+
+def save_projection(
+    directory: str,
+    mean: np.ndarray,
+    components: np.ndarray
+) -> None:
+    """
+    Writes a projection to the vector index directory.
+
+    Args:
+    -----
+    directory : ``str``
+        The directory of the vector index.
+    mean : ``np.ndarray``
+        The mean vector of the projection.
+    components : ``np.ndarray``
+        The principal components of the projection.
+
+    Returns:
+    --------
+    None.
+
+    Example:
+    --------
+    >>> save_projection("data_index", mean, components)
+
+    Author: ``@ChinaiArman``
+    """
+    np.savez(os.path.join(directory, PROJECTION_FILE), mean=mean, components=components)
+
+
+def load_projection(
+    directory: str,
+    dimensions: int
+) -> tuple[
+        np.ndarray,
+        np.ndarray
+    ]:
+    """
+    Reads a projection from the vector index directory.
+
+    Args:
+    -----
+    directory : ``str``
+        The directory of the vector index.
+    dimensions : ``int``
+        The number of dimensions the projection must keep.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the mean vector and the principal components, or None if no projection with that many dimensions is stored.
+
+    Example:
+    --------
+    >>> projection = load_projection("data_index", 128)
+
+    Author: ``@ChinaiArman``
+    """
+    path = os.path.join(directory, PROJECTION_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as projection:
+        if projection["components"].shape[0] != dimensions:
+            return None
+        return projection["mean"], projection["components"]
+
+
+def main(
+) -> None:
+    """
+    Fits the projection on the vector index of the data source and writes it alongside the index.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The vector index must already exist, it is built on the first start of the server.
+    2. The server uses the projection when the "COARSE_DIMENSIONS" environment variable matches its dimensions.
+
+    Example:
+    --------
+    >>> python dimensionality_reduction.py 128
+    ... # Fits and saves a 128 dimension projection.
+
+    Author: ``@ChinaiArman``
+    """
+    from dotenv import load_dotenv
+    import sys
+    load_dotenv()
+    sys.path.insert(0, os.getenv("PYTHONPATH"))
+    from embedded_model.vector_store import VectorStore
+    from embedded_model.semantic_textual_analysis import get_index_directory
+
+    parser = argparse.ArgumentParser(description="Fits a PCA projection on the catalog embeddings.")
+    parser.add_argument("dimensions", action="store", type=int, help="The number of dimensions to keep.")
+    args = parser.parse_args()
+
+    store = VectorStore(get_index_directory())
+    mean, components = fit_projection(store.full_vectors[store.rows], args.dimensions)
+    save_projection(store.directory, mean, components)
+    print(f"Saved a {args.dimensions} dimension projection to {store.directory}.")
+
+
+if __name__ == "__main__":
+    main()
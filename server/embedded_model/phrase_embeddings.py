@@ -0,0 +1,363 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A cache of the embeddings of the distinct keyword description phrases of the catalog, from which row embeddings are composed by pooling.
+Each phrase is passed through the model once, so a catalog with far fewer distinct phrases than rows is embedded with far fewer forward passes,
+and a new item whose phrases are already known is embedded without the model.
+The cache is appended to files on disk, so it survives restarts and is discarded when the embedded model changes.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To use this class, create a PhraseEmbeddings and call the pool method with a KeywordStore and a function embedding a list of texts.
+To execute this module from the root directory, run the following command:
+    ``python server/embedded_model/phrase_embeddings.py``
+"""
+
+import numpy as np
+import json
+import threading
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from data_source.keyword_store import KeywordStore
+
+
+EMBEDDING_MODES = ("sentence", "phrase")
+PHRASES_FILE = "phrases.jsonl"
+VECTORS_FILE = "phrase_vectors.f32"
+META_FILE = "meta.json"
+POOLING_CHUNK_ROWS = 65536
+
+
+def pool_rows(
+    vectors: np.ndarray,
+    offsets: np.ndarray,
+    ids: np.ndarray
+) -> np.ndarray:
+    """
+    Composes normalized row embeddings by mean pooling phrase embeddings over CSR rows.
+
+    Args:
+    -----
+    vectors : ``np.ndarray``
+        The embeddings of the phrases, one row per phrase id.
+    offsets : ``np.ndarray``
+        The offsets of the rows into `ids`.
+    ids : ``np.ndarray``
+        The phrase ids of all rows, concatenated.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        A float32 matrix with one unit L2 norm row per CSR row, zero for rows without phrases.
+
+    Notes:
+    ------
+    1. The rows are pooled in chunks of POOLING_CHUNK_ROWS, so only the phrase vectors of one chunk are gathered at a time.
+    2. The mean and the sum of the phrase vectors have the same direction, so the sum is normalized directly.
+
+    Example:
+    --------
+    >>> pool_rows(phrase_vectors, store.offsets, store.ids).shape
+    ... (2744, 768)
+
+    Author: ``@ChinaiArman``
+    """
+    rows = len(offsets) - 1
+    pooled = np.zeros((rows, vectors.shape[1]), dtype=np.float32)
+    lengths = np.diff(offsets)
+    for start in range(0, rows, POOLING_CHUNK_ROWS):
+        end = min(start + POOLING_CHUNK_ROWS, rows)
+        first, last = offsets[start], offsets[end]
+        if first == last:
+            continue
+        nonempty = np.flatnonzero(lengths[start:end])
+        pooled[start + nonempty] = np.add.reduceat(vectors[ids[first:last]], offsets[start:end][nonempty] - first)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    np.divide(pooled, norms, out=pooled, where=norms > 0)
+    return pooled
+
+
+class PhraseEmbeddings:
+    """
+    Class to cache the embeddings of phrases and compose row embeddings from them.
+
+    Args:
+    -----
+    directory : ``str``
+        The directory the cache is stored in, or None to keep it in memory only.
+    model_name : ``str``
+        The name of the embedded model, the cache is discarded if it was built with another model.
+
+    Attributes:
+    -----------
+    lookup : ``dict``
+        A dictionary mapping each cached phrase to its row of `vectors`.
+    vectors : ``np.ndarray``
+        The normalized embeddings of the cached phrases, with spare rows beyond `len(self)`.
+    embedded : ``int``
+        The number of phrases passed to the model by this instance.
+    lock : ``threading.Lock``
+        The lock serializing the additions to the cache, e.g. by the vector indexes of several catalogs.
+
+    Methods:
+    --------
+    >>> vectors_for(phrases, embed, add)
+    ... # Returns the embeddings of phrases, embedding only the ones not cached.
+    >>> pool(store, embed, add)
+    ... # Returns the pooled row embeddings of a KeywordStore.
+    >>> embed_rows(keyword_lists, embed, add)
+    ... # Returns the pooled row embeddings of lists of phrases.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the cache.
+
+    Notes:
+    ------
+    1. The phrases and their vectors are appended to PHRASES_FILE and VECTORS_FILE, so adding a phrase does not rewrite the cache.
+    2. Only the complete entries are loaded, and the files are truncated to them, so a write interrupted between the two files loses at most the last phrases.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        directory: str = None,
+        model_name: str = None
+    ) -> None:
+        """
+        Initializes the PhraseEmbeddings class.
+        """
+        self.directory = directory
+        self.model_name = model_name
+        self.lookup = {}
+        self.vectors = None
+        self.embedded = 0
+        self.lock = threading.Lock()
+        if directory is not None:
+            self._load()
+
+    def __len__(
+        self
+    ) -> int:
+        """
+        Returns the number of cached phrases.
+        """
+        return len(self.lookup)
+
+    def _load(
+        self
+    ) -> None:
+        """
+        Loads the cache from its directory, or clears the directory if the cache was built with another model.
+        """
+        meta_path = os.path.join(self.directory, META_FILE)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            for name in (PHRASES_FILE, VECTORS_FILE, META_FILE):
+                if os.path.exists(os.path.join(self.directory, name)):
+                    os.remove(os.path.join(self.directory, name))
+            return
+        with open(os.path.join(self.directory, PHRASES_FILE), "r") as f:
+            phrases = [json.loads(line) for line in f if line.endswith("\n")]
+        vectors = np.fromfile(os.path.join(self.directory, VECTORS_FILE), dtype=np.float32)
+        vectors = vectors[:len(vectors) // meta["dimensions"] * meta["dimensions"]].reshape(-1, meta["dimensions"])
+        count = min(len(phrases), len(vectors))
+        if len(phrases) != count or os.path.getsize(os.path.join(self.directory, VECTORS_FILE)) != count * meta["dimensions"] * 4:
+            os.truncate(os.path.join(self.directory, VECTORS_FILE), count * meta["dimensions"] * 4)
+            with open(os.path.join(self.directory, PHRASES_FILE), "w") as f:
+                f.writelines(json.dumps(phrase) + "\n" for phrase in phrases[:count])
+        self.vectors = vectors[:count].copy()
+        self.lookup = {phrase: row for row, phrase in enumerate(phrases[:count])}
+
+    def _append(
+        self,
+        phrases: list,
+        vectors: np.ndarray
+    ) -> None:
+        """
+        Adds new phrases and their embeddings to the cache and to its files.
+        """
+        count = len(self)
+        if self.vectors is None:
+            self.vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        if count + len(phrases) > len(self.vectors):
+            grown = np.empty((max(2 * len(self.vectors), count + len(phrases)), vectors.shape[1]), dtype=np.float32)
+            grown[:count] = self.vectors[:count]
+            self.vectors = grown
+        self.vectors[count:count + len(phrases)] = vectors
+        self.lookup.update((phrase, count + i) for i, phrase in enumerate(phrases))
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, META_FILE), "w") as f:
+            json.dump({"model": self.model_name, "dimensions": int(vectors.shape[1])}, f)
+        with open(os.path.join(self.directory, VECTORS_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(os.path.join(self.directory, PHRASES_FILE), "a") as f:
+            f.writelines(json.dumps(phrase) + "\n" for phrase in phrases)
+
+    def vectors_for(
+        self,
+        phrases: list,
+        embed,
+        add: bool = True
+    ) -> np.ndarray:
+        """
+        Returns the embeddings of phrases, passing only the phrases that are not cached through the model.
+
+        Args:
+        -----
+        phrases : ``list``
+            The phrases to embed.
+        embed : ``callable``
+            A function returning the normalized embeddings of a list of texts, e.g. embed_texts bound to a model.
+
+        Keyword Args:
+        -------------
+        add : ``bool``
+            Whether the new phrases are added to the cache. Default is True.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            A float32 matrix with the embedding of each phrase, in order.
+
+        Notes:
+        ------
+        1. Each distinct new phrase is embedded once, in the batches of the `embed` function.
+        2. The new phrases are embedded and added under the lock, so concurrent callers never add a phrase twice.
+
+        Example:
+        --------
+        >>> cache.vectors_for(["a black shirt", "a close-up of a zipper"], lambda texts: embed_texts(texts, model, tokenizer))
+
+        Author: ``@ChinaiArman``
+        """
+        missing = [phrase for phrase in dict.fromkeys(phrases) if phrase not in self.lookup]
+        new = {}
+        if missing and add:
+            with self.lock:
+                missing = [phrase for phrase in missing if phrase not in self.lookup]
+                if missing:
+                    self._append(missing, np.asarray(embed(missing), dtype=np.float32))
+                    self.embedded += len(missing)
+        elif missing:
+            new = dict(zip(missing, np.asarray(embed(missing), dtype=np.float32)))
+            self.embedded += len(missing)
+        if not phrases:
+            return np.empty((0, 0 if self.vectors is None else self.vectors.shape[1]), dtype=np.float32)
+        return np.stack([new[phrase] if phrase in new else self.vectors[self.lookup[phrase]] for phrase in phrases])
+
+    def pool(
+        self,
+        store: KeywordStore,
+        embed,
+        add: bool = True
+    ) -> np.ndarray:
+        """
+        Returns the row embeddings of a KeywordStore, pooled from the embeddings of its phrases.
+
+        Args:
+        -----
+        store : ``KeywordStore``
+            The keyword descriptions of the rows.
+        embed : ``callable``
+            A function returning the normalized embeddings of a list of texts.
+
+        Keyword Args:
+        -------------
+        add : ``bool``
+            Whether the new phrases are added to the cache. Default is True.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            A float32 matrix with one normalized embedding per row of the store.
+
+        Notes:
+        ------
+        1. Only the phrases used by the rows of the store are embedded, the rows are composed from them without the model.
+
+        Example:
+        --------
+        >>> vectors = cache.pool(Database().keywords, lambda texts: embed_texts(texts, model, tokenizer))
+
+        Author: ``@ChinaiArman``
+        """
+        used, ids = np.unique(store.ids, return_inverse=True)
+        return pool_rows(self.vectors_for([store.phrases[i] for i in used], embed, add), store.offsets, ids)
+
+    def embed_rows(
+        self,
+        keyword_lists: list,
+        embed,
+        add: bool = True
+    ) -> np.ndarray:
+        """
+        Returns the pooled row embeddings of lists of phrases, e.g. a new item or the keywords of a query.
+        """
+        return self.pool(KeywordStore.from_lists(keyword_lists), embed, add)
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the cached vectors.
+        """
+        return 0 if self.vectors is None else self.vectors.nbytes
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the PhraseEmbeddings class with random phrase embeddings.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function pools the keyword descriptions of the data source from random phrase embeddings,
+       then embeds a new row whose phrases are all known and prints how many phrases went through the "model".
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the number of rows, distinct phrases and embedded phrases.
+
+    Author: ``@ChinaiArman``
+    """
+    import pandas as pd
+    rng = np.random.default_rng(0)
+
+    def embed(texts):
+        vectors = rng.standard_normal((len(texts), 64)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    df = pd.read_csv(os.getenv("DATA_SOURCE_FILE", "server/data_source/data.csv"), dtype={"id": str})
+    store = KeywordStore.from_strings(df["keywordDescriptions"])
+    cache = PhraseEmbeddings()
+    vectors = cache.pool(store, embed)
+    print(f"{len(vectors)} rows pooled from {len(cache)} phrases, {cache.embedded} embedded")
+    cache.embed_rows([store.row(0)], embed)
+    print(f"New row with known phrases: {cache.embedded} embedded in total")
+
+
+if __name__ == "__main__":
+    main()
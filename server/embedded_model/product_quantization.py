@@ -0,0 +1,457 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A product quantizer that compresses the catalog embeddings into compact uint8 codes.
+Each vector is split into subspaces and every subspace is replaced by the index of its nearest k-means centroid.
+Queries are scored with a precomputed lookup table of the query's dot product with every centroid.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To use this class, train a ProductQuantizer on a sample of the embeddings, encode the embeddings and save the index.
+To execute this module from the root directory, run the following command:
+    ``python server/embedded_model/product_quantization.py``
+"""
+
+import numpy as np
+import os
+
+
+PQ_FILE = "pq.bin"
+PQ_MAGIC = b"GRPQ"
+PQ_VERSION = 1
+PQ_HEADER_BYTES = 64
+PQ_TRAINING_ROWS = 20000
+PQ_ITERATIONS = 20
+ENCODING_CHUNK_ROWS = 16384
+SCORING_CHUNK_ROWS = 8192
+
+
+def kmeans(
+    data: np.ndarray,
+    clusters: int,
+    iterations: int = PQ_ITERATIONS,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Clusters the rows of a matrix with Lloyd's k-means algorithm.
+
+    Args:
+    -----
+    data : ``np.ndarray``
+        A float32 matrix of shape (rows, dimensions).
+    clusters : ``int``
+        The number of centroids.
+
+    Keyword Args:
+    -------------
+    iterations : ``int``
+        The number of assignment and update steps. Default is PQ_ITERATIONS.
+    seed : ``int``
+        The random seed used to pick the initial centroids. Default is 0.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        The (clusters, dimensions) matrix of centroids.
+
+    Notes:
+    ------
+    1. The initial centroids are distinct rows sampled from the data.
+    2. A centroid that loses all of its rows is moved to a random row, so no centroid is wasted.
+    3. If there are fewer rows than clusters, the rows are repeated.
+
+    Example:
+    --------
+    >>> centroids = kmeans(np.random.rand(1000, 8).astype(np.float32), 16)
+    >>> print(centroids.shape)
+    ... (16, 8)
+
+    Author: ``@ChinaiArman``
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    if len(data) < clusters:
+        data = np.resize(data, (clusters, data.shape[1]))
+    centroids = data[rng.choice(len(data), clusters, replace=False)].copy()
+    squared_norms = (data ** 2).sum(axis=1)
+    for _ in range(iterations):
+        distances = squared_norms[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(axis=1)
+        assignments = distances.argmin(axis=1)
+        counts = np.bincount(assignments, minlength=clusters)
+        sums = np.stack([
+            np.bincount(assignments, weights=data[:, dimension], minlength=clusters)
+            for dimension in range(data.shape[1])
+        ], axis=1)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        centroids[empty] = data[rng.choice(len(data), empty.sum())]
+    return centroids
+
+
+def score_codes(
+    codes: np.ndarray,
+    table: np.ndarray
+) -> np.ndarray:
+    """
+    Scores product quantization codes with a query lookup table.
+
+    Args:
+    -----
+    codes : ``np.ndarray``
+        The uint8 codes of shape (rows, subspaces).
+    table : ``np.ndarray``
+        The (subspaces, centroids) lookup table of the query.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        The approximate dot product of the query with each encoded vector.
+
+    Notes:
+    ------
+    1. The table is flattened so each code becomes a single offset into it, and rows are scored in bounded chunks.
+
+    Example:
+    --------
+    >>> scores = score_codes(quantizer.codes, quantizer.lookup_table(query))
+
+    Author: ``@ChinaiArman``
+    """
+    flat_table = table.ravel()
+    offsets = np.arange(table.shape[0], dtype=np.intp) * table.shape[1]
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), SCORING_CHUNK_ROWS):
+        chunk = codes[start:start + SCORING_CHUNK_ROWS]
+        scores[start:start + SCORING_CHUNK_ROWS] = flat_table[chunk + offsets].sum(axis=1)
+    return scores
+
+
+class ProductQuantizer:
+    """
+    Class to encode embeddings into product quantization codes and score them against a query.
+
+    Args:
+    -----
+    codebooks : ``np.ndarray``
+        The (subspaces, centroids, subspace_dimensions) centroids of each subspace.
+
+    Keyword Args:
+    -------------
+    codes : ``np.ndarray``
+        The uint8 codes of the encoded vectors. Default is None.
+
+    Attributes:
+    -----------
+    codebooks : ``np.ndarray``
+        The centroids of each subspace.
+    codes : ``np.ndarray``
+        The uint8 codes of the encoded vectors, memory-mapped when the quantizer is loaded from disk.
+
+    Methods:
+    --------
+    >>> train(vectors, subspaces)
+    ... # Trains the codebooks on a sample of the vectors.
+    >>> encode(vectors)
+    ... # Returns the uint8 codes of the vectors.
+    >>> lookup_table(query)
+    ... # Returns the dot product of each query subvector with each centroid.
+    >>> save(path)
+    ... # Writes the codebooks and codes to the versioned binary format.
+    >>> append(path, codes)
+    ... # Appends codes to an existing file.
+    >>> load(path)
+    ... # Loads a quantizer, memory-mapping the codes.
+
+    Notes:
+    ------
+    1. The binary format starts with a 64 byte header: the magic bytes "GRPQ", the format version and the dimensions, subspaces and centroids as little-endian uint32.
+    2. The header is followed by the float32 codebooks and then by the uint8 codes, one row of `subspaces` bytes per vector.
+    3. The number of codes is derived from the file size, so new codes can be appended without rewriting the file.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        codebooks: np.ndarray,
+        codes: np.ndarray = None
+    ) -> None:
+        """
+        Initializes the ProductQuantizer class.
+        """
+        self.codebooks = codebooks
+        self.subspaces, self.centroids, self.subspace_dimensions = codebooks.shape
+        self.dimensions = self.subspaces * self.subspace_dimensions
+        self.codes = codes if codes is not None else np.empty((0, self.subspaces), dtype=np.uint8)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        subspaces: int,
+        centroids: int = 256,
+        sample_rows: int = PQ_TRAINING_ROWS,
+        seed: int = 0
+    ) -> "ProductQuantizer":
+        """
+        Trains the codebooks on a sample of the vectors.
+
+        Args:
+        -----
+        vectors : ``np.ndarray``
+            A float32 matrix (or memory map) of shape (rows, dimensions).
+        subspaces : ``int``
+            The number of subspaces, which must divide the dimensions.
+
+        Keyword Args:
+        -------------
+        centroids : ``int``
+            The number of centroids per subspace, at most 256 so each code fits in a byte. Default is 256.
+        sample_rows : ``int``
+            The maximum number of rows used for training. Default is PQ_TRAINING_ROWS.
+        seed : ``int``
+            The random seed. Default is 0.
+
+        Returns:
+        --------
+        ``ProductQuantizer``
+            The trained quantizer, with no codes.
+
+        Raises:
+        -------
+        ``ValueError``
+            If the subspaces do not divide the dimensions or there are more than 256 centroids.
+
+        Example:
+        --------
+        >>> quantizer = ProductQuantizer.train(vectors, 96)
+
+        Author: ``@ChinaiArman``
+        """
+        dimensions = vectors.shape[1]
+        if dimensions % subspaces != 0:
+            raise ValueError(f"The number of subspaces ({subspaces}) must divide the dimensions ({dimensions}).")
+        if centroids > 256:
+            raise ValueError("Product quantization codes are stored in a byte, so there can be at most 256 centroids.")
+        rng = np.random.default_rng(seed)
+        rows = np.arange(len(vectors))
+        if len(vectors) > sample_rows:
+            rows = np.sort(rng.choice(len(vectors), sample_rows, replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32).reshape(len(rows), subspaces, -1)
+        codebooks = np.stack([
+            kmeans(sample[:, subspace], centroids, seed=seed + subspace)
+            for subspace in range(subspaces)
+        ])
+        return cls(codebooks)
+
+    def encode(
+        self,
+        vectors: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the uint8 codes of the vectors.
+
+        Args:
+        -----
+        vectors : ``np.ndarray``
+            A float32 matrix (or memory map) of shape (rows, dimensions).
+
+        Returns:
+        --------
+        ``np.ndarray``
+            The (rows, subspaces) uint8 codes, the nearest centroid of each subvector.
+
+        Example:
+        --------
+        >>> codes = quantizer.encode(vectors)
+
+        Author: ``@ChinaiArman``
+        """
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        centroid_norms = (self.codebooks ** 2).sum(axis=2)
+        for start in range(0, len(vectors), ENCODING_CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + ENCODING_CHUNK_ROWS], dtype=np.float32)
+            chunk = chunk.reshape(len(chunk), self.subspaces, self.subspace_dimensions)
+            for subspace in range(self.subspaces):
+                distances = centroid_norms[subspace] - 2 * chunk[:, subspace] @ self.codebooks[subspace].T
+                codes[start:start + len(chunk), subspace] = distances.argmin(axis=1)
+        return codes
+
+    def lookup_table(
+        self,
+        query: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the dot product of each query subvector with each centroid.
+
+        Args:
+        -----
+        query : ``np.ndarray``
+            The normalized embedding of the query.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            The (subspaces, centroids) lookup table.
+
+        Example:
+        --------
+        >>> table = quantizer.lookup_table(query)
+
+        Author: ``@ChinaiArman``
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.subspaces, 1, self.subspace_dimensions)
+        return (self.codebooks * query).sum(axis=2)
+
+    def save(
+        self,
+        path: str
+    ) -> None:
+        """
+        Writes the codebooks and codes to the versioned binary format.
+
+        Args:
+        -----
+        path : ``str``
+            The path of the file to write.
+
+        Returns:
+        --------
+        None.
+
+        Example:
+        --------
+        >>> quantizer.codes = quantizer.encode(vectors)
+        >>> quantizer.save("data_index/pq.bin")
+
+        Author: ``@ChinaiArman``
+        """
+        header = PQ_MAGIC + np.array(
+            [PQ_VERSION, self.dimensions, self.subspaces, self.centroids], dtype="<u4"
+        ).tobytes()
+        with open(path, "wb") as f:
+            f.write(header.ljust(PQ_HEADER_BYTES, b"\0"))
+            f.write(np.ascontiguousarray(self.codebooks, dtype="<f4").tobytes())
+            f.write(np.ascontiguousarray(self.codes, dtype=np.uint8).tobytes())
+
+    @staticmethod
+    def append(
+        path: str,
+        codes: np.ndarray
+    ) -> None:
+        """
+        Appends codes to an existing file.
+
+        Args:
+        -----
+        path : ``str``
+            The path of the file.
+        codes : ``np.ndarray``
+            The uint8 codes to append.
+
+        Returns:
+        --------
+        None.
+
+        Example:
+        --------
+        >>> ProductQuantizer.append("data_index/pq.bin", quantizer.encode(vector))
+
+        Author: ``@ChinaiArman``
+        """
+        with open(path, "ab") as f:
+            f.write(np.ascontiguousarray(codes, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(
+        cls,
+        path: str
+    ) -> "ProductQuantizer":
+        """
+        Loads a quantizer, memory-mapping the codes.
+
+        Args:
+        -----
+        path : ``str``
+            The path of the file to load.
+
+        Returns:
+        --------
+        ``ProductQuantizer``
+            The quantizer stored in the file.
+
+        Raises:
+        -------
+        ``ValueError``
+            If the file is not a product quantization index or was written by an unsupported version.
+
+        Example:
+        --------
+        >>> quantizer = ProductQuantizer.load("data_index/pq.bin")
+
+        Author: ``@ChinaiArman``
+        """
+        with open(path, "rb") as f:
+            header = f.read(PQ_HEADER_BYTES)
+        if header[:4] != PQ_MAGIC:
+            raise ValueError(f"{path} is not a product quantization index.")
+        version, dimensions, subspaces, centroids = np.frombuffer(header, dtype="<u4", count=4, offset=4)
+        if version != PQ_VERSION:
+            raise ValueError(f"Unsupported product quantization index version {version}.")
+        codebook_shape = (int(subspaces), int(centroids), int(dimensions // subspaces))
+        codebooks = np.fromfile(path, dtype="<f4", count=int(np.prod(codebook_shape)), offset=PQ_HEADER_BYTES)
+        offset = PQ_HEADER_BYTES + codebooks.nbytes
+        count = (os.path.getsize(path) - offset) // int(subspaces)
+        codes = None
+        if count > 0:
+            codes = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(count, int(subspaces)))
+        return cls(codebooks.reshape(codebook_shape).astype(np.float32), codes)
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the ProductQuantizer class with random vectors.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function trains a quantizer on random vectors, saves and reloads it, and compares the approximate and exact scores.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the approximate and exact scores of the first 5 vectors.
+
+    Author: ``@ChinaiArman``
+    """
+    import tempfile
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((5000, 768)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    quantizer = ProductQuantizer.train(vectors, 96)
+    quantizer.codes = quantizer.encode(vectors)
+    with tempfile.TemporaryDirectory() as directory:
+        quantizer.save(os.path.join(directory, PQ_FILE))
+        loaded = ProductQuantizer.load(os.path.join(directory, PQ_FILE))
+        approximate = score_codes(loaded.codes[:5], loaded.lookup_table(vectors[0]))
+        del loaded
+    print(f"Approximate: {approximate.round(3).tolist()}")
+    print(f"Exact:       {(vectors[:5] @ vectors[0]).round(3).tolist()}")
+    print(f"Code size:   {quantizer.codes.shape[1]} bytes per vector")
+
+
+if __name__ == "__main__":
+    main()
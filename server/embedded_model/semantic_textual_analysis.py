@@ -18,6 +18,9 @@ import torch.nn.functional as F
 from torch import Tensor, cuda, no_grad
 from transformers import AutoTokenizer, AutoModel
 import pandas as pd
+import numpy as np
+import hashlib
+import time
 
 pd.options.mode.copy_on_write = True
 
@@ -29,7 +32,18 @@ load_dotenv()
 sys.path.insert(0, os.getenv("PYTHONPATH"))
 
 from dense_captioning_model import dense_captioning as dc
+from dense_captioning_model.caption_compaction import compact, compact_captions, get_compaction_settings
+from data_source.keyword_store import KeywordStore, SEPARATOR
 from data_source import data_access as da
+from embedded_model.vector_store import VectorStore
+from embedded_model.phrase_embeddings import PhraseEmbeddings, EMBEDDING_MODES
+from data_source.lexical_index import LexicalIndex
+from instrumentation import span
+from metrics import EMBEDDING_BATCH_SIZE
+
+
+SEARCH_MODES = ("semantic", "lexical", "hybrid")
+phrase_embeddings = None
 
 
 def load_embedded_model(
@@ -154,11 +168,361 @@ def normalize_embeddings(
     return scores[0].tolist()
 
 
+def embed_texts(
+    texts: list,
+    model: AutoModel,
+    tokenizer: AutoTokenizer,
+    batch_size: int = None
+) -> np.ndarray:
+    """
+    Generates normalized embeddings for a list of texts, processing them in batches.
+
+    Args:
+    -----
+    texts : ``list``
+        A list of strings to embed.
+    model : ``AutoModel``
+        The model used to generate the embeddings.
+    tokenizer : ``AutoTokenizer``
+        The tokenizer used to tokenize the texts.
+
+    Keyword Args:
+    -------------
+    batch_size : ``int``
+        The number of texts passed to the model at once. Default is the "EMBEDDING_BATCH_SIZE" environment variable, or 64.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        A float32 matrix of shape (len(texts), hidden_size) where each row has a unit L2 norm.
+
+    Notes:
+    ------
+    1. Batching keeps the padded token matrix small, so the whole catalog can be embedded without running out of memory.
+    2. The embeddings are average-pooled and normalized, so the dot product of two rows is their cosine similarity.
+
+    Example:
+    --------
+    >>> vectors = embed_texts(["a black shirt", "a pair of jeans"], model, tokenizer)
+    >>> print(vectors.shape)
+    ... (2, 768)
+
+    Author: ``@ChinaiArman``
+    """
+    batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+    cuda.empty_cache()
+    device = "cuda:0" if cuda.is_available() else "cpu"
+    model.to(device)
+    vectors = []
+    with span("embed"):
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            EMBEDDING_BATCH_SIZE.observe(len(batch))
+            with span("tokenize"):
+                batch_dict = tokenizer(
+                    batch,
+                    max_length=512,
+                    padding=True,
+                    truncation=True,
+                    return_tensors="pt",
+                ).to(device)
+            with span("forward"), no_grad():
+                outputs = model(**batch_dict)
+                embeddings = average_pool(outputs.last_hidden_state, batch_dict["attention_mask"])
+                vectors.append(F.normalize(embeddings, p=2, dim=1).cpu().numpy())
+    if not vectors:
+        return np.empty((0, model.config.hidden_size), dtype=np.float32)
+    return np.concatenate(vectors).astype(np.float32)
+
+
+def get_index_directory(
+    file_path: str = None
+) -> str:
+    """
+    Returns the directory the vector index of a data source is stored in.
+
+    Args:
+    -----
+    None.
+
+    Keyword Args:
+    -------------
+    file_path : ``str``
+        The path to the data source file. Default is None, which uses the data source of the "DATA_SOURCE_FILE" environment variable.
+
+    Returns:
+    --------
+    ``str``
+        The data source file path with an "_index" suffix.
+        For the default data source, the value of the "VECTOR_INDEX_DIR" environment variable if it is set.
+
+    Example:
+    --------
+    >>> print(get_index_directory())
+    ... server/data_source/data_index
+
+    Author: ``@ChinaiArman``
+    """
+    if file_path is not None:
+        return os.path.splitext(file_path)[0] + "_index"
+    return os.getenv("VECTOR_INDEX_DIR") or os.path.splitext(os.getenv("DATA_SOURCE_FILE"))[0] + "_index"
+
+
+def get_embedding_mode(
+) -> str:
+    """
+    Returns the embedding mode read from the "EMBEDDING_MODE" environment variable, "sentence" (default) or "phrase".
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``str``
+        The embedding mode.
+
+    Raises:
+    -------
+    ``ValueError``
+        If the embedding mode is not supported.
+
+    Notes:
+    ------
+    1. In "sentence" mode, the keyword descriptions of a row (or the keywords of a query) are joined and embedded as one text.
+    2. In "phrase" mode, each distinct phrase is embedded once and cached, and the row embedding is the mean of its phrase embeddings.
+
+    Example:
+    --------
+    >>> print(get_embedding_mode())
+    ... sentence
+
+    Author: ``@ChinaiArman``
+    """
+    mode = os.getenv("EMBEDDING_MODE", "sentence")
+    if mode not in EMBEDDING_MODES:
+        raise ValueError(f"Unsupported embedding mode '{mode}'. Expected one of {EMBEDDING_MODES}.")
+    return mode
+
+
+def get_phrase_embeddings(
+) -> PhraseEmbeddings:
+    """
+    Returns the phrase embedding cache of the process, loading it on first use.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``PhraseEmbeddings``
+        The cache, stored in the "PHRASE_EMBEDDINGS_DIR" environment variable, or in the "phrases" folder of the vector index.
+
+    Notes:
+    ------
+    1. The cache only depends on the embedded model, so it can be shared by several data sources through "PHRASE_EMBEDDINGS_DIR".
+
+    Example:
+    --------
+    >>> print(len(get_phrase_embeddings()))
+    ... 2866
+
+    Author: ``@ChinaiArman``
+    """
+    global phrase_embeddings
+    if phrase_embeddings is None:
+        directory = os.getenv("PHRASE_EMBEDDINGS_DIR") or os.path.join(get_index_directory(), "phrases")
+        phrase_embeddings = PhraseEmbeddings(directory, os.getenv("EMBEDDED_MODEL"))
+    return phrase_embeddings
+
+
+def embed_keywords(
+    keyword_lists: list,
+    model: AutoModel,
+    tokenizer: AutoTokenizer,
+    add: bool = False
+) -> np.ndarray:
+    """
+    Generates the normalized embedding of each list of keywords, in the embedding mode of the process.
+
+    Args:
+    -----
+    keyword_lists : ``list``
+        A list of lists of keywords, e.g. the keyword descriptions of new rows or the keywords of a query.
+    model : ``AutoModel``
+        The model used to generate the embeddings.
+    tokenizer : ``AutoTokenizer``
+        The tokenizer used to tokenize the keywords.
+
+    Keyword Args:
+    -------------
+    add : ``bool``
+        Whether the new phrases are added to the phrase embedding cache in "phrase" mode. Default is False.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        A float32 matrix of shape (len(keyword_lists), hidden_size) where each row has a unit L2 norm.
+
+    Notes:
+    ------
+    1. In "phrase" mode, only the phrases missing from the cache are passed through the model.
+    2. Rows added to the catalog cache their phrases, queries do not, so arbitrary query text does not grow the cache.
+    3. If "CAPTION_COMPACTION" is enabled, the keywords are compacted first, as the rows of the vector index are.
+
+    Example:
+    --------
+    >>> vector = embed_keywords([["a black shirt", "a close-up of a zipper"]], model, tokenizer)[0]
+
+    Author: ``@ChinaiArman``
+    """
+    keyword_lists = [compact(keywords) for keywords in keyword_lists]
+    if get_embedding_mode() == "sentence":
+        return embed_texts([", ".join(keywords) for keywords in keyword_lists], model, tokenizer)
+    return get_phrase_embeddings().embed_rows(keyword_lists, lambda texts: embed_texts(texts, model, tokenizer), add)
+
+
+def keyword_hash(
+    keywords: list
+) -> str:
+    """
+    Returns a short hash of the keyword descriptions of a row, stored in the vector index metadata to find the rows whose captions changed.
+    """
+    return hashlib.blake2b(SEPARATOR.join(keywords).encode(), digest_size=8).hexdigest()
+
+
+def update_keyword_hashes(
+    meta: dict,
+    id: str,
+    keywords: list = None
+) -> dict:
+    """
+    Returns a copy of the metadata of a vector index with the keyword hash of a row replaced, or removed if `keywords` is None.
+    """
+    hashes = dict(meta.get("keyword_hashes", {}))
+    if keywords is None:
+        hashes.pop(id, None)
+    else:
+        hashes[id] = keyword_hash(keywords)
+    return {**meta, "keyword_hashes": hashes}
+
+
+def load_vector_store(
+    database: da.Database,
+    model: AutoModel,
+    tokenizer: AutoTokenizer,
+    build_directory: str = None,
+    directory: str = None,
+    encoding: str = None
+) -> VectorStore:
+    """
+    Loads the vector index of the data source, building it first if it is missing or out of date.
+
+    Args:
+    -----
+    database : ``Database``
+        The data source to index.
+    model : ``AutoModel``
+        The model used to generate the embeddings.
+    tokenizer : ``AutoTokenizer``
+        The tokenizer used to tokenize the keyword descriptions.
+
+    Keyword Args:
+    -------------
+    build_directory : ``str``
+        The directory a rebuilt index is written to. Default is None, which writes it to the index directory.
+    directory : ``str``
+        The index directory. Default is None, which uses get_index_directory().
+    encoding : ``str``
+        The in-memory encoding of the vectors. Default is None, which reads the "VECTOR_ENCODING" environment variable.
+
+    Returns:
+    --------
+    ``VectorStore``
+        The vector index of the data source.
+
+    Notes:
+    ------
+    1. The in-memory encoding is read from the "VECTOR_ENCODING" environment variable (float32, float16, int8, pq or mapped) unless `encoding` is given.
+    2. The number of candidates rescored in full precision is read from the "VECTOR_RESCORE_CANDIDATES" environment variable.
+    3. The dimensions and candidate count of the coarse PCA stage are read from the "COARSE_DIMENSIONS" and "COARSE_CANDIDATES" environment variables.
+    4. The number of bytes per vector of the "pq" encoding is read from the "PQ_SUBSPACES" environment variable.
+    5. The length of the precomputed "more like this" neighbour lists is read from the "SIMILAR_NEIGHBOURS" environment variable.
+    6. The index is rebuilt if it was created with a different model, embedding mode or caption compaction, has no keyword hashes,
+       or does not contain the same ids as the data source. Otherwise, the rows whose keyword descriptions changed (see keyword_hash) are embedded again and moved to the end of the index.
+    7. In "phrase" mode (see get_embedding_mode), the index is built from the phrase embedding cache, so only the new phrases are embedded.
+    8. If "CAPTION_COMPACTION" is enabled, the keyword descriptions are compacted before they are embedded, without changing the data source.
+    9. A `build_directory` lets an index be rebuilt while another VectorStore is still reading the files of the index directory,
+       it is moved there with VectorStore.move once that one is no longer used.
+
+    Example:
+    --------
+    >>> store = load_vector_store(Database(), model, tokenizer)
+
+    Author: ``@ChinaiArman``
+    """
+    directory = directory or get_index_directory()
+    encoding = encoding or os.getenv("VECTOR_ENCODING", "float32")
+    rescore_candidates = int(os.getenv("VECTOR_RESCORE_CANDIDATES", 0))
+    coarse_dimensions = int(os.getenv("COARSE_DIMENSIONS", 0))
+    coarse_candidates = int(os.getenv("COARSE_CANDIDATES", 300))
+    pq_subspaces = int(os.getenv("PQ_SUBSPACES", 96))
+    neighbour_count = int(os.getenv("SIMILAR_NEIGHBOURS", 0))
+    mode = get_embedding_mode()
+    compaction = get_compaction_settings()
+    compaction = {"stop_phrases": list(compaction["stop_phrases"]), "max_phrases": compaction["max_phrases"]} if compaction else None
+    ids = database.df["id"].tolist()
+    hashes = [keyword_hash(keywords) for keywords in database.keywords.lists()]
+    try:
+        store = VectorStore(directory, encoding, rescore_candidates, coarse_dimensions, coarse_candidates, pq_subspaces, neighbour_count)
+        if store.meta.get("model") == os.getenv("EMBEDDED_MODEL") and store.meta.get("embedding_mode", "sentence") == mode \
+                and store.meta.get("caption_compaction") == compaction and "keyword_hashes" in store.meta and sorted(store.ids) == sorted(ids):
+            stored = store.meta["keyword_hashes"]
+            changed = [position for position, (id, hash) in enumerate(zip(ids, hashes)) if stored.get(id) != hash]
+            if changed:
+                print(f"Embedding {len(changed)} changed rows...")
+                vectors = embed_keywords(database.keywords.lists(np.array(changed)), model, tokenizer, add=True)
+                for position, vector in zip(changed, vectors):
+                    store.add(ids[position], vector, save=False)
+                store.meta = {**store.meta, "keyword_hashes": dict(zip(ids, hashes))}
+                store.save()
+            return store
+    except FileNotFoundError:
+        pass
+    print("Building vector index...")
+    keywords = database.keywords
+    if compaction:
+        keywords = KeywordStore.from_lists([compact_captions(row, tuple(compaction["stop_phrases"]), compaction["max_phrases"]) for row in keywords.lists()])
+    if mode == "phrase":
+        vectors = get_phrase_embeddings().pool(keywords, lambda texts: embed_texts(texts, model, tokenizer))
+    else:
+        vectors = embed_texts(
+            keywords.joined(),
+            model,
+            tokenizer
+        )
+    return VectorStore.create(
+        build_directory or directory,
+        ids,
+        vectors,
+        {"model": os.getenv("EMBEDDED_MODEL"), "embedding_mode": mode, "caption_compaction": compaction, "keyword_hashes": dict(zip(ids, hashes))},
+        encoding,
+        rescore_candidates,
+        coarse_dimensions,
+        coarse_candidates,
+        pq_subspaces,
+        neighbour_count
+    )
+
+
 def image_model_wrapper(
     filepath_or_url: str,
     size: int,
     model: AutoModel,
-    tokenizer: AutoTokenizer
+    tokenizer: AutoTokenizer,
+    vector_store: VectorStore = None,
+    positions: np.ndarray = None
 ) -> list:
     """
     Wrapper function to call the dense captioning model and then perform semantic textual analysis.
@@ -170,6 +534,13 @@ def image_model_wrapper(
     size : ``int``
         The number of similar items to return.
 
+    Keyword Args:
+    -------------
+    vector_store : ``VectorStore``
+        The vector index of the data source. Default is None, which loads the index.
+    positions : ``np.ndarray``
+        The vector index positions of the items matching the attribute filters. Default is None (no filter).
+
     Returns:
     --------
     ``list``
@@ -180,7 +551,7 @@ def image_model_wrapper(
     1. The function calls the dense captioning model to generate keywords from the image.
     2. The keywords are then used to perform semantic textual analysis to find similar items in the database.
     3. The function returns the IDs of the top `size` similar items based on the analysis.
-    4. If no keywords are generated from the image, an empty list is returned.
+    4. If no keywords are generated from the image, or no item matches the filters, an empty list is returned.
 
     Example:
     --------
@@ -192,6 +563,8 @@ def image_model_wrapper(
 
     Author: ``@ChinaiArman``
     """
+    if positions is not None and len(positions) == 0:
+        return []
     keywords = dc.normalize_dense_caption_response(
         dc.create_dense_captions(filepath_or_url)
     )
@@ -199,17 +572,24 @@ def image_model_wrapper(
         return []
     df = vector_comparison(
         keywords,
+        size,
         model,
-        tokenizer
+        tokenizer,
+        vector_store,
+        positions
     )
-    return df["id"].tolist()[:size]
+    return df["id"].tolist()
 
 
 def keyword_model_wrapper(
     keywords: list,
     size: int,
     model: AutoModel,
-    tokenizer: AutoTokenizer
+    tokenizer: AutoTokenizer,
+    vector_store: VectorStore = None,
+    lexical_index: LexicalIndex = None,
+    mode: str = "semantic",
+    positions: np.ndarray = None
 ) -> list:
     """
     Wrapper function to call the semantic textual analysis function.
@@ -220,16 +600,36 @@ def keyword_model_wrapper(
         A list of keywords generated from the image.
     size : ``int``
         The number of similar items to return.
+
+    Keyword Args:
+    -------------
+    vector_store : ``VectorStore``
+        The vector index of the data source. Default is None, which loads the index.
+    lexical_index : ``LexicalIndex``
+        The lexical index of the data source. Default is None, which builds the index when it is needed.
+    mode : ``str``
+        The search mode, one of "semantic", "lexical" or "hybrid". Default is "semantic".
+    positions : ``np.ndarray``
+        The vector index positions of the items matching the attribute filters. Default is None (no filter).
     
     Returns:
     --------
     ``list``
         A list of the top `size` similar items based on the analysis.
 
+    Raises:
+    -------
+    ``ValueError``
+        If the search mode is not supported.
+
     Notes:
     ------
     1. The function calls the semantic textual analysis function to find similar items in the database based on the input keywords.
     2. The function returns the IDs of the top `size` similar items based on the analysis.
+    3. The "lexical" mode ranks items with the BM25 index only, without passing the keywords through the model.
+    4. The "hybrid" mode restricts the semantic search to the lexical candidates and fuses both scores.
+    5. With `positions`, only the matching items are scored, so the results are the exact top `size` among them.
+       The lexical index must then be built in the row order of the vector index.
 
     Example:
     --------
@@ -241,20 +641,107 @@ def keyword_model_wrapper(
 
     Author: ``@ChinaiArman``
     """
-    if not keywords:
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported search mode '{mode}'. Expected one of {SEARCH_MODES}.")
+    if not keywords or (positions is not None and len(positions) == 0):
         return []
+    if mode != "semantic" and lexical_index is None:
+        lexical_index = LexicalIndex.from_data_frame(da.Database().get_data_frame())
+    if mode == "lexical":
+        with span("lexical_score"):
+            ids, _ = lexical_index.search(keywords, size, positions)
+        return ids
+    if mode == "hybrid":
+        df = hybrid_comparison(
+            keywords,
+            size,
+            model,
+            tokenizer,
+            vector_store,
+            lexical_index,
+            positions
+        )
+        return df["id"].tolist()
     df = vector_comparison(
         keywords,
+        size,
         model,
-        tokenizer
+        tokenizer,
+        vector_store,
+        positions
     )
-    return df["id"].tolist()[:size]
+    return df["id"].tolist()
+
+
+def hybrid_comparison(
+    keywords: list,
+    size: int,
+    model: AutoModel,
+    tokenizer: AutoTokenizer,
+    vector_store: VectorStore,
+    lexical_index: LexicalIndex,
+    positions: np.ndarray = None
+) -> pd.DataFrame:
+    """
+    Ranks the lexical candidates of the keywords by a fusion of their semantic and BM25 scores.
+
+    Args:
+    -----
+    keywords : ``list``
+        A list of keywords.
+    size : ``int``
+        The number of similar items to return.
+    model : ``AutoModel``
+        The model used to embed the keywords.
+    tokenizer : ``AutoTokenizer``
+        The tokenizer used to tokenize the keywords.
+    vector_store : ``VectorStore``
+        The vector index of the data source.
+    lexical_index : ``LexicalIndex``
+        The lexical index of the data source.
+
+    Keyword Args:
+    -------------
+    positions : ``np.ndarray``
+        The vector index positions of the items matching the attribute filters. Default is None (no filter).
+
+    Returns:
+    --------
+    ``pd.DataFrame``
+        A DataFrame containing the IDs and fused scores of the `size` best items.
+
+    Notes:
+    ------
+    1. Only the best "HYBRID_CANDIDATES" lexical matches (default 1000) are scored against the query embedding.
+    2. The BM25 scores are scaled to 0-100 and weighted by "HYBRID_LEXICAL_WEIGHT" (default 0.3) against the semantic scores.
+    3. If no item matches the keywords lexically, the function falls back to a full semantic search.
+
+    Example:
+    --------
+    >>> hybrid_comparison(["black", "cargo joggers"], 5, model, tokenizer, vector_store, lexical_index)
+    ... # Returns a DataFrame with the IDs and scores of the 5 best items.
+
+    Author: ``@ChinaiArman``
+    """
+    with span("lexical_score"):
+        lexical_ids, lexical_scores = lexical_index.search(keywords, int(os.getenv("HYBRID_CANDIDATES", 1000)), positions)
+    if not lexical_ids:
+        return vector_comparison(keywords, size, model, tokenizer, vector_store, positions)
+    weight = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 0.3))
+    positions = vector_store.positions_of(lexical_ids)
+    df = vector_comparison(keywords, len(positions), model, tokenizer, vector_store, positions)
+    lexical = pd.Series(lexical_scores / lexical_scores.max() * 100, index=lexical_ids)
+    df["vector"] = (1 - weight) * df["vector"] + weight * lexical.reindex(df["id"]).to_numpy()
+    return df.sort_values(by="vector", ascending=False).head(size)
 
 
 def vector_comparison(
     keywords: list,
+    size: int,
     model: AutoModel,
-    tokenizer: AutoTokenizer
+    tokenizer: AutoTokenizer,
+    vector_store: VectorStore = None,
+    positions: np.ndarray = None
 ) -> pd.DataFrame:
     """
     Performs semantic textual analysis to compare the input keywords with the database keywords.
@@ -263,36 +750,39 @@ def vector_comparison(
     -----
     keywords : ``list``
         A list of keywords generated from the image.
+    size : ``int``
+        The number of similar items to return.
+
+    Keyword Args:
+    -------------
+    vector_store : ``VectorStore``
+        The vector index of the data source. Default is None, which loads the index.
+    positions : ``np.ndarray``
+        The vector index positions to restrict the comparison to. Default is None, which compares every item.
 
     Returns:
     --------
     ``pd.DataFrame``
-        A DataFrame containing the IDs and similarity scores of the database items.
+        A DataFrame containing the IDs and similarity scores of the `size` most similar database items.
 
     Example:
     --------
-    >>> vector_comparison(keywords)
-    ... # Returns a DataFrame with the IDs and similarity scores of the database items.
+    >>> vector_comparison(keywords, 5, model, tokenizer)
+    ... # Returns a DataFrame with the IDs and similarity scores of the 5 most similar database items.
 
     Notes:
     ------
-    1. This function retrieves the database keywords and their descriptions.
-    2. It calculates the similarity scores between the input keywords and the database keywords.
-    3. The function returns a DataFrame with the IDs and similarity scores of the database items.
+    1. Only the input keywords are passed through the model, the database embeddings are read from the vector index.
+    2. The function returns a DataFrame with the IDs and similarity scores sorted from most to least similar.
 
     Author: ``@nataliecly``
     """
-    db = da.Database()
-    database_keywords = db.get_id_keyword_description()
-    embeddings = semantic_textual_analysis(
-        keywords,
-        database_keywords["keywordDescriptions"].tolist(),
-        model,
-        tokenizer
-    )
-    database_keywords.loc[:, "vector"] = embeddings
-    database_keywords = database_keywords.sort_values(by="vector", ascending=False)
-    return database_keywords
+    if vector_store is None:
+        vector_store = load_vector_store(da.Database(), model, tokenizer)
+    query = embed_keywords([keywords], model, tokenizer)[0]
+    with span("score"):
+        ids, scores = vector_store.search(query, size, positions)
+    return pd.DataFrame({"id": ids, "vector": scores})
 
 
 def semantic_textual_analysis(
@@ -350,12 +840,11 @@ def semantic_textual_analysis(
 
     # Pass input to model to get text embeddings
     print("Begin embedded model processing...")
-    start_time = pd.Timestamp.now()
-    with no_grad():
+    start_time = time.perf_counter_ns()
+    with span("forward"), no_grad():
         outputs = model(**batch_dict)
-    embeddings = average_pool(outputs.last_hidden_state, batch_dict["attention_mask"])
-    end_time = pd.Timestamp.now()
-    print(f"Time taken for processing in seconds: {(end_time - start_time).seconds}")
+        embeddings = average_pool(outputs.last_hidden_state, batch_dict["attention_mask"])
+    print(f"Time taken for processing in milliseconds: {(time.perf_counter_ns() - start_time) / 1e6:.1f}")
 
     # Normalize the embeddings
     normalized_embeddings = normalize_embeddings(embeddings)
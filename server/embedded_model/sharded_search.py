@@ -0,0 +1,933 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+Searches the vector index across several shard processes and merges their results.
+The rows of the vector index are partitioned in contiguous ranges across N shards, local worker processes started by the server
+or shard nodes reached over a socket. The query is embedded once by the server and sent to every shard, each shard scores its rows
+and returns its local top-k, and the local results are merged with a heap.
+Shards that fail or do not answer in time are left out of the result, and the in-process index answers if no shard does.
+
+Requirements:
+This module requires the installation of the numpy library.
+"SEARCH_SHARDS" local shard processes are started if the environment variable is set (default "0", not sharded).
+The shard nodes of the "SHARD_ADDRESSES" environment variable ("host:port" comma separated list) are used instead if it is set,
+authenticated with the "SHARD_AUTHKEY" environment variable. The shards answer within "SHARD_TIMEOUT_SECONDS" seconds (default 1).
+
+Usage:
+To use this class, create a ShardedSearch with the local or connect method, load a vector index with refresh and search it through view.
+To serve a shard node, run the following command from the root directory:
+    ``SHARD_AUTHKEY=secret python server/embedded_model/sharded_search.py --serve 0.0.0.0:7001``
+To execute this module from the root directory, run the following command:
+    ``python server/embedded_model/sharded_search.py``
+"""
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import argparse
+import atexit
+import heapq
+import itertools
+import secrets
+import subprocess
+import threading
+import time
+import numpy as np
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from embedded_model.vector_store import top_k, SCORE_SCALE, VECTORS_FILE
+from instrumentation import span
+import metrics
+
+
+SERVER_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TIMEOUT_SECONDS = 1.0
+LOAD_TIMEOUT_SECONDS = 300.0
+RETRY_SECONDS = 10.0
+REBALANCE_RATIO = 1.5
+SPARE_ROWS_FRACTION = 0.125
+CONNECTION_ERRORS = (OSError, EOFError, AuthenticationError)
+
+
+class Shard:
+    """
+    Class holding the vectors of one shard and answering the messages of the coordinator.
+
+    Attributes:
+    -----------
+    versions : ``dict``
+        The ids, vectors and live rows of the shard, by version of the partition, for the two latest versions.
+        The vectors are a prefix of `buffer`, and the live rows the row of `vectors` of each shard position, None if they are all live in order.
+    buffer : ``np.ndarray``
+        The full precision vectors of the rows of the latest version, with spare rows for the rows added by the next updates.
+
+    Methods:
+    --------
+    >>> handle(message)
+    ... # Loads or updates the rows of the shard or searches them, and returns the result.
+
+    Notes:
+    ------
+    1. A ("load", version, directory, dimensions, rows, ids) message reads the given rows of the vector file of an index directory into memory.
+    2. An ("update", version, base, directory, dimensions, removed, rows, ids) message builds a version from the rows of the `base` version,
+       without the `removed` shard positions and followed by the given rows of the vector file.
+    3. A ("search", version, query, size, positions) message returns the ids and unscaled scores of the `size` rows of a version most similar
+       to the query, among the given shard positions or every row if `positions` is None.
+    4. The previous version is kept while the next one is loaded, so the searches of the coordinator are answered during a refresh.
+    5. An update does not copy the vectors: the removed rows are only left out of the live rows, and the added rows are written to the spare rows
+       of the buffer, past the rows the previous version reads. The buffer is compacted once a quarter of its rows are removed, and grown by SPARE_ROWS_FRACTION once it is full.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self
+    ) -> None:
+        """
+        Initializes the Shard class.
+        """
+        self.versions = {}
+        self.buffer = np.empty((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def _read(
+        directory: str,
+        dimensions: int,
+        rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Reads the given rows of the vector file of an index directory into memory.
+        """
+        if not len(rows):
+            return np.empty((0, dimensions), dtype=np.float32)
+        path = os.path.join(directory, VECTORS_FILE)
+        full = np.memmap(path, dtype=np.float32, mode="r", shape=(os.path.getsize(path) // (4 * dimensions), dimensions))
+        return np.ascontiguousarray(full[rows])
+
+    def _store(
+        self,
+        version: int,
+        data: tuple
+    ) -> int:
+        """
+        Stores the ids, vectors and live rows of a version, dropping the versions before the previous one, and returns the number of rows.
+        """
+        previous = max((number for number in self.versions if number < version), default=None)
+        versions = {} if previous is None else {previous: self.versions[previous]}
+        versions[version] = data
+        self.versions = versions
+        return len(data[0])
+
+    def _update(
+        self,
+        base: tuple,
+        removed: np.ndarray,
+        vectors: np.ndarray,
+        ids: list
+    ) -> tuple:
+        """
+        Returns the ids, vectors and live rows of a version without the removed shard positions of `base` and followed by the added vectors.
+        """
+        base_ids, base_vectors, live = base
+        if len(removed):
+            kept = np.ones(len(base_ids), dtype=bool)
+            kept[removed] = False
+            base_ids = [id for id, keep in zip(base_ids, kept) if keep]
+            live = np.flatnonzero(kept) if live is None else live[kept]
+        count = len(base_vectors)
+        in_place = base_vectors.base is self.buffer and count + len(vectors) <= len(self.buffer)
+        if in_place and (live is None or len(live) >= 0.75 * count):
+            self.buffer[count:count + len(vectors)] = vectors
+            if live is not None and len(vectors):
+                live = np.concatenate([live, np.arange(count, count + len(vectors))])
+            return base_ids + list(ids), self.buffer[:count + len(vectors)], live
+        vectors = np.concatenate([base_vectors if live is None else base_vectors[live], vectors])
+        return base_ids + list(ids), self._allocate(vectors), None
+
+    def _allocate(
+        self,
+        vectors: np.ndarray
+    ) -> np.ndarray:
+        """
+        Copies vectors to a new buffer with SPARE_ROWS_FRACTION spare rows, and returns the view of the vectors.
+        """
+        self.buffer = np.empty((len(vectors) + max(int(len(vectors) * SPARE_ROWS_FRACTION), 64), vectors.shape[1]), dtype=np.float32)
+        self.buffer[:len(vectors)] = vectors
+        return self.buffer[:len(vectors)]
+
+    def handle(
+        self,
+        message: tuple
+    ) -> object:
+        """
+        Answers a load, update or search message of the coordinator.
+        """
+        if message[0] == "load":
+            _, version, directory, dimensions, rows, ids = message
+            return self._store(version, (list(ids), self._allocate(self._read(directory, dimensions, rows)), None))
+        if message[0] == "update":
+            _, version, base, directory, dimensions, removed, rows, ids = message
+            return self._store(version, self._update(self.versions[base], removed, self._read(directory, dimensions, rows), ids))
+        if message[0] == "search":
+            _, version, query, size, positions = message
+            ids, vectors, live = self.versions[version]
+            if positions is None:
+                scores = vectors @ query
+                if live is not None:
+                    scores = scores[live]
+            else:
+                scores = vectors[positions if live is None else live[positions]] @ query
+            if len(scores) == 0:
+                return [], scores
+            order = top_k(scores, size)
+            rows = order if positions is None else positions[order]
+            return [ids[row] for row in rows], scores[order]
+        raise ValueError(f"Unknown shard message: {message[0]}")
+
+
+def serve_connection(
+    connection,
+    shard: Shard
+) -> None:
+    """
+    Answers the (request id, message) pairs of a coordinator connection with (request id, success, result) until it is closed.
+    """
+    while True:
+        try:
+            request_id, message = connection.recv()
+        except CONNECTION_ERRORS:
+            connection.close()
+            return
+        try:
+            response = (request_id, True, shard.handle(message))
+        except Exception as e:
+            response = (request_id, False, repr(e))
+        try:
+            connection.send(response)
+        except CONNECTION_ERRORS:
+            connection.close()
+            return
+
+
+def serve(
+    address: tuple,
+    authkey: bytes,
+    exit_with_parent: bool = False
+) -> None:
+    """
+    Serves a shard on a socket address, printing the port it listens on.
+
+    Args:
+    -----
+    address : ``tuple``
+        The host and port to listen on, port 0 for any free port.
+    authkey : ``bytes``
+        The key the coordinators authenticate with.
+
+    Keyword Args:
+    -------------
+    exit_with_parent : ``bool``
+        Whether to exit when the standard input is closed, i.e. when the process that started the shard exits. Default is False.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Every coordinator connection is served by its own thread, the connections share the loaded versions of the rows.
+    2. The messages are pickled, so the authentication key must be kept secret and the port must not be exposed to untrusted networks.
+
+    Example:
+    --------
+    >>> serve(("0.0.0.0", 7001), b"secret")
+    ... # Prints 7001 and serves the shard until the process is stopped.
+
+    Author: ``@ChinaiArman``
+    """
+    listener = Listener(address, authkey=authkey)
+    print(listener.address[1], flush=True)
+    if exit_with_parent:
+        threading.Thread(target=lambda: (sys.stdin.read(), os._exit(0)), daemon=True).start()
+    shard = Shard()
+    while True:
+        try:
+            connection = listener.accept()
+        except CONNECTION_ERRORS:
+            continue
+        threading.Thread(target=serve_connection, args=(connection, shard), daemon=True).start()
+
+
+class ShardClient:
+    """
+    Class holding the connections of the coordinator to one shard and the range of rows it serves.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the shard in the metrics.
+    address : ``tuple``
+        The host and port of the shard.
+    authkey : ``bytes``
+        The key the shard authenticates the coordinator with.
+
+    Keyword Args:
+    -------------
+    process : ``subprocess.Popen``
+        The process of a local shard. Default is None, for a shard node.
+
+    Attributes:
+    -----------
+    connections : ``dict``
+        The "search" connection, and the "load" connection the refreshes use so the searches are not blocked while the shard loads rows.
+    lock : ``threading.Lock``
+        The lock held from sending a search to receiving its response, so the messages of two searches do not interleave.
+    start : ``int``
+        The first vector index position served by the shard.
+    end : ``int``
+        The position after the last one served by the shard.
+    loaded : ``bool``
+        Whether the shard holds the rows of the current vector index of the coordinator.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        name: str,
+        address: tuple,
+        authkey: bytes,
+        process: subprocess.Popen = None
+    ) -> None:
+        """
+        Initializes the ShardClient class.
+        """
+        self.name = name
+        self.address = address
+        self.authkey = authkey
+        self.process = process
+        self.connections = {"search": None, "load": None}
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count()
+        self.start = self.end = 0
+        self.loaded = False
+
+    def send(
+        self,
+        message: tuple,
+        channel: str = "search"
+    ) -> int:
+        """
+        Sends a message to the shard on a connection, connecting first if needed, and returns its request id.
+        """
+        if self.connections[channel] is None:
+            self.connections[channel] = Client(self.address, authkey=self.authkey)
+        request_id = next(self.request_ids)
+        self.connections[channel].send((request_id, message))
+        return request_id
+
+    def receive(
+        self,
+        request_id: int,
+        deadline: float,
+        channel: str = "search"
+    ) -> object:
+        """
+        Returns the result of a request, skipping the late responses of earlier requests.
+        Raises TimeoutError if it does not arrive by the `time.monotonic` deadline and RuntimeError if the shard failed to answer it.
+        """
+        connection = self.connections[channel]
+        if connection is None:
+            raise EOFError(f"Shard {self.name} is disconnected")
+        while True:
+            if not connection.poll(max(deadline - time.monotonic(), 0)):
+                raise TimeoutError(f"Shard {self.name} did not answer in time")
+            response_id, success, result = connection.recv()
+            if response_id != request_id:
+                continue
+            if not success:
+                raise RuntimeError(result)
+            return result
+
+    def disconnect(
+        self,
+        channel: str = None
+    ) -> None:
+        """
+        Closes a connection to the shard, or all of them if `channel` is None. The shard must be loaded again before it is searched.
+        """
+        for name in [channel] if channel else list(self.connections):
+            if self.connections[name] is not None:
+                self.connections[name].close()
+            self.connections[name] = None
+        self.loaded = False
+
+
+class ShardedView:
+    """
+    The vector index of a snapshot, searched through the shards while it is the index loaded by the shards.
+    Every other attribute is read from the vector index itself.
+    """
+    def __init__(
+        self,
+        sharded_search,
+        vector_store
+    ) -> None:
+        """
+        Initializes the ShardedView class.
+        """
+        self.sharded_search = sharded_search
+        self.vector_store = vector_store
+
+    def __getattr__(
+        self,
+        name: str
+    ) -> object:
+        """
+        Returns the attribute of the vector index.
+        """
+        return getattr(self.vector_store, name)
+
+    def search(
+        self,
+        query: np.ndarray,
+        size: int,
+        positions: np.ndarray = None
+    ) -> tuple[
+            list,
+            np.ndarray
+        ]:
+        """
+        Returns the ids and scores of the vectors most similar to the query, as VectorStore.search does.
+        """
+        return self.sharded_search.search(self.vector_store, query, size, positions)
+
+    def similar(
+        self,
+        id: str,
+        size: int
+    ) -> tuple[
+            list,
+            np.ndarray
+        ]:
+        """
+        Returns the ids and scores of the items most similar to a stored item, as VectorStore.similar does, searching the shards
+        unless the precomputed neighbour lists are long enough.
+        """
+        store = self.vector_store
+        if store.neighbours is not None and size <= store.neighbour_count:
+            return store.similar(id, size)
+        ids, scores = self.search(np.asarray(store.full_vectors[store.rows[store.positions[id]]]), size + 1)
+        kept = [index for index, result_id in enumerate(ids) if result_id != id][:max(size, 0)]
+        return [ids[index] for index in kept], scores[kept]
+
+
+class ShardedSearch:
+    """
+    Class to search a vector index partitioned across shard processes and merge their results.
+
+    Args:
+    -----
+    shards : ``list``
+        The ShardClient of each shard.
+
+    Keyword Args:
+    -------------
+    timeout : ``float``
+        The number of seconds a search waits for the shards. Default is DEFAULT_TIMEOUT_SECONDS.
+
+    Attributes:
+    -----------
+    partition : ``tuple``
+        The vector index loaded by the shards (None before the first refresh), the first position of each shard followed by its number of rows,
+        the version of the partition in the shards and the identity of its vector file, replaced together by each refresh.
+    source : ``VectorStore``
+        The vector index loaded by the shards.
+
+    Methods:
+    --------
+    >>> local(count, timeout)
+    ... # Starts local shard processes.
+    >>> connect(addresses, authkey, timeout)
+    ... # Uses running shard nodes.
+    >>> from_env()
+    ... # Creates the shards of the environment variables, or returns None.
+    >>> refresh(vector_store)
+    ... # Partitions a vector index across the shards, or sends them its changes.
+    >>> refresh_later(vector_store)
+    ... # Partitions a vector index across the shards in the background.
+    >>> view(vector_store)
+    ... # Returns the vector index, searched through the shards.
+    >>> search(vector_store, query, size, positions)
+    ... # Searches the shards and merges their results.
+    >>> status()
+    ... # Returns the rows and state of every shard.
+    >>> close()
+    ... # Disconnects from the shards and stops the local ones.
+
+    Notes:
+    ------
+    1. The shards score the full precision vectors of their rows, so the merged result is the exact top-k of the shards that answered,
+       whatever the encoding of the in-process index.
+    2. A shard that fails or times out is left out of the result. If no shard answers, or the vector index searched is not the one loaded
+       by the shards, e.g. a snapshot published since the last refresh, the in-process index answers instead.
+    3. The shards read their rows from the vector file of the index directory, so shard nodes must see it under the same path.
+    4. The shards are refreshed after every write, and at most every RETRY_SECONDS seconds while a shard is not loaded,
+       so a restarted shard node serves again without a write.
+    5. A refresh after a write only sends its changes: the removed rows to the shards holding them, and the added rows to the last shard.
+       The shards are partitioned again once a shard holds more than REBALANCE_RATIO times its share of the rows, or the index was rebuilt.
+    6. The shards keep serving the previous partition while they load the next one, and the searches switch to it at once when it is loaded.
+    7. The shards hold the vectors in memory, so the in-process index searched with them should not: the GarmentRecognizer loads it with the
+       "mapped" encoding, which keeps only the ids and row references and answers the fallback searches from the memory-mapped vector file.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        shards: list,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS
+    ) -> None:
+        """
+        Initializes the ShardedSearch class.
+        """
+        self.shards = shards
+        self.timeout = timeout
+        self.partition = (None, np.zeros(len(shards) + 1, dtype=np.int64), 0, None)
+        self.refresh_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.pending = None
+        self.refresher = None
+        self.refreshed_at = 0.0
+
+    @property
+    def source(
+        self
+    ):
+        """
+        Returns the vector index loaded by the shards, None before the first refresh.
+        """
+        return self.partition[0]
+
+    @staticmethod
+    def _spawn(
+        authkey: bytes
+    ) -> subprocess.Popen:
+        """
+        Starts a local shard process listening on a free port of the loopback interface.
+        """
+        return subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", "127.0.0.1:0", "--exit-with-parent"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            env={**os.environ, "PYTHONPATH": SERVER_DIRECTORY, "SHARD_AUTHKEY": authkey.decode()}
+        )
+
+    @classmethod
+    def local(
+        cls,
+        count: int,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS
+    ):
+        """
+        Starts `count` local shard processes and returns a ShardedSearch over them, stopped when the server exits.
+        """
+        authkey = secrets.token_hex(16).encode()
+        processes = [cls._spawn(authkey) for _ in range(count)]
+        shards = [
+            ShardClient(f"local-{index}", ("127.0.0.1", int(process.stdout.readline())), authkey, process)
+            for index, process in enumerate(processes)
+        ]
+        sharded_search = cls(shards, timeout)
+        atexit.register(sharded_search.close)
+        return sharded_search
+
+    @classmethod
+    def connect(
+        cls,
+        addresses: list,
+        authkey: bytes,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS
+    ):
+        """
+        Returns a ShardedSearch over the shard nodes listening on the given (host, port) addresses.
+        """
+        return cls([ShardClient(f"{host}:{port}", (host, port), authkey) for host, port in addresses], timeout)
+
+    @classmethod
+    def from_env(
+        cls
+    ):
+        """
+        Returns a ShardedSearch over the shards of the environment variables, or None if the search is not sharded.
+        Raises ValueError if "SHARD_ADDRESSES" is set without "SHARD_AUTHKEY".
+        """
+        timeout = float(os.getenv("SHARD_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS))
+        addresses = [address.strip() for address in os.getenv("SHARD_ADDRESSES", "").split(",") if address.strip()]
+        if addresses:
+            if not os.getenv("SHARD_AUTHKEY"):
+                raise ValueError("SHARD_AUTHKEY must be set to use SHARD_ADDRESSES")
+            addresses = [(host, int(port)) for host, port in (address.rsplit(":", 1) for address in addresses)]
+            return cls.connect(addresses, os.getenv("SHARD_AUTHKEY").encode(), timeout)
+        count = int(os.getenv("SEARCH_SHARDS", 0))
+        return cls.local(count, timeout) if count > 0 else None
+
+    def _restart(
+        self,
+        shard: ShardClient
+    ) -> None:
+        """
+        Disconnects from a shard, and starts a new process for a local shard whose process exited.
+        """
+        shard.disconnect()
+        if shard.process is not None and shard.process.poll() is not None:
+            shard.process = self._spawn(shard.authkey)
+            shard.address = ("127.0.0.1", int(shard.process.stdout.readline()))
+
+    @staticmethod
+    def _vector_file(
+        vector_store
+    ) -> tuple:
+        """
+        Returns the directory and inode of the vector file of an index, which only change when the index is rebuilt.
+        """
+        return vector_store.directory, os.stat(os.path.join(vector_store.directory, VECTORS_FILE)).st_ino
+
+    def _changes(
+        self,
+        vector_store
+    ) -> tuple:
+        """
+        Returns the sorted positions of the loaded index that a vector index removed and the number of rows it kept, the others being appended,
+        or None if it is not derived from the loaded index by adds and removes or a shard is not loaded.
+        """
+        source, _, _, vector_file = self.partition
+        if source is None or not all(shard.loaded for shard in self.shards) or self._vector_file(vector_store) != vector_file:
+            return None
+        kept = np.isin(source.rows, vector_store.rows)
+        count = int(kept.sum())
+        if not np.array_equal(source.rows[kept], vector_store.rows[:count]) or np.isin(vector_store.rows[count:], source.rows).any():
+            return None
+        return np.flatnonzero(~kept), count
+
+    def refresh(
+        self,
+        vector_store
+    ) -> int:
+        """
+        Partitions the rows of a vector index across the shards, or sends them its changes, and waits for them to load their rows.
+
+        Args:
+        -----
+        vector_store : ``VectorStore``
+            The vector index to search through the shards.
+
+        Returns:
+        --------
+        ``int``
+            The number of shards that loaded their rows.
+
+        Notes:
+        ------
+        1. The shards are loaded in parallel on their load connections. The searches use the previous partition until the refresh is done.
+        2. If the vector index was derived from the loaded one by adds and removes, each shard only drops its removed rows
+           and the last shard reads the added rows, unless the last shard would then hold too many rows.
+        3. Disconnected shards are connected again and exited local shard processes are restarted.
+        4. A shard that fails to load is left out of the searches until the next refresh, which partitions every row again.
+
+        Example:
+        --------
+        >>> sharded_search = ShardedSearch.local(4)
+        >>> sharded_search.refresh(vector_store)
+        ... 4
+
+        Author: ``@ChinaiArman``
+        """
+        with self.refresh_lock:
+            _, bounds, version, _ = self.partition
+            dimensions, directory = vector_store.meta["dimensions"], vector_store.directory
+            changes = self._changes(vector_store)
+            if changes is not None:
+                removed, count = changes
+                cuts = np.searchsorted(removed, bounds)
+                next_bounds = bounds - cuts
+                next_bounds[-1] = len(vector_store.ids)
+                if np.diff(next_bounds).max() > REBALANCE_RATIO * len(vector_store.ids) / len(self.shards) + 1:
+                    changes = None
+            if changes is None:
+                next_bounds = np.linspace(0, len(vector_store.ids), len(self.shards) + 1).round().astype(np.int64)
+                messages = [
+                    ("load", version + 1, directory, dimensions, vector_store.rows[start:end], vector_store.ids[start:end])
+                    for start, end in zip(next_bounds[:-1], next_bounds[1:])
+                ]
+            else:
+                messages = [
+                    ("update", version + 1, version, directory, dimensions, removed[cuts[index]:cuts[index + 1]] - bounds[index],
+                     vector_store.rows[count:] if index == len(self.shards) - 1 else [], vector_store.ids[count:] if index == len(self.shards) - 1 else [])
+                    for index in range(len(self.shards))
+                ]
+            requests, loaded = [], set()
+            for shard, message in zip(self.shards, messages):
+                if shard.connections["load"] is None:
+                    with shard.lock:
+                        self._restart(shard)
+                try:
+                    requests.append((shard, shard.send(message, "load")))
+                except CONNECTION_ERRORS as e:
+                    print(f"Shard {shard.name} is unavailable: {e}")
+                    shard.disconnect("load")
+            deadline = time.monotonic() + LOAD_TIMEOUT_SECONDS
+            for shard, request_id in requests:
+                try:
+                    shard.receive(request_id, deadline, "load")
+                    loaded.add(shard)
+                except (RuntimeError, TimeoutError, *CONNECTION_ERRORS) as e:
+                    print(f"Shard {shard.name} failed to load: {e}")
+                    shard.disconnect("load")
+            for shard, start, end in zip(self.shards, next_bounds[:-1], next_bounds[1:]):
+                shard.start, shard.end, shard.loaded = int(start), int(end), shard in loaded
+            self.partition = (vector_store, next_bounds, version + 1, self._vector_file(vector_store))
+            self.refreshed_at = time.monotonic()
+            metrics.SHARD_REFRESHES.inc(kind="full" if changes is None else "delta")
+            return len(loaded)
+
+    def _refresh_pending(
+        self
+    ) -> None:
+        """
+        Refreshes the shards with the latest pending vector index until none is left.
+        """
+        while True:
+            with self.pending_lock:
+                vector_store, self.pending = self.pending, None
+                if vector_store is None:
+                    self.refresher = None
+                    return
+            try:
+                self.refresh(vector_store)
+            except Exception as e:
+                print(f"Shard refresh failed: {e}")
+
+    def refresh_later(
+        self,
+        vector_store
+    ) -> None:
+        """
+        Refreshes the shards with a vector index in a background thread, unless they already serve it.
+        The vector indexes published during a refresh are coalesced, only the last one is loaded after it.
+        """
+        with self.pending_lock:
+            if vector_store is self.source and all(shard.loaded for shard in self.shards):
+                return
+            self.pending = vector_store
+            if self.refresher is None:
+                self.refresher = threading.Thread(target=self._refresh_pending, daemon=True)
+                self.refresher.start()
+
+    def view(
+        self,
+        vector_store
+    ) -> ShardedView:
+        """
+        Returns the vector index, with its search method answered by the shards.
+        """
+        return ShardedView(self, vector_store)
+
+    def _record(
+        self,
+        shard: ShardClient,
+        result: str
+    ) -> None:
+        """
+        Counts the result of a shard request, and schedules a refresh if the shard is not loaded.
+        """
+        metrics.SHARD_REQUESTS.inc(shard=shard.name, result=result)
+        if not shard.loaded and self.source is not None and time.monotonic() - self.refreshed_at >= RETRY_SECONDS:
+            self.refresh_later(self.source)
+
+    def search(
+        self,
+        vector_store,
+        query: np.ndarray,
+        size: int,
+        positions: np.ndarray = None
+    ) -> tuple[
+            list,
+            np.ndarray
+        ]:
+        """
+        Sends the query to every shard and merges their local top `size` results.
+
+        Args:
+        -----
+        vector_store : ``VectorStore``
+            The vector index searched, answering the search itself if the shards do not serve it.
+        query : ``np.ndarray``
+            The normalized embedding of the query.
+        size : ``int``
+            The number of results to return.
+
+        Keyword Args:
+        -------------
+        positions : ``np.ndarray``
+            The vector index positions to restrict the search to. Default is None, which searches every row.
+
+        Returns:
+        --------
+        ``tuple``
+            A tuple containing the list of ids and the array of scores, from most to least similar.
+
+        Notes:
+        ------
+        1. The positions are split by shard, and a shard with no position to search is not sent the query.
+        2. The query is sent to every shard before any response is read, so the shards search in parallel, and every response
+           is awaited until the same deadline of `timeout` seconds.
+        3. The local results are already sorted, so they are merged lazily with a heap and only `size` of them are read.
+
+        Example:
+        --------
+        >>> ids, scores = sharded_search.search(vector_store, query, 5)
+
+        Author: ``@ChinaiArman``
+        """
+        source, bounds, version, _ = self.partition
+        if source is not vector_store:
+            metrics.SHARDED_SEARCHES.inc(outcome="fallback")
+            return vector_store.search(query, size, positions)
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if positions is not None:
+            positions = np.sort(positions)
+            cuts = np.searchsorted(positions, bounds)
+        with span("shards"):
+            deadline = time.monotonic() + self.timeout
+            requests, failures = [], 0
+            for index, shard in enumerate(self.shards):
+                shard_positions = None if positions is None else positions[cuts[index]:cuts[index + 1]] - bounds[index]
+                if shard_positions is not None and len(shard_positions) == 0:
+                    continue
+                if not shard.loaded:
+                    failures += 1
+                    self._record(shard, "error")
+                    continue
+                if not shard.lock.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                    failures += 1
+                    self._record(shard, "timeout")
+                    continue
+                try:
+                    requests.append((shard, shard.send(("search", version, query, size, shard_positions))))
+                except CONNECTION_ERRORS:
+                    shard.disconnect()
+                    shard.lock.release()
+                    failures += 1
+                    self._record(shard, "error")
+            results = []
+            for shard, request_id in requests:
+                try:
+                    ids, scores = shard.receive(request_id, deadline)
+                    results.append(zip(ids, scores.tolist()))
+                    result = "ok"
+                except TimeoutError:
+                    result = "timeout"
+                except RuntimeError:
+                    result = "error"
+                except CONNECTION_ERRORS:
+                    shard.disconnect()
+                    result = "error"
+                finally:
+                    shard.lock.release()
+                if result != "ok":
+                    failures += 1
+                self._record(shard, result)
+        if failures and not results:
+            metrics.SHARDED_SEARCHES.inc(outcome="fallback")
+            return vector_store.search(query, size, positions)
+        metrics.SHARDED_SEARCHES.inc(outcome="partial" if failures else "complete")
+        merged = list(itertools.islice(heapq.merge(*results, key=lambda result: -result[1]), size))
+        return [id for id, _ in merged], np.array([score for _, score in merged], dtype=np.float32) * SCORE_SCALE
+
+    def status(
+        self
+    ) -> dict:
+        """
+        Returns the timeout, the number of rows loaded by the shards and the address, rows and state of every shard.
+        """
+        source = self.source
+        return {
+            "timeout_seconds": self.timeout,
+            "rows": None if source is None else len(source.ids),
+            "shards": [
+                {"name": shard.name, "address": f"{shard.address[0]}:{shard.address[1]}", "rows": shard.end - shard.start, "loaded": shard.loaded}
+                for shard in self.shards
+            ],
+        }
+
+    def close(
+        self
+    ) -> None:
+        """
+        Disconnects from the shards and stops the local shard processes.
+        """
+        for shard in self.shards:
+            shard.disconnect()
+            if shard.process is not None:
+                shard.process.terminate()
+                shard.process.wait()
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the ShardedSearch class with local shard processes, or serves a shard node.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. With --serve host:port, the function serves a shard node authenticated with the "SHARD_AUTHKEY" environment variable.
+    2. Otherwise, it partitions a random vector index of 10000 rows across 3 local shards, compares a sharded search
+       with the in-process one, and searches again after stopping one shard.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the results of the in-process, sharded and partial searches.
+
+    Author: ``@ChinaiArman``
+    """
+    parser = argparse.ArgumentParser(description="Serves a search shard, or demonstrates the sharded search.")
+    parser.add_argument("--serve", help="The host:port to serve a shard on.")
+    parser.add_argument("--exit-with-parent", action="store_true", help="Exit when the standard input is closed.")
+    args = parser.parse_args()
+    if args.serve:
+        host, port = args.serve.rsplit(":", 1)
+        serve((host, int(port)), os.getenv("SHARD_AUTHKEY", "").encode(), args.exit_with_parent)
+        return
+
+    import tempfile
+    from embedded_model.vector_store import VectorStore
+    vectors = np.random.default_rng(0).standard_normal((10000, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store = VectorStore.create(tempfile.mkdtemp(prefix="sharded-"), [str(i) for i in range(len(vectors))], vectors, {"model": "random"})
+    sharded_search = ShardedSearch.local(3)
+    print(f"{sharded_search.refresh(store)} shards loaded")
+    view = sharded_search.view(store)
+    print("in-process:", store.search(vectors[42], 5)[0])
+    print("sharded:   ", view.search(vectors[42], 5)[0])
+    sharded_search.shards[0].process.kill()
+    sharded_search.shards[0].process.wait()
+    print("partial:   ", view.search(vectors[42], 5)[0])
+    print(sharded_search.status())
+    sharded_search.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,944 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A class that stores the catalog embeddings and ranks them against a query embedding.
+The in-memory vectors can be kept in full precision (float32) or compressed to float16, per-vector scaled int8 or product quantization (pq) encodings,
+or not kept in memory at all (mapped) and scored from the memory-mapped full precision vectors, e.g. when the searches are served by shards.
+An optional coarse stage scores every row in a reduced PCA space and keeps only the best candidates for the encoded vectors.
+An optional final stage rescores the best candidates against the full precision vectors, which are memory-mapped from disk.
+The store also answers "more like this" queries for stored items, optionally from precomputed neighbour lists.
+
+Requirements:
+This module requires the installation of the numpy library.
+
+Usage:
+To use this class, create a VectorStore from a list of ids and a matrix of normalized embeddings, or load one from disk.
+To execute this module from the root directory, run the following command:
+    ``python server/embedded_model/vector_store.py``
+"""
+
+import numpy as np
+import copy
+import json
+import queue
+
+from dotenv import load_dotenv
+import os
+import sys
+
+load_dotenv()
+sys.path.insert(0, os.getenv("PYTHONPATH", "server"))
+
+from embedded_model.dimensionality_reduction import fit_projection, project, save_projection, load_projection, PROJECTION_FILE
+from embedded_model.product_quantization import ProductQuantizer, score_codes, PQ_FILE
+
+
+ENCODINGS = ("float32", "float16", "int8", "pq", "mapped")
+SCORE_SCALE = 100
+SCORING_CHUNK_BYTES = 2 ** 19
+SCORING_BUFFERS = 8
+NEIGHBOUR_BLOCK_SCORES = 2 ** 24
+IDS_FILE = "ids.npy"
+ROWS_FILE = "rows.npy"
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+INDEX_FILES = (IDS_FILE, ROWS_FILE, VECTORS_FILE, META_FILE, PROJECTION_FILE, PQ_FILE)
+
+
+def encode_vectors(
+    vectors: np.ndarray,
+    encoding: str
+) -> tuple[
+        np.ndarray,
+        np.ndarray
+    ]:
+    """
+    Encodes a matrix of float32 vectors into the compressed in-memory representation.
+
+    Args:
+    -----
+    vectors : ``np.ndarray``
+        A float32 matrix of shape (rows, dimensions).
+    encoding : ``str``
+        The encoding to use, one of "float32", "float16" or "int8".
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the encoded matrix and the per-vector scales (None unless the encoding is "int8").
+
+    Raises:
+    -------
+    ``ValueError``
+        If the encoding is not supported.
+
+    Notes:
+    ------
+    1. The int8 encoding stores each vector as round(v / scale), where scale = max(|v|) / 127 for that vector.
+    2. Scaling per vector keeps the quantization error proportional to each vector's own magnitude.
+    3. The "pq" encoding needs trained codebooks, so it is handled by the VectorStore and not by this function.
+
+    Example:
+    --------
+    >>> codes, scales = encode_vectors(np.array([[0.6, -0.8]], dtype=np.float32), "int8")
+    >>> print(codes, scales)
+    ... [[  95 -127]] [0.0063]
+
+    Author: ``@ChinaiArman``
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if encoding == "float32":
+        return vectors, None
+    if encoding == "float16":
+        return vectors.astype(np.float16), None
+    if encoding == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.empty(0, dtype=np.float32)
+        scales = np.where(scales > 0, scales, 1).astype(np.float32)
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unsupported vector encoding '{encoding}'. Expected one of {ENCODINGS}.")
+
+
+def top_k(
+    scores: np.ndarray,
+    size: int
+) -> np.ndarray:
+    """
+    Returns the positions of the `size` highest scores, ordered from highest to lowest.
+
+    Args:
+    -----
+    scores : ``np.ndarray``
+        A one dimensional array of scores.
+    size : ``int``
+        The number of positions to return.
+
+    Returns:
+    --------
+    ``np.ndarray``
+        The positions of the highest scores in descending score order.
+
+    Notes:
+    ------
+    1. The function uses a partial sort (argpartition) so only the selected positions are fully sorted.
+
+    Example:
+    --------
+    >>> top_k(np.array([0.1, 0.9, 0.5]), 2)
+    ... array([1, 2])
+
+    Author: ``@ChinaiArman``
+    """
+    size = min(size, len(scores))
+    if size <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, size - 1)[:size]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def top_k_rows(
+    scores: np.ndarray,
+    size: int
+) -> tuple[
+        np.ndarray,
+        np.ndarray
+    ]:
+    """
+    Returns the columns and values of the `size` highest scores of each row, ordered from highest to lowest.
+
+    Args:
+    -----
+    scores : ``np.ndarray``
+        A two dimensional array of scores.
+    size : ``int``
+        The number of columns to return per row.
+
+    Returns:
+    --------
+    ``tuple``
+        A tuple containing the (rows, size) arrays of columns and scores, padded with -1 and -inf if a row has fewer columns.
+
+    Example:
+    --------
+    >>> top_k_rows(np.array([[0.1, 0.9, 0.5]]), 2)
+    ... (array([[1, 2]]), array([[0.9, 0.5]]))
+
+    Author: ``@ChinaiArman``
+    """
+    columns = np.full((len(scores), size), -1, dtype=np.int64)
+    values = np.full((len(scores), size), -np.inf, dtype=np.float32)
+    kept = min(size, scores.shape[1])
+    if kept <= 0:
+        return columns, values
+    candidates = np.argpartition(-scores, kept - 1, axis=1)[:, :kept]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    columns[:, :kept] = np.take_along_axis(candidates, order, axis=1)
+    values[:, :kept] = np.take_along_axis(candidate_scores, order, axis=1)
+    columns[np.isneginf(values)] = -1
+    return columns, values
+
+
+class VectorStore:
+    """
+    Class to store the catalog embeddings and perform nearest neighbour searches.
+
+    Args:
+    -----
+    directory : ``str``
+        The directory the index files are stored in.
+    encoding : ``str``
+        The in-memory encoding of the vectors, one of "float32", "float16", "int8", "pq" or "mapped".
+    rescore_candidates : ``int``
+        The number of candidates to rescore against the full precision vectors. 0 disables rescoring.
+    coarse_dimensions : ``int``
+        The number of dimensions of the coarse PCA index. 0 disables the coarse stage.
+    coarse_candidates : ``int``
+        The number of candidates kept by the coarse stage.
+    pq_subspaces : ``int``
+        The number of subspaces (bytes per vector) of the "pq" encoding.
+    neighbour_count : ``int``
+        The length of the precomputed neighbour list of each item. 0 disables the neighbour lists.
+
+    Attributes:
+    -----------
+    ids : ``list``
+        The ids of the stored items, in row order.
+    codes : ``np.ndarray``
+        The encoded vectors kept in memory, None for the "mapped" encoding.
+    scales : ``np.ndarray``
+        The per-vector scales of the int8 encoding, None for other encodings.
+    rows : ``np.ndarray``
+        The row of each stored item in the full precision vector file.
+    meta : ``dict``
+        The metadata of the index (model name, dimensions).
+    projection : ``tuple``
+        The mean and principal components of the coarse index, None if the coarse stage is disabled.
+    coarse : ``np.ndarray``
+        The projected vectors of the coarse index.
+    quantizer : ``ProductQuantizer``
+        The product quantizer of the "pq" encoding, None for other encodings.
+    neighbours : ``np.ndarray``
+        The (rows, neighbour_count) positions of the nearest neighbours of each item, padded with -1.
+    neighbour_scores : ``np.ndarray``
+        The cosine similarity of each precomputed neighbour, padded with -inf.
+    scoring_buffers : ``queue.Queue``
+        The float32 buffers the float16 and int8 codes are decoded into, and the mapped rows are gathered into, at most SCORING_BUFFERS shared by the searches and the copies of the index.
+
+    Raises:
+    -------
+    ``FileNotFoundError``
+        If the index files do not exist.
+
+    Methods:
+    --------
+    >>> create(directory, ids, vectors, meta)
+    ... # Writes a new index to disk and returns the VectorStore.
+    >>> search(query, size)
+    ... # Returns the ids and scores of the stored vectors most similar to the query.
+    >>> add(id, vector)
+    ... # Adds a vector to the index.
+    >>> remove(id)
+    ... # Removes a vector from the index.
+    >>> similar(id, size)
+    ... # Returns the ids and scores of the items most similar to a stored item.
+    >>> copy()
+    ... # Returns a copy of the index that can be modified independently.
+    >>> move(directory)
+    ... # Moves the files of the index to another directory.
+    >>> memory_usage()
+    ... # Returns the number of bytes used by the in-memory vectors.
+
+    Notes:
+    ------
+    1. The full precision vectors are stored in a raw float32 file that is only appended to and is opened memory-mapped.
+    2. Removing an item only drops its row reference, the full precision file is compacted when the index is rebuilt.
+    3. Scores are the cosine similarity of the normalized vectors multiplied by 100.
+    4. The "pq" codes are stored in pq.bin, aligned with the rows of the full precision file, and trained on first use.
+    5. The coarse score of a row is its projected dot product plus its dot product with the PCA mean, which ranks rows like the full dot product up to the discarded components.
+    6. The neighbour lists are exact (full precision), built on load and updated by add and remove, so they always reflect the current catalog.
+    7. The float16 and int8 codes are decoded to float32 in chunks of SCORING_CHUNK_BYTES, which stay in the CPU cache while BLAS scores them.
+       At 50k x 768 the scoring takes about 15 ms in float32, 13 ms in int8 and 93 ms in float16, as numpy decodes float16 one element at a time:
+       int8 saves memory at no latency cost, float16 only trades latency for memory.
+    8. The "mapped" encoding keeps only the ids and row references in memory and scores the full precision rows read through the memory map,
+       so its searches are exact but read the vector file, from the page cache or from disk, at every search.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        directory: str,
+        encoding: str = "float32",
+        rescore_candidates: int = 0,
+        coarse_dimensions: int = 0,
+        coarse_candidates: int = 300,
+        pq_subspaces: int = 96,
+        neighbour_count: int = 0
+    ) -> None:
+        """
+        Initializes the VectorStore class.
+        """
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            raise FileNotFoundError("The vector index does not exist.")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported vector encoding '{encoding}'. Expected one of {ENCODINGS}.")
+        self.directory = directory
+        self.encoding = encoding
+        self.rescore_candidates = rescore_candidates
+        with open(os.path.join(directory, META_FILE), "r") as f:
+            self.meta = json.load(f)
+        self.ids = np.load(os.path.join(directory, IDS_FILE)).tolist()
+        self.rows = np.load(os.path.join(directory, ROWS_FILE))
+        self.positions = {id: position for position, id in enumerate(self.ids)}
+        self.full_vectors = self._open_full_vectors()
+        self.scoring_buffers = queue.Queue(SCORING_BUFFERS)
+        self.quantizer = None
+        vectors = None
+        if encoding == "pq":
+            self.quantizer = self._load_quantizer(pq_subspaces)
+            self.codes, self.scales = self._quantized_codes(), None
+        elif encoding == "mapped":
+            self.codes, self.scales = None, None
+        else:
+            vectors = self.full_vectors[self.rows]
+            self.codes, self.scales = encode_vectors(vectors, encoding)
+        self.coarse_dimensions = coarse_dimensions
+        self.coarse_candidates = coarse_candidates
+        self.projection = None
+        if coarse_dimensions:
+            self._load_coarse_index(self.full_vectors[self.rows] if vectors is None else vectors)
+        self.neighbour_count = neighbour_count
+        self.neighbours = self.neighbour_scores = None
+        if neighbour_count:
+            self.neighbours, self.neighbour_scores = self._compute_neighbours(np.arange(len(self.ids)))
+
+    @classmethod
+    def create(
+        cls,
+        directory: str,
+        ids: list,
+        vectors: np.ndarray,
+        meta: dict,
+        encoding: str = "float32",
+        rescore_candidates: int = 0,
+        coarse_dimensions: int = 0,
+        coarse_candidates: int = 300,
+        pq_subspaces: int = 96,
+        neighbour_count: int = 0
+    ) -> "VectorStore":
+        """
+        Writes a new index to disk and returns the VectorStore.
+
+        Args:
+        -----
+        directory : ``str``
+            The directory to write the index files to.
+        ids : ``list``
+            The ids of the items, in the same order as the vectors.
+        vectors : ``np.ndarray``
+            The normalized embeddings of the items.
+        meta : ``dict``
+            The metadata to store alongside the index.
+
+        Keyword Args:
+        -------------
+        encoding : ``str``
+            The in-memory encoding of the vectors. Default is "float32".
+        rescore_candidates : ``int``
+            The number of candidates to rescore against the full precision vectors. Default is 0.
+        coarse_dimensions : ``int``
+            The number of dimensions of the coarse PCA index. Default is 0.
+        coarse_candidates : ``int``
+            The number of candidates kept by the coarse stage. Default is 300.
+        pq_subspaces : ``int``
+            The number of subspaces of the "pq" encoding. Default is 96.
+        neighbour_count : ``int``
+            The length of the precomputed neighbour lists. Default is 0.
+
+        Returns:
+        --------
+        ``VectorStore``
+            The VectorStore reading from the new index.
+
+        Notes:
+        ------
+        1. Any existing index in the directory is overwritten, including a previously fitted projection and product quantizer.
+
+        Example:
+        --------
+        >>> store = VectorStore.create("data_index", ["1", "2"], vectors, {"model": "thenlper/gte-base"})
+
+        Author: ``@ChinaiArman``
+        """
+        os.makedirs(directory, exist_ok=True)
+        if coarse_dimensions:
+            save_projection(directory, *fit_projection(vectors, coarse_dimensions))
+        elif os.path.exists(os.path.join(directory, PROJECTION_FILE)):
+            os.remove(os.path.join(directory, PROJECTION_FILE))
+        if os.path.exists(os.path.join(directory, PQ_FILE)):
+            os.remove(os.path.join(directory, PQ_FILE))
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with open(os.path.join(directory, VECTORS_FILE), "wb") as f:
+            f.write(vectors.tobytes())
+        np.save(os.path.join(directory, IDS_FILE), np.array(ids, dtype=str))
+        np.save(os.path.join(directory, ROWS_FILE), np.arange(len(ids), dtype=np.int64))
+        with open(os.path.join(directory, META_FILE), "w") as f:
+            json.dump({**meta, "dimensions": int(vectors.shape[1])}, f)
+        return cls(directory, encoding, rescore_candidates, coarse_dimensions, coarse_candidates, pq_subspaces, neighbour_count)
+
+    def _open_full_vectors(
+        self
+    ) -> np.ndarray:
+        """
+        Opens the full precision vector file as a read-only memory map.
+        """
+        path = os.path.join(self.directory, VECTORS_FILE)
+        dimensions = self.meta["dimensions"]
+        count = os.path.getsize(path) // (4 * dimensions)
+        if count == 0:
+            return np.empty((0, dimensions), dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=(count, dimensions))
+
+    def _load_quantizer(
+        self,
+        subspaces: int
+    ) -> ProductQuantizer:
+        """
+        Loads the product quantizer, training it and encoding the full precision file if it is missing or stale.
+        """
+        path = os.path.join(self.directory, PQ_FILE)
+        if os.path.exists(path):
+            quantizer = ProductQuantizer.load(path)
+            if quantizer.subspaces == subspaces and len(quantizer.codes) == len(self.full_vectors):
+                return quantizer
+            del quantizer
+        print("Training product quantizer...")
+        quantizer = ProductQuantizer.train(self.full_vectors, subspaces)
+        quantizer.codes = quantizer.encode(self.full_vectors)
+        quantizer.save(path)
+        return ProductQuantizer.load(path)
+
+    def _quantized_codes(
+        self
+    ) -> np.ndarray:
+        """
+        Returns the product quantization codes of the stored rows, without copying them if no row was removed.
+        """
+        codes = self.quantizer.codes
+        if len(self.rows) == len(codes) and np.array_equal(self.rows, np.arange(len(codes))):
+            return codes
+        return codes[self.rows]
+
+    def _load_coarse_index(
+        self,
+        vectors: np.ndarray
+    ) -> None:
+        """
+        Loads the PCA projection (fitting and saving it if missing) and projects the stored vectors.
+        """
+        projection = load_projection(self.directory, self.coarse_dimensions)
+        if projection is None:
+            projection = fit_projection(vectors, self.coarse_dimensions)
+            save_projection(self.directory, *projection)
+        self.projection = projection
+        self.coarse = project(vectors, *projection)
+        self.coarse_bias = vectors @ projection[0]
+
+    def _coarse_candidates(
+        self,
+        query: np.ndarray,
+        size: int,
+        positions: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Returns the positions kept by the coarse stage (among `positions` if given).
+        The positions are returned unchanged if the coarse stage is disabled or would not discard any of them.
+        """
+        limit = max(self.coarse_candidates, size)
+        if self.projection is None or (positions is not None and len(positions) <= limit):
+            return positions
+        coarse = self.coarse if positions is None else self.coarse[positions]
+        bias = self.coarse_bias if positions is None else self.coarse_bias[positions]
+        order = top_k(coarse @ project(query, *self.projection) + bias, limit)
+        return order if positions is None else positions[order]
+
+    def _score(
+        self,
+        query: np.ndarray,
+        positions: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Scores the encoded vectors (or a subset of them) against the query, in chunks that fit in the CPU cache.
+        The float16 and int8 chunks are gathered and decoded, and the "mapped" chunks read from the full precision vectors,
+        into a float32 buffer taken from the pool of the index, and scored in place by BLAS.
+        """
+        if self.encoding == "float32":
+            return (self.codes if positions is None else self.codes[positions]) @ query
+        if self.encoding == "pq":
+            return score_codes(self.codes if positions is None else self.codes[positions], self.quantizer.lookup_table(query))
+        dimensions = self.meta["dimensions"]
+        count = len(self.ids) if positions is None else len(positions)
+        chunk_rows = max(1, SCORING_CHUNK_BYTES // (4 * dimensions))
+        scores = np.empty(count, dtype=np.float32)
+        try:
+            buffer = self.scoring_buffers.get_nowait()
+        except queue.Empty:
+            buffer = np.empty((chunk_rows, dimensions), dtype=np.float32)
+        try:
+            for start in range(0, count, chunk_rows):
+                chunk = slice(start, start + chunk_rows) if positions is None else positions[start:start + chunk_rows]
+                decoded = buffer[:min(chunk_rows, count - start)]
+                if self.encoding == "mapped":
+                    np.take(self.full_vectors, self.rows[chunk], axis=0, out=decoded)
+                else:
+                    np.copyto(decoded, self.codes[chunk])
+                np.matmul(decoded, query, out=scores[start:start + len(decoded)])
+        finally:
+            try:
+                self.scoring_buffers.put_nowait(buffer)
+            except queue.Full:
+                pass
+        if self.scales is not None:
+            scores *= self.scales if positions is None else self.scales[positions]
+        return scores
+
+    def _compute_neighbours(
+        self,
+        positions: np.ndarray
+    ) -> tuple[
+            np.ndarray,
+            np.ndarray
+        ]:
+        """
+        Computes the exact neighbour lists of the items at the positions, in blocks of at most NEIGHBOUR_BLOCK_SCORES scores.
+        """
+        vectors = np.ascontiguousarray(self.full_vectors[self.rows])
+        neighbours = np.full((len(positions), self.neighbour_count), -1, dtype=np.int64)
+        scores = np.full((len(positions), self.neighbour_count), -np.inf, dtype=np.float32)
+        block_rows = max(1, NEIGHBOUR_BLOCK_SCORES // max(len(vectors), 1))
+        for start in range(0, len(positions), block_rows):
+            block = positions[start:start + block_rows]
+            block_scores = vectors[block] @ vectors.T
+            block_scores[np.arange(len(block)), block] = -np.inf
+            neighbours[start:start + len(block)], scores[start:start + len(block)] = top_k_rows(block_scores, self.neighbour_count)
+        return neighbours, scores
+
+    def positions_of(
+        self,
+        ids: list
+    ) -> np.ndarray:
+        """
+        Returns the row positions of the given ids, skipping ids that are not in the index.
+
+        Args:
+        -----
+        ids : ``list``
+            A list of item ids.
+
+        Returns:
+        --------
+        ``np.ndarray``
+            The positions of the ids that are in the index, in the same order.
+
+        Example:
+        --------
+        >>> positions = store.positions_of(["1", "2"])
+
+        Author: ``@ChinaiArman``
+        """
+        return np.array([self.positions[id] for id in ids if id in self.positions], dtype=np.int64)
+
+    def search(
+        self,
+        query: np.ndarray,
+        size: int,
+        positions: np.ndarray = None
+    ) -> tuple[
+            list,
+            np.ndarray
+        ]:
+        """
+        Returns the ids and scores of the stored vectors most similar to the query.
+
+        Args:
+        -----
+        query : ``np.ndarray``
+            The normalized embedding of the query.
+        size : ``int``
+            The number of results to return.
+
+        Keyword Args:
+        -------------
+        positions : ``np.ndarray``
+            The row positions to restrict the search to. Default is None, which searches every row.
+
+        Returns:
+        --------
+        ``tuple``
+            A tuple containing the list of ids and the array of scores, from most to least similar.
+
+        Notes:
+        ------
+        1. If the coarse stage is enabled, every row is scored in the reduced space and only the best `coarse_candidates` rows are scored with the encoded vectors.
+        2. Otherwise, the encoded vectors are scored in a single vectorized pass.
+        3. If rescoring is enabled, the best `rescore_candidates` rows are rescored against the full precision vectors, unless they were scored in full precision.
+
+        Example:
+        --------
+        >>> store = VectorStore("data_index", "int8", 100)
+        >>> ids, scores = store.search(query, 5)
+
+        Author: ``@ChinaiArman``
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        candidates = self._coarse_candidates(query, size, positions)
+        scores = self._score(query, candidates)
+        if self.rescore_candidates and self.encoding not in ("float32", "mapped"):
+            order = top_k(scores, max(self.rescore_candidates, size))
+            candidates = order if candidates is None else candidates[order]
+            scores = self.full_vectors[self.rows[candidates]] @ query
+        order = top_k(scores, size)
+        positions = order if candidates is None else candidates[order]
+        return [self.ids[position] for position in positions], scores[order] * SCORE_SCALE
+
+    def add(
+        self,
+        id: str,
+        vector: np.ndarray,
+        save: bool = True
+    ) -> None:
+        """
+        Adds a vector to the index.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the item.
+        vector : ``np.ndarray``
+            The normalized embedding of the item.
+
+        Keyword Args:
+        -------------
+        save : ``bool``
+            Whether to rewrite the ids and row references of the index. Default is True, False lets the caller call `save` later.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. The vector is appended to the full precision file and the index files are rewritten.
+        2. If the id already exists, the old vector is removed first.
+        3. With `save` False, the appended row is not referenced by the files of the index until `save` is called,
+           so a reader of the index files keeps seeing the previous items.
+
+        Example:
+        --------
+        >>> store.add("3", vector)
+
+        Author: ``@ChinaiArman``
+        """
+        if id in self.positions:
+            self.remove(id, save=False)
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        with open(os.path.join(self.directory, VECTORS_FILE), "ab") as f:
+            f.write(vector.tobytes())
+        self.full_vectors = self._open_full_vectors()
+        if self.quantizer is not None:
+            ProductQuantizer.append(os.path.join(self.directory, PQ_FILE), self.quantizer.encode(vector))
+            self.quantizer = ProductQuantizer.load(os.path.join(self.directory, PQ_FILE))
+        elif self.codes is not None:
+            codes, scales = encode_vectors(vector, self.encoding)
+            self.codes = np.concatenate([self.codes, codes])
+            if self.scales is not None:
+                self.scales = np.concatenate([self.scales, scales])
+        if self.projection is not None:
+            self.coarse = np.concatenate([self.coarse, project(vector, *self.projection)])
+            self.coarse_bias = np.concatenate([self.coarse_bias, vector @ self.projection[0]])
+        self.rows = np.append(self.rows, len(self.full_vectors) - 1)
+        if self.quantizer is not None:
+            self.codes = self._quantized_codes()
+        self.positions[id] = len(self.ids)
+        self.ids.append(id)
+        if self.neighbours is not None:
+            scores = self.full_vectors[self.rows] @ vector[0]
+            scores[-1] = -np.inf
+            improved = np.flatnonzero(scores[:-1] > self.neighbour_scores[:, -1])
+            merged = np.concatenate([self.neighbour_scores[improved], scores[improved, None]], axis=1)
+            merged_neighbours = np.concatenate([self.neighbours[improved], np.full((len(improved), 1), len(self.ids) - 1)], axis=1)
+            columns, self.neighbour_scores[improved] = top_k_rows(merged, self.neighbour_count)
+            self.neighbours[improved] = np.where(columns >= 0, np.take_along_axis(merged_neighbours, np.maximum(columns, 0), axis=1), -1)
+            neighbours, neighbour_scores = top_k_rows(scores[None, :], self.neighbour_count)
+            self.neighbours = np.concatenate([self.neighbours, neighbours])
+            self.neighbour_scores = np.concatenate([self.neighbour_scores, neighbour_scores])
+        if save:
+            self.save()
+
+    def remove(
+        self,
+        id: str,
+        save: bool = True
+    ) -> bool:
+        """
+        Removes a vector from the index.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the item to remove.
+
+        Keyword Args:
+        -------------
+        save : ``bool``
+            Whether to rewrite the ids and row references of the index. Default is True, False lets the caller call `save` later.
+
+        Returns:
+        --------
+        ``bool``
+            True if the item was removed, False if it was not in the index.
+
+        Notes:
+        ------
+        1. The full precision row is left in place and reclaimed when the index is rebuilt.
+        2. Only the neighbour lists that contained the item are recomputed.
+
+        Example:
+        --------
+        >>> store.remove("3")
+
+        Author: ``@ChinaiArman``
+        """
+        position = self.positions.get(id)
+        if position is None:
+            return False
+        if self.codes is not None:
+            self.codes = np.delete(self.codes, position, axis=0)
+        if self.scales is not None:
+            self.scales = np.delete(self.scales, position)
+        if self.projection is not None:
+            self.coarse = np.delete(self.coarse, position, axis=0)
+            self.coarse_bias = np.delete(self.coarse_bias, position)
+        self.rows = np.delete(self.rows, position)
+        del self.ids[position]
+        self.positions = {id: position for position, id in enumerate(self.ids)}
+        if self.neighbours is not None:
+            self.neighbours = np.delete(self.neighbours, position, axis=0)
+            self.neighbour_scores = np.delete(self.neighbour_scores, position, axis=0)
+            affected = np.flatnonzero((self.neighbours == position).any(axis=1))
+            self.neighbours[self.neighbours > position] -= 1
+            self.neighbours[affected], self.neighbour_scores[affected] = self._compute_neighbours(affected)
+        if save:
+            self.save()
+        return True
+
+    def similar(
+        self,
+        id: str,
+        size: int
+    ) -> tuple[
+            list,
+            np.ndarray
+        ]:
+        """
+        Returns the ids and scores of the items most similar to a stored item, excluding the item itself.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the stored item.
+        size : ``int``
+            The number of items to return.
+
+        Returns:
+        --------
+        ``tuple``
+            A tuple containing the list of ids and the array of scores, from most to least similar.
+
+        Raises:
+        -------
+        ``KeyError``
+            If the item is not in the index.
+
+        Notes:
+        ------
+        1. The query is the stored full precision vector of the item, so no embedding is computed.
+        2. If `size` fits in the precomputed neighbour lists, the list is returned without scoring the catalog.
+
+        Example:
+        --------
+        >>> ids, scores = store.similar("3", 5)
+
+        Author: ``@ChinaiArman``
+        """
+        position = self.positions[id]
+        if self.neighbours is not None and size <= self.neighbour_count:
+            neighbours = self.neighbours[position, :max(size, 0)]
+            kept = neighbours >= 0
+            return [self.ids[neighbour] for neighbour in neighbours[kept]], self.neighbour_scores[position, :max(size, 0)][kept] * SCORE_SCALE
+        ids, scores = self.search(np.asarray(self.full_vectors[self.rows[position]]), size + 1)
+        kept = [index for index, result_id in enumerate(ids) if result_id != id][:max(size, 0)]
+        return [ids[index] for index in kept], scores[kept]
+
+    def copy(
+        self
+    ) -> "VectorStore":
+        """
+        Returns a copy of the index that can be added to and removed from without changing this one.
+
+        Args:
+        -----
+        None.
+
+        Returns:
+        --------
+        ``VectorStore``
+            The copy, sharing the arrays that `add` and `remove` replace rather than modify, and the files of the index.
+
+        Notes:
+        ------
+        1. The ids, positions and neighbour lists are copied, because `add` and `remove` modify them in place.
+        2. The full precision file is only appended to, so the memory map of this index stays valid after the copy adds vectors.
+
+        Example:
+        --------
+        >>> updated = store.copy()
+        >>> updated.add("3", vector)
+        ... # The original store still serves the previous version.
+
+        Author: ``@ChinaiArman``
+        """
+        clone = copy.copy(self)
+        clone.ids = list(self.ids)
+        clone.positions = dict(self.positions)
+        if self.neighbours is not None:
+            clone.neighbours = self.neighbours.copy()
+            clone.neighbour_scores = self.neighbour_scores.copy()
+        return clone
+
+    def move(
+        self,
+        directory: str
+    ) -> None:
+        """
+        Moves the files of the index to another directory, replacing the index stored there.
+
+        Args:
+        -----
+        directory : ``str``
+            The directory to move the index files to.
+
+        Returns:
+        --------
+        None.
+
+        Notes:
+        ------
+        1. Each file is renamed over the file of the same name, so another VectorStore reading the replaced index keeps its memory maps
+           and can serve until it is discarded, but must not be added to or removed from afterwards.
+        2. The files of the replaced index that this index does not have (e.g. a product quantizer) are removed.
+        3. Other files and subdirectories of the directory, like the phrase embedding cache, are left in place.
+        4. The previous directory is removed if it is left empty.
+
+        Example:
+        --------
+        >>> store = VectorStore.create("data_index.reload", ids, vectors, meta)
+        >>> store.move("data_index")
+
+        Author: ``@ChinaiArman``
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in INDEX_FILES:
+            source, target = os.path.join(self.directory, name), os.path.join(directory, name)
+            if os.path.exists(source):
+                os.replace(source, target)
+            elif os.path.exists(target):
+                os.remove(target)
+        previous, self.directory = self.directory, directory
+        if not os.listdir(previous):
+            os.rmdir(previous)
+
+    def save(
+        self
+    ) -> None:
+        """
+        Writes the ids, row references and metadata of the index to disk.
+        """
+        np.save(os.path.join(self.directory, IDS_FILE), np.array(self.ids, dtype=str))
+        np.save(os.path.join(self.directory, ROWS_FILE), self.rows)
+        with open(os.path.join(self.directory, META_FILE), "w") as f:
+            json.dump(self.meta, f)
+
+    def memory_usage(
+        self
+    ) -> int:
+        """
+        Returns the number of bytes used by the in-memory vectors.
+
+        Args:
+        -----
+        None.
+
+        Returns:
+        --------
+        ``int``
+            The size of the encoded vectors, scales, codebooks, coarse index and neighbour lists in bytes, without the "mapped" vectors.
+
+        Example:
+        --------
+        >>> print(store.memory_usage())
+        ... 2073600
+
+        Author: ``@ChinaiArman``
+        """
+        memory = (self.codes.nbytes if self.codes is not None else 0) + (self.scales.nbytes if self.scales is not None else 0)
+        if self.projection is not None:
+            memory += self.coarse.nbytes + self.coarse_bias.nbytes
+        if self.quantizer is not None:
+            memory += self.quantizer.codebooks.nbytes
+        if self.neighbours is not None:
+            memory += self.neighbours.nbytes + self.neighbour_scores.nbytes
+        return memory
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the VectorStore class with random vectors.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function creates a temporary index of random vectors and searches it with each encoding.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the top 5 results and the memory usage for each encoding.
+
+    Author: ``@ChinaiArman``
+    """
+    import tempfile
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1000, 768)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [str(i) for i in range(len(vectors))]
+    with tempfile.TemporaryDirectory() as directory:
+        VectorStore.create(directory, ids, vectors, {"model": "random"})
+        for encoding in ENCODINGS:
+            store = VectorStore(directory, encoding, rescore_candidates=50)
+            result_ids, scores = store.search(vectors[0], 5)
+            print(f"{encoding}: {result_ids} {scores.round(2).tolist()} ({store.memory_usage()} bytes)")
+
+
+if __name__ == "__main__":
+    main()
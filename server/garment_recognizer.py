@@ -16,24 +16,79 @@ To execute this module from the root directory, run the following command:
     ``python server/garment_recognizer.py``
 """
 
-from data_source.data_access import Database
-from embedded_model.semantic_textual_analysis import image_model_wrapper, load_embedded_model, keyword_model_wrapper
+import json
+import os
+import threading
+
+from data_source.data_access import Database, create_keywords
+from data_source.lexical_index import LexicalIndex, document_text
+from data_source.attribute_index import AttributeIndex, normalize_value, row_attributes
+from data_source.rendered_rows import RenderedRows
+from catalog_snapshot import CatalogSnapshot, SnapshotStore
+from result_cache import ResultCache
+from pagination import RankingStore
+from instrumentation import span
+from embedded_model.sharded_search import ShardedSearch
+from embedded_model.semantic_textual_analysis import image_model_wrapper, load_embedded_model, keyword_model_wrapper, load_vector_store, embed_keywords, get_index_directory, update_keyword_hashes
+
+
+RELOAD_DIRECTORY_SUFFIX = ".reload"
+SHARDED_ENCODING = "mapped"
+
+
+class CatalogReloading(Exception):
+    """
+    Raised when an insert, edit or delete is rejected because the catalog is being reloaded.
+    """
 
 
 class GarmentRecognizer:
     """
     Class to recognize garments and interact with the data source.
 
-    Args:
-    -----
-    None.
+    Keyword Args:
+    -------------
+    file_path : ``str``
+        The path to the data source file. Default is None, which reads the "DATA_SOURCE_FILE" environment variable.
+    embedded_model : ``tuple``
+        The tokenizer and model to use, e.g. shared by the recognizers of several catalogs. Default is None, which loads the embedded model.
+    shards : ``ShardedSearch``
+        The shards searching the vector index. Default is None, which searches the vector index in-process.
 
     Attributes:
     -----------
+    file_path : ``str``
+        The path to the data source file, None for the "DATA_SOURCE_FILE" environment variable.
+    index_directory : ``str``
+        The directory of the vector index of the data source.
     tokenizer: ``Tokenizer``
         The tokenizer used to tokenize the text data.
     model: ``Model``
         The model used to extract the semantic meaning of the text data.
+    snapshots: ``SnapshotStore``
+        The store of the versioned catalog snapshots, read by the requests and replaced by the writes.
+    snapshot: ``CatalogSnapshot``
+        The current snapshot of the data source and its indexes.
+    vector_store: ``VectorStore``
+        The vector index holding the embeddings of the data source.
+    lexical_index: ``LexicalIndex``
+        The BM25 index of the text columns of the data source.
+    attribute_index: ``AttributeIndex``
+        The bitmap index of the retailer, colour and article type of the data source.
+    rendered_rows: ``RenderedRows``
+        The pre-rendered JSON encoding of every row of the data source, used to build the responses.
+    catalog_version: ``int``
+        The version of the data source, bumped by every insert, edit and delete.
+    result_cache: ``ResultCache``
+        The cache of the search results, keyed by normalized request and validated against the catalog version.
+    rankings: ``RankingStore``
+        The short-lived store of the ranked ids of the paginated searches.
+    shards: ``ShardedSearch``
+        The shards searching the vector index, or None.
+    reloading: ``bool``
+        Whether a reload is building the next snapshot, during which the writes are rejected.
+    reload_lock: ``threading.Lock``
+        The lock held while a reload runs, so at most one reload runs at a time.
 
     Methods:
     --------
@@ -41,28 +96,300 @@ class GarmentRecognizer:
     ... # Inserts a row into the data source.
     >>> delete_row(id)
     ... # Deletes a row from the data source by its id.
-    >>> get_item_by_semantic_search(file_path_or_url, size)
+    >>> get_item_by_semantic_search(file_path_or_url, size, filters)
     ... # Gets a list of items from data source similar to the provided image by using a semantic search.
     >>> get_item_by_id(id)
     ... # Retrieves an item from the data source by its id.
-    >>> get_items_by_keywords(keywords, size)
+    >>> get_similar_items(id, size)
+    ... # Retrieves the items most similar to an item of the data source.
+    >>> get_items_by_keywords(keywords, size, mode, filters)
     ... # Retrieves items from the data source by their keywords.
+    >>> get_page(cursor, page_size)
+    ... # Retrieves a page of the results of a paginated search.
+    >>> reload()
+    ... # Reloads the data source file and swaps in a snapshot built from it.
     
     Notes:
     ------
     1. The class provides methods to interact with the data source and recognize garments.
     2. The class uses the Database class to interact with the data source.
     3. The class uses the embedded model to extract the semantic meaning of the text data.
+    4. The size of the result cache is read from the "RESULT_CACHE_ENTRIES" and "RESULT_CACHE_BYTES" environment variables,
+       and its stale-while-revalidate window from the "RESULT_CACHE_STALE_SECONDS" environment variable.
+    5. The item lookups and searches return JSON bytes assembled from the pre-rendered rows, ready to be sent as a response.
+    6. The lifetime and count of the paginated rankings are read from the "PAGINATION_TTL_SECONDS" and "PAGINATION_MAX_RANKINGS" environment variables.
+    7. Each request reads the current catalog snapshot once, so it never waits for a write and never mixes two versions of the catalog.
+       The writes are serialized, build the next version from copies of the current one and publish it atomically.
+    8. The keyword descriptions of a new or edited item are generated before the write lock is taken, so a slow captioning call does not block the other writes.
+       Under the lock, a write only updates the changed row in the copies of the indexes, and writes the index and data source files
+       once the next snapshot is fully built, so a failed write leaves the data source file and the served snapshot unchanged.
+    9. With `shards`, the semantic and keyword searches and the similar items are scored by the shards, which are sent the vector index
+       of every new snapshot in the background. The in-process vector index then uses the SHARDED_ENCODING ("mapped") encoding: it keeps only
+       the ids and row references in memory, and only answers from the memory-mapped vector file while the shards do not.
+    10. A reload builds the next snapshot without the write lock, and the writes raise CatalogReloading until it is swapped in,
+        so they fail at once instead of waiting for the rebuild, and never overwrite the data source file being reloaded.
 
     Author: ``@ChinaiArman``
     """
     def __init__(
-        self
+        self,
+        file_path: str = None,
+        embedded_model: tuple = None,
+        shards: ShardedSearch = None
     ) -> None:
         """
         Initializes the Database class.
         """
-        self.tokenizer, self.model = load_embedded_model()
+        self.tokenizer, self.model = embedded_model or load_embedded_model()
+        self.file_path = file_path
+        self.index_directory = get_index_directory(file_path)
+        self.shards = shards
+        db = Database(file_path)
+        vector_store = load_vector_store(db, self.model, self.tokenizer, directory=self.index_directory, encoding=self._encoding())
+        self.snapshots = SnapshotStore(CatalogSnapshot(
+            0, db, vector_store, *self._build_indexes(db, vector_store), RenderedRows.from_data_frame(db.get_data_frame())
+        ))
+        self.result_cache = ResultCache(
+            int(os.getenv("RESULT_CACHE_ENTRIES", 1024)),
+            int(os.getenv("RESULT_CACHE_BYTES", 64 * 2 ** 20)),
+            float(os.getenv("RESULT_CACHE_STALE_SECONDS", 0))
+        )
+        self.rankings = RankingStore(
+            float(os.getenv("PAGINATION_TTL_SECONDS", 300)),
+            int(os.getenv("PAGINATION_MAX_RANKINGS", 1024))
+        )
+        if shards is not None:
+            shards.refresh(vector_store)
+        self.reloading = False
+        self.reload_lock = threading.Lock()
+
+    @property
+    def snapshot(
+        self
+    ) -> CatalogSnapshot:
+        """
+        Returns the current snapshot of the data source and its indexes.
+        """
+        return self.snapshots.current
+
+    @property
+    def vector_store(
+        self
+    ):
+        """
+        Returns the vector index of the current snapshot.
+        """
+        return self.snapshots.current.vector_store
+
+    @property
+    def lexical_index(
+        self
+    ) -> LexicalIndex:
+        """
+        Returns the BM25 index of the current snapshot.
+        """
+        return self.snapshots.current.lexical_index
+
+    @property
+    def attribute_index(
+        self
+    ) -> AttributeIndex:
+        """
+        Returns the bitmap index of the current snapshot.
+        """
+        return self.snapshots.current.attribute_index
+
+    @property
+    def rendered_rows(
+        self
+    ) -> RenderedRows:
+        """
+        Returns the pre-rendered rows of the current snapshot.
+        """
+        return self.snapshots.current.rendered_rows
+
+    @property
+    def catalog_version(
+        self
+    ) -> int:
+        """
+        Returns the version of the current snapshot.
+        """
+        return self.snapshots.current.version
+
+    def _encoding(
+        self
+    ) -> str:
+        """
+        Returns the encoding of the vector index, SHARDED_ENCODING if the shards hold the vectors, or None for the "VECTOR_ENCODING" environment variable.
+        """
+        return SHARDED_ENCODING if self.shards is not None else None
+
+    @staticmethod
+    def _build_indexes(
+        db: Database,
+        vector_store
+    ) -> tuple:
+        """
+        Builds the lexical and attribute indexes in the row order of the vector index, so they share its positions.
+        """
+        df = db.get_data_frame().set_index("id").reindex(vector_store.ids).reset_index()
+        return LexicalIndex.from_data_frame(df), AttributeIndex.from_data_frame(df)
+
+    def _publish(
+        self,
+        snapshot: CatalogSnapshot,
+        db: Database,
+        vector_store,
+        lexical_index: LexicalIndex,
+        attribute_index: AttributeIndex,
+        rendered_rows: RenderedRows
+    ) -> CatalogSnapshot:
+        """
+        Writes the vector index files and then the data source file of a write, as its last step, and returns the next snapshot built from the modified copies.
+        """
+        vector_store.save()
+        db.write_to_csv()
+        return CatalogSnapshot(snapshot.version + 1, db, vector_store, lexical_index, attribute_index, rendered_rows)
+
+    def _update(
+        self,
+        write: callable,
+        reload: bool = False
+    ) -> object:
+        """
+        Publishes the next snapshot built by `write` and sends its vector index to the shards.
+        The writes other than the swap of a reload raise CatalogReloading while a reload runs.
+        """
+        def checked(snapshot: CatalogSnapshot) -> tuple:
+            if self.reloading and not reload:
+                raise CatalogReloading("The catalog is being reloaded, retry later.")
+            return write(snapshot)
+        result = self.snapshots.update(checked)
+        if self.shards is not None:
+            self.shards.refresh_later(self.snapshot.vector_store)
+        return result
+
+    def _search_index(
+        self,
+        snapshot: CatalogSnapshot
+    ):
+        """
+        Returns the vector index of a snapshot, searched through the shards if there are any.
+        """
+        return snapshot.vector_store if self.shards is None else self.shards.view(snapshot.vector_store)
+
+    @staticmethod
+    def _hydrate(
+        snapshot: CatalogSnapshot,
+        item_ids: list
+    ) -> bytes:
+        """
+        Returns the JSON array of the rows of the ids in a snapshot, skipping the ids that no longer exist.
+        """
+        with span("hydrate"):
+            return snapshot.rendered_rows.array(item_ids)
+
+    def _first_page(
+        self,
+        item_ids: list,
+        page_size: int
+    ) -> bytes:
+        """
+        Stores the ranked ids of a paginated search and returns its first page.
+        """
+        return self.get_page(f"{self.rankings.put(item_ids, page_size)}:0")
+
+    @staticmethod
+    def _normalize_filters(
+        filters: dict
+    ) -> tuple:
+        """
+        Returns a hashable, order independent form of the attribute filters, used in the result cache keys.
+        """
+        return tuple(sorted(
+            (attribute, tuple(sorted({normalize_value(attribute, value) for value in values})))
+            for attribute, values in (filters or {}).items() if values
+        ))
+
+    def _write_row(
+        self,
+        snapshot: CatalogSnapshot,
+        write: callable
+    ) -> tuple:
+        """
+        Applies a write returning a row to a copy of the data source of a snapshot, and returns the next snapshot and the row.
+        The row is embedded and replaced in copies of the indexes, which move it to the end like the vector index does.
+        """
+        db = snapshot.database.copy()
+        row = write(db)
+        vector = embed_keywords([row["keywordDescriptions"]], self.model, self.tokenizer, add=True)[0]
+        vector_store = snapshot.vector_store.copy()
+        lexical_index, attribute_index = snapshot.lexical_index.copy(), snapshot.attribute_index.copy()
+        position = vector_store.positions.get(row["id"])
+        if position is not None:
+            lexical_index.remove(position)
+            attribute_index.remove(position)
+        vector_store.add(row["id"], vector, save=False)
+        vector_store.meta = update_keyword_hashes(vector_store.meta, row["id"], row["keywordDescriptions"])
+        lexical_index.add(row["id"], document_text(row))
+        attribute_index.add(row["id"], row_attributes(row))
+        rendered_rows = snapshot.rendered_rows.copy()
+        rendered_rows.update(row)
+        return self._publish(snapshot, db, vector_store, lexical_index, attribute_index, rendered_rows), row
+
+    def reload(
+        self
+    ) -> CatalogSnapshot:
+        """
+        Reloads the data source file, e.g. after the offline pipeline rewrote it, and swaps in a snapshot built from it.
+
+        Args:
+        -----
+        None.
+
+        Returns:
+        --------
+        ``CatalogSnapshot``
+            The snapshot of the reloaded data source.
+
+        Notes:
+        ------
+        1. The new snapshot is built without the write lock, which is only taken to check that the catalog did not change and to swap it in.
+           The requests keep reading the current snapshot meanwhile, and the inserts, edits and deletes raise CatalogReloading.
+        2. The vector index is reused if it still matches the data source. Otherwise it is rebuilt in a directory next to the index directory
+           and its files are moved over the served ones once everything else is built, so a failed reload leaves the current snapshot untouched.
+        3. The new snapshot has a new version, so the cached search results of the previous catalog are not served.
+
+        Example:
+        --------
+        >>> gr = GarmentRecognizer()
+        >>> gr.reload().version
+        ... 1
+
+        Author: ``@ChinaiArman``
+        """
+        directory = self.index_directory
+        with self.reload_lock:
+            with self.snapshots.lock:
+                self.reloading = True
+                version = self.snapshots.current.version
+            try:
+                db = Database(self.file_path)
+                vector_store = load_vector_store(db, self.model, self.tokenizer, directory + RELOAD_DIRECTORY_SUFFIX, directory, self._encoding())
+                indexes = self._build_indexes(db, vector_store)
+                rendered_rows = RenderedRows.from_data_frame(db.get_data_frame())
+
+                def swap(snapshot: CatalogSnapshot) -> tuple:
+                    if snapshot.version != version:
+                        raise RuntimeError("The catalog was modified during the reload.")
+                    if vector_store.directory != directory:
+                        vector_store.move(directory)
+                    reloaded = CatalogSnapshot(snapshot.version + 1, db, vector_store, *indexes, rendered_rows)
+                    return reloaded, reloaded
+                return self._update(swap, reload=True)
+            finally:
+                self.reloading = False
 
     def insert_row(
         self,
@@ -85,6 +412,7 @@ class GarmentRecognizer:
         ------
         1. The method inserts a new row into the data source.
         2. The method returns the id of the inserted row.
+        3. The keyword descriptions are generated before the write lock is taken, the row is then added to a copy of the current snapshot.
 
         Example:
         --------
@@ -94,8 +422,8 @@ class GarmentRecognizer:
 
         Author: ``@nataliecly``
         """
-        db = Database()
-        return db.add_row(data)
+        keywords = create_keywords(data['imageUrl'])
+        return self._update(lambda snapshot: self._write_row(snapshot, lambda db: db.add_row(data, keywords, save=False)))
     
     def delete_row(
         self,
@@ -117,6 +445,7 @@ class GarmentRecognizer:
         Notes:
         ------
         1. The method deletes the row with the provided id from the data source.
+        2. The row is removed from a copy of the current snapshot, which is only published if the row existed.
 
         Example:
         --------
@@ -126,14 +455,32 @@ class GarmentRecognizer:
 
         Author: ``@levxxvi``
         """
-        db = Database()
-        return db.delete_row(id)
+        def write(snapshot: CatalogSnapshot) -> tuple:
+            position = snapshot.vector_store.positions.get(id)
+            if position is None:
+                return None, False
+            db = snapshot.database.copy()
+            if not db.delete_row(id, save=False):
+                return None, False
+            vector_store = snapshot.vector_store.copy()
+            vector_store.remove(id, save=False)
+            vector_store.meta = update_keyword_hashes(vector_store.meta, id)
+            lexical_index, attribute_index = snapshot.lexical_index.copy(), snapshot.attribute_index.copy()
+            lexical_index.remove(position)
+            attribute_index.remove(position)
+            rendered_rows = snapshot.rendered_rows.copy()
+            rendered_rows.remove(id)
+            return self._publish(snapshot, db, vector_store, lexical_index, attribute_index, rendered_rows), True
+        return self._update(write)
 
     def get_item_by_semantic_search(
         self,
         file_path_or_url: str,
-        size: int
-    ) -> list:
+        size: int,
+        filters: dict = None,
+        page_size: int = None,
+        stream: bool = False
+    ) -> bytes:
         """
         Gets a list of items from data source similar to the provided image by using a semantic search.
 
@@ -144,16 +491,37 @@ class GarmentRecognizer:
         size : ``int``
             The number of items to return in the list.
 
+        Keyword Args:
+        -------------
+        filters : ``dict``
+            A dictionary mapping "retailer", "colour" or "articleType" to the list of accepted values. Default is None.
+        page_size : ``int``
+            The number of items of the first page. Default is None, which returns every item without pagination.
+        stream : ``bool``
+            Whether to return the items as a generator of newline delimited JSON lines. Default is False.
+
         Returns:
         --------
-        ``list``
-            A list of those items similar to the provided image, up to `size` in length.
+        ``bytes``
+            The JSON array of those items similar to the provided image, up to `size` in length.
+            With `page_size`, the JSON object with the "items" of the first page and the "cursor" of the next page.
+            With `stream`, a generator of one JSON line per item.
+
+        Raises:
+        -------
+        ``ValueError``
+            If a filter uses an unknown attribute.
 
         Notes:
         ------
         1. The method uses the embedded model to extract the semantic meaning of the provided image.
         2. The method then uses the semantic meaning to find similar items in the data source.
         3. The method returns a list of specified size of the most similar items in the data source.
+        4. With filters, only the items matching every filter are scored.
+        5. Repeated requests at the same catalog version are served from the result cache, without captioning, embedding or hydration.
+        6. The response is assembled from the pre-rendered rows of the items.
+        7. With `page_size`, the `size` ranked ids are stored for the following pages and only the first page is hydrated.
+        8. With `stream`, the ranking is computed before returning and the items are rendered as the generator is consumed.
 
         Example:
         --------
@@ -163,22 +531,30 @@ class GarmentRecognizer:
 
         Author: ``@cc-dev-65535``
         """
-        db = Database()
-        item_ids = image_model_wrapper(
-            file_path_or_url,
-            size,
-            self.model,
-            self.tokenizer
-        )
-        return [
-            db.get_item_by_id(item_id).fillna("").to_dict("records")[0]
-            for item_id in item_ids
-        ]
+        snapshot = self.snapshot
+
+        def rank() -> list:
+            with span("filter"):
+                positions = snapshot.attribute_index.positions(filters)
+            return image_model_wrapper(
+                file_path_or_url,
+                size,
+                self.model,
+                self.tokenizer,
+                self._search_index(snapshot),
+                positions
+            )
+        if page_size is not None:
+            return self._first_page(rank(), page_size)
+        if stream:
+            return snapshot.rendered_rows.stream(rank())
+        key = ("search", file_path_or_url.strip(), size, self._normalize_filters(filters))
+        return self.result_cache.get_or_compute(key, snapshot.version, lambda: self._hydrate(snapshot, rank()))
     
     def get_item_by_id(
         self,
         id: str
-    ) -> dict:
+    ) -> bytes:
         """
         Retrieves an item from the data source by its id.
 
@@ -189,12 +565,13 @@ class GarmentRecognizer:
 
         Returns:
         --------
-        ``dict``
-            The item data.
+        ``bytes``
+            The JSON object of the item data, or None if the item does not exist.
 
         Notes:
         ------
         1. The method retrieves the item with the provided id from the data source.
+        2. The item is read from its pre-rendered row, without filtering the data source.
 
         Example:
         --------
@@ -205,18 +582,55 @@ class GarmentRecognizer:
 
         Author: ``@Ehsan138``
         """
-        db = Database()
-        item = db.get_item_by_id(id)
-        if len(item) == 0:
-            print("in here")
-            return None
-        return item.fillna("").to_dict("records")[0] if not item.empty else None
+        return self.rendered_rows.get(id)
     
+    def get_similar_items(
+        self,
+        id: str,
+        size: int
+    ) -> bytes:
+        """
+        Retrieves the items most similar to an item of the data source.
+
+        Args:
+        -----
+        id : ``str``
+            The id of the item.
+        size : ``int``
+            The number of items to return in the list.
+
+        Returns:
+        --------
+        ``bytes``
+            The JSON array of the items most similar to the item, excluding the item itself, or None if the item does not exist.
+
+        Notes:
+        ------
+        1. The method queries the vector index with the stored embedding of the item, without any model or network call.
+
+        Example:
+        --------
+        >>> gr = GarmentRecognizer()
+        >>> items = gr.get_similar_items("1", 5)
+        ... # Returns the 5 items most similar to the item with id 1.
+
+        Author: ``@ChinaiArman``
+        """
+        snapshot = self.snapshot
+        if id not in snapshot.vector_store.positions:
+            return None
+        item_ids, _ = self._search_index(snapshot).similar(id, size)
+        return self._hydrate(snapshot, item_ids)
+
     def get_items_by_keywords(
         self,
         keywords: list,
-        size: int
-    ) -> list:
+        size: int,
+        mode: str = "semantic",
+        filters: dict = None,
+        page_size: int = None,
+        stream: bool = False
+    ) -> bytes:
         """
         Retrieves items from the data source by their keywords.
         
@@ -226,15 +640,37 @@ class GarmentRecognizer:
             A list of keywords to search for.
         size : ``int``
             The number of items to return in the list.
+
+        Keyword Args:
+        -------------
+        mode : ``str``
+            The search mode, one of "semantic", "lexical" or "hybrid". Default is "semantic".
+        filters : ``dict``
+            A dictionary mapping "retailer", "colour" or "articleType" to the list of accepted values. Default is None.
+        page_size : ``int``
+            The number of items of the first page. Default is None, which returns every item without pagination.
+        stream : ``bool``
+            Whether to return the items as a generator of newline delimited JSON lines. Default is False.
         
         Returns:
         --------
-        ``list``
-            A list of items that contain the provided keywords.
+        ``bytes``
+            The JSON array of items that contain the provided keywords.
+            With `page_size`, the JSON object with the "items" of the first page and the "cursor" of the next page.
+            With `stream`, a generator of one JSON line per item.
+
+        Raises:
+        -------
+        ``ValueError``
+            If the search mode is not supported or a filter uses an unknown attribute.
 
         Notes:
         ------
         1. The method retrieves items from the data source that contain the provided keywords.
+        2. The "lexical" mode does not use the embedded model, the "hybrid" mode only embeds the keywords once.
+        3. Repeated requests at the same catalog version are served from the result cache, ignoring the case and spacing of the keywords.
+        4. With `page_size`, the `size` ranked ids are stored for the following pages and only the first page is hydrated.
+        5. With `stream`, the ranking is computed before returning and the items are rendered as the generator is consumed.
 
         Example:
         --------
@@ -245,17 +681,72 @@ class GarmentRecognizer:
 
         Author: ``@ChinaiArman``    
         """
-        db = Database()
-        items = keyword_model_wrapper(
-            keywords,
-            size,
-            self.model,
-            self.tokenizer
-        )
-        return [
-            db.get_item_by_id(item_id).fillna("").to_dict("records")[0]
-            for item_id in items
-        ]
+        snapshot = self.snapshot
+
+        def rank() -> list:
+            with span("filter"):
+                positions = snapshot.attribute_index.positions(filters)
+            return keyword_model_wrapper(
+                keywords,
+                size,
+                self.model,
+                self.tokenizer,
+                self._search_index(snapshot),
+                snapshot.lexical_index,
+                mode,
+                positions
+            )
+        if page_size is not None:
+            return self._first_page(rank(), page_size)
+        if stream:
+            return snapshot.rendered_rows.stream(rank())
+        normalized_keywords = tuple(" ".join(keyword.lower().split()) for keyword in keywords)
+        key = ("keyword_search", normalized_keywords, size, mode, self._normalize_filters(filters))
+        return self.result_cache.get_or_compute(key, snapshot.version, lambda: self._hydrate(snapshot, rank()))
+
+    def get_page(
+        self,
+        cursor: str,
+        page_size: int = None
+    ) -> bytes:
+        """
+        Retrieves a page of the results of a paginated search.
+
+        Args:
+        -----
+        cursor : ``str``
+            The cursor returned with the previous page.
+
+        Keyword Args:
+        -------------
+        page_size : ``int``
+            The number of items of the page. Default is None, which uses the page size of the first request.
+
+        Returns:
+        --------
+        ``bytes``
+            The JSON object with the "items" of the page and the "cursor" of the next page (null on the last page),
+            or None if the cursor is invalid or has expired.
+
+        Notes:
+        ------
+        1. The page is sliced from the ranking stored by the first request, so no model is called and only the page is hydrated.
+        2. Items deleted since the first request are skipped, edited items are returned with their current data.
+
+        Example:
+        --------
+        >>> gr = GarmentRecognizer()
+        >>> page = gr.get_items_by_keywords(['shirt', 'blue'], 100, page_size=20)
+        >>> next_page = gr.get_page(json.loads(page)["cursor"])
+        ... # Returns the items 20 to 40 of the ranking.
+
+        Author: ``@ChinaiArman``
+        """
+        page = self.rankings.page(cursor, page_size)
+        if page is None:
+            return None
+        item_ids, next_cursor = page
+        return b'{"cursor":' + json.dumps(next_cursor).encode() + b',"items":' + self._hydrate(self.snapshot, item_ids) + b"}"
     
     def edit_row(
         self, 
@@ -280,6 +771,7 @@ class GarmentRecognizer:
         Notes:
         ------
         1. The method edits the garment with the provided id in the data source.
+        2. The keyword descriptions are generated before the write lock is taken, the row is then replaced in a copy of the current snapshot.
 
         Example:
         --------
@@ -289,10 +781,10 @@ class GarmentRecognizer:
 
         Author: ``@levxxvi``
         """
-        db = Database()
         if not all(key in data for key in ['name', 'description', 'imageUrl', 'id']):
             raise ValueError()
-        return db.edit_row(id, data)
+        keywords = create_keywords(data['imageUrl'])
+        return self._update(lambda snapshot: self._write_row(snapshot, lambda db: db.edit_row(id, data, keywords, save=False)))
 
 
 def main(
@@ -322,7 +814,7 @@ def main(
     garment_recognizer = GarmentRecognizer()
     print("Get items by semantic search...")
     url = "http://assets.myntassets.com/v1/images/style/properties/be5106fa146a771fdb128833b4ab9b8b_images.jpg"
-    print(garment_recognizer.get_item_by_semantic_search(url, 5))
+    print(garment_recognizer.get_item_by_semantic_search(url, 5).decode())
 
 
 if __name__ == "__main__":
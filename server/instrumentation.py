@@ -0,0 +1,374 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A lightweight instrumentation layer that times the stages of a request with perf_counter_ns.
+The stages of each request are reported in a Server-Timing response header and a structured (JSON) log line.
+
+Requirements:
+This module requires the installation of the flask library.
+The reports are enabled by setting the "INSTRUMENTATION" environment variable to "true".
+The stages are also timed when the metrics are enabled ("METRICS" environment variable, "true" by default) to feed the /metrics histograms.
+
+Usage:
+To time a block, wrap it in ``with span("name"):``. To time a function, decorate it with ``@timed("name")``.
+To report the stages of every request, call ``init_app(app)`` on the Flask app.
+To execute this module from the root directory, run the following command:
+    ``python server/instrumentation.py``
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+REPORTING_ENABLED = os.getenv("INSTRUMENTATION", "false").lower() in ("1", "true", "yes")
+METRICS_ENABLED = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+ENABLED = REPORTING_ENABLED or METRICS_ENABLED
+LOGGER = logging.getLogger("garment_recognition.timing")
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+_listeners = []
+
+
+class _NullSpan:
+    """
+    A span that does nothing, returned by `span` when the instrumentation is disabled.
+    """
+    __slots__ = ()
+
+    def __enter__(
+        self
+    ) -> "_NullSpan":
+        return self
+
+    def __exit__(
+        self,
+        *exc_info
+    ) -> bool:
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Class to time a block of code and record its duration in the current request.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the stage.
+
+    Attributes:
+    -----------
+    name : ``str``
+        The name of the stage.
+    start : ``int``
+        The perf_counter_ns value when the block was entered.
+
+    Notes:
+    ------
+    1. The duration is recorded even if the block raises an exception.
+
+    Author: ``@ChinaiArman``
+    """
+    __slots__ = ("name", "start")
+
+    def __init__(
+        self,
+        name: str
+    ) -> None:
+        """
+        Initializes the Span class.
+        """
+        self.name = name
+
+    def __enter__(
+        self
+    ) -> "Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(
+        self,
+        *exc_info
+    ) -> bool:
+        record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+def record(
+    name: str,
+    duration_ns: int
+) -> None:
+    """
+    Records the duration of a stage in the current request and passes it to the listeners.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the stage.
+    duration_ns : ``int``
+        The duration of the stage in nanoseconds.
+
+    Returns:
+    --------
+    None.
+
+    Example:
+    --------
+    >>> record("caption", 1250000)
+
+    Author: ``@ChinaiArman``
+    """
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration_ns))
+    for listener in _listeners:
+        listener(name, duration_ns)
+
+
+def add_listener(
+    listener: callable
+) -> None:
+    """
+    Registers a function called with the name and duration in nanoseconds of every recorded stage.
+    """
+    _listeners.append(listener)
+
+
+def span(
+    name: str
+) -> Span:
+    """
+    Returns a context manager timing a stage of the current request.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the stage.
+
+    Returns:
+    --------
+    ``Span``
+        A Span, or a shared no-op context manager if the instrumentation is disabled.
+
+    Example:
+    --------
+    >>> with span("score"):
+    ...     ids, scores = vector_store.search(query, size)
+
+    Author: ``@ChinaiArman``
+    """
+    return Span(name) if ENABLED else NULL_SPAN
+
+
+def timed(
+    name: str
+) -> callable:
+    """
+    Returns a decorator timing every call of a function as a stage.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the stage.
+
+    Returns:
+    --------
+    ``callable``
+        The decorator. If the instrumentation is disabled, it returns the function unchanged.
+
+    Example:
+    --------
+    >>> @timed("csv_write")
+    ... def write_to_csv(self):
+    ...     ...
+
+    Author: ``@ChinaiArman``
+    """
+    def decorator(function: callable) -> callable:
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request(
+) -> None:
+    """
+    Starts collecting the stages of the current request.
+    """
+    _request_spans.set([])
+
+
+def finish_request(
+) -> list:
+    """
+    Stops collecting the stages of the current request and returns them.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``list``
+        A list of (name, total duration in nanoseconds, count) tuples, in the order the stages first ran.
+
+    Notes:
+    ------
+    1. Stages that ran several times in the request, e.g. one per embedding batch, are summed.
+
+    Example:
+    --------
+    >>> finish_request()
+    ... [("caption", 812000000, 1), ("tokenize", 1200000, 1), ("forward", 35000000, 1), ("score", 900000, 1)]
+
+    Author: ``@ChinaiArman``
+    """
+    stages = {}
+    for name, duration_ns in _request_spans.get() or []:
+        total, count = stages.get(name, (0, 0))
+        stages[name] = (total + duration_ns, count + 1)
+    _request_spans.set(None)
+    return [(name, total, count) for name, (total, count) in stages.items()]
+
+
+def server_timing(
+    stages: list
+) -> str:
+    """
+    Formats the stages of a request as a Server-Timing header value.
+
+    Args:
+    -----
+    stages : ``list``
+        A list of (name, total duration in nanoseconds, count) tuples.
+
+    Returns:
+    --------
+    ``str``
+        The header value, with the durations in milliseconds.
+
+    Example:
+    --------
+    >>> server_timing([("caption", 812000000, 1), ("score", 900000, 1)])
+    ... 'caption;dur=812.000, score;dur=0.900'
+
+    Author: ``@ChinaiArman``
+    """
+    return ", ".join(f"{name};dur={total / 1e6:.3f}" for name, total, _ in stages)
+
+
+def init_app(
+    app
+) -> None:
+    """
+    Reports the stages of every request of a Flask app in a Server-Timing header and a structured log line.
+
+    Args:
+    -----
+    app : ``Flask``
+        The Flask app.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Nothing is registered if the "INSTRUMENTATION" environment variable is not "true", so the requests are not slowed down.
+    2. The log line is a JSON object with the method, path, status, total duration and per-stage durations in milliseconds.
+
+    Example:
+    --------
+    >>> init_app(app)
+
+    Author: ``@ChinaiArman``
+    """
+    if not REPORTING_ENABLED:
+        return
+    from flask import g, request
+    if not LOGGER.handlers:
+        LOGGER.addHandler(logging.StreamHandler())
+        LOGGER.setLevel(logging.INFO)
+
+    @app.before_request
+    def start_timing():
+        g.request_start_ns = time.perf_counter_ns()
+        start_request()
+
+    @app.after_request
+    def report_timing(response):
+        total_ns = time.perf_counter_ns() - g.get("request_start_ns", time.perf_counter_ns())
+        stages = finish_request()
+        response.headers["Server-Timing"] = ", ".join(filter(None, [server_timing(stages), f"total;dur={total_ns / 1e6:.3f}"]))
+        LOGGER.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ns / 1e6, 3),
+            "stages": {name: {"ms": round(total / 1e6, 3), "count": count} for name, total, count in stages},
+        }))
+        return response
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the instrumentation layer.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function times two stages of a simulated request and prints the Server-Timing header value.
+    2. It also prints the cost of a span when the instrumentation is disabled.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the Server-Timing header value and the cost of a disabled span.
+
+    Author: ``@ChinaiArman``
+    """
+    global ENABLED
+    ENABLED = True
+    start_request()
+    with span("caption"):
+        time.sleep(0.02)
+    for _ in range(3):
+        with span("forward"):
+            time.sleep(0.005)
+    print(server_timing(finish_request()))
+    ENABLED = False
+    start = time.perf_counter_ns()
+    for _ in range(100000):
+        with span("score"):
+            pass
+    print(f"Disabled span: {(time.perf_counter_ns() - start) / 100000:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+In-process Prometheus metrics of the server: request counters, fixed-bucket latency histograms per route and per pipeline stage,
+in-flight requests, embedding batch sizes, catalog row count, version and reloads, named catalog loads and residency, search shard results and refreshes,
+admission control queue waits and rejections, and search result cache counters.
+The metrics are exported in the Prometheus text exposition format by the /metrics endpoint.
+
+Requirements:
+This module requires the installation of the flask library.
+The metrics are collected unless the "METRICS" environment variable is set to "false".
+
+Usage:
+To update a metric, call its inc, set or observe method. To collect the request metrics, call ``init_app(app)`` on the Flask app.
+To execute this module from the root directory, run the following command:
+    ``python server/metrics.py``
+"""
+
+import bisect
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import instrumentation
+
+
+ENABLED = instrumentation.METRICS_ENABLED
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+RELOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(
+    names: tuple,
+    values: tuple,
+    extra: str = ""
+) -> str:
+    """
+    Formats label names and values as a Prometheus label set.
+    """
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    labels = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Metric:
+    """
+    Base class of the metrics, holding the values of every label set under a single lock.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the metric.
+    help : ``str``
+        The description of the metric.
+    labels : ``tuple``
+        The label names of the metric.
+
+    Attributes:
+    -----------
+    values : ``dict``
+        The value of each label set, keyed by the tuple of label values.
+    lock : ``threading.Lock``
+        The lock guarding the values, held only for the update of a number.
+
+    Notes:
+    ------
+    1. Updates only hold the lock while adding to a number, so the lock is cheap and never held during I/O.
+    2. Label values are passed as keyword arguments in any order.
+
+    Author: ``@ChinaiArman``
+    """
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = ()
+    ) -> None:
+        """
+        Initializes the Metric class.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {} if self.labels or self.type == "histogram" else {(): 0}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(
+        self,
+        labels: dict
+    ) -> tuple:
+        """
+        Returns the tuple of label values of a label set.
+        """
+        return tuple(labels[name] for name in self.labels)
+
+    def samples(
+        self
+    ) -> list:
+        """
+        Returns the (suffix, label set, value) samples of the metric.
+        """
+        with self.lock:
+            values = dict(self.values)
+        return [("", _format_labels(self.labels, key), value) for key, value in sorted(values.items())]
+
+    def render(
+        self
+    ) -> str:
+        """
+        Returns the metric in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix}{labels} {value:g}" for suffix, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Class of a metric that only increases, e.g. a number of requests.
+    """
+    type = "counter"
+
+    def inc(
+        self,
+        amount: float = 1,
+        **labels
+    ) -> None:
+        """
+        Increases the counter of a label set.
+        """
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Class of a metric that goes up and down, e.g. a number of in-flight requests.
+    """
+    type = "gauge"
+
+    def inc(
+        self,
+        amount: float = 1,
+        **labels
+    ) -> None:
+        """
+        Increases the gauge of a label set.
+        """
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(
+        self,
+        amount: float = 1,
+        **labels
+    ) -> None:
+        """
+        Decreases the gauge of a label set.
+        """
+        self.inc(-amount, **labels)
+
+    def set(
+        self,
+        value: float,
+        **labels
+    ) -> None:
+        """
+        Sets the gauge of a label set.
+        """
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class CallbackMetric(Metric):
+    """
+    Class of a metric read from a function when the metrics are exported, e.g. the row count of the catalog.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the metric.
+    help : ``str``
+        The description of the metric.
+    type : ``str``
+        The Prometheus type of the metric, "gauge" or "counter".
+
+    Notes:
+    ------
+    1. The function is set later with `set_function`, the metric is not exported until then.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str = "gauge"
+    ) -> None:
+        """
+        Initializes the CallbackMetric class.
+        """
+        super().__init__(name, help)
+        self.type = type
+        self.function = None
+
+    def set_function(
+        self,
+        function: callable
+    ) -> None:
+        """
+        Sets the function returning the value of the metric.
+        """
+        self.function = function
+
+    def samples(
+        self
+    ) -> list:
+        """
+        Returns the current value of the metric.
+        """
+        return [] if self.function is None else [("", "", self.function())]
+
+
+class Histogram(Metric):
+    """
+    Class of a metric counting observations in fixed buckets, e.g. request latencies.
+
+    Args:
+    -----
+    name : ``str``
+        The name of the metric.
+    help : ``str``
+        The description of the metric.
+    labels : ``tuple``
+        The label names of the metric.
+    buckets : ``tuple``
+        The increasing upper bounds of the buckets, the +Inf bucket is added automatically.
+
+    Notes:
+    ------
+    1. Each label set keeps one count per bucket (not cumulative), its sum and its count; the buckets are made cumulative on export.
+
+    Author: ``@ChinaiArman``
+    """
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        """
+        Initializes the Histogram class.
+        """
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(
+        self,
+        value: float,
+        **labels
+    ) -> None:
+        """
+        Records an observation for a label set.
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(
+        self
+    ) -> list:
+        """
+        Returns the cumulative bucket, sum and count samples of every label set.
+        """
+        with self.lock:
+            values = {key: ([*counts], total, count) for key, (counts, total, count) in self.values.items()}
+        samples = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", _format_labels(self.labels, key, f'le="{bound}"'), cumulative))
+            samples.append(("_sum", _format_labels(self.labels, key), total))
+            samples.append(("_count", _format_labels(self.labels, key), count))
+        return samples
+
+
+REGISTRY = []
+
+REQUESTS = Counter("http_requests_total", "Number of HTTP requests.", ("route", "method", "status"))
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Latency of the HTTP requests.", ("route", "method"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Number of HTTP requests being served.")
+STAGE_DURATION = Histogram("stage_duration_seconds", "Latency of the pipeline stages (caption, embed, score, hydrate, csv_write, ...).", ("stage",))
+EMBEDDING_BATCH_SIZE = Histogram("embedding_batch_size", "Number of texts per forward pass of the embedded model.", buckets=BATCH_SIZE_BUCKETS)
+CATALOG_ROWS = CallbackMetric("catalog_rows", "Number of rows in the catalog.")
+CATALOG_VERSION = CallbackMetric("catalog_version", "Version of the catalog snapshot being served.")
+CATALOG_RELOADS = Counter("catalog_reloads_total", "Number of catalog reloads.", ("trigger", "result"))
+CATALOG_RELOAD_DURATION = Histogram("catalog_reload_duration_seconds", "Duration of the catalog reloads.", ("trigger",), RELOAD_BUCKETS)
+CATALOG_RELOADED_AT = Gauge("catalog_last_reload_timestamp_seconds", "Unix time of the last successful catalog reload.")
+CATALOG_LOAD_DURATION = Histogram("named_catalog_load_duration_seconds", "Duration of the lazy loads of the named catalogs.", ("catalog",), RELOAD_BUCKETS)
+CATALOG_RESIDENT = Gauge("named_catalog_resident", "Whether a named catalog is loaded in memory (1) or not (0).", ("catalog",))
+CATALOG_MEMORY = Gauge("named_catalog_memory_bytes", "Estimated memory of a loaded named catalog, 0 once evicted.", ("catalog",))
+CATALOG_EVICTIONS = Counter("named_catalog_evictions_total", "Number of evictions of a named catalog from memory.", ("catalog",))
+SHARD_REQUESTS = Counter("shard_requests_total", "Number of searches sent to each search shard, by result (ok, error, timeout).", ("shard", "result"))
+SHARD_REFRESHES = Counter("shard_refreshes_total", "Number of refreshes of the search shards, by kind (full, delta).", ("kind",))
+SHARDED_SEARCHES = Counter("sharded_searches_total", "Number of sharded searches, by outcome (complete, partial, fallback).", ("outcome",))
+ADMISSION_ACTIVE = Gauge("admission_active_requests", "Number of requests of a limited endpoint being served.", ("endpoint",))
+ADMISSION_QUEUED = Gauge("admission_queued_requests", "Number of requests of a limited endpoint waiting for a free slot.", ("endpoint",))
+ADMISSION_QUEUE_WAIT = Histogram("admission_queue_wait_seconds", "Time the admitted requests of a limited endpoint waited for a free slot.", ("endpoint",))
+ADMISSION_REJECTIONS = Counter("admission_rejections_total", "Number of requests rejected with a 503, by reason (queue_full, timeout).", ("endpoint", "reason"))
+CACHE_HITS = CallbackMetric("result_cache_hits_total", "Number of searches served from an up to date cached result.", "counter")
+CACHE_STALE_HITS = CallbackMetric("result_cache_stale_hits_total", "Number of searches served from an outdated cached result.", "counter")
+CACHE_MISSES = CallbackMetric("result_cache_misses_total", "Number of searches computed.", "counter")
+CACHE_EVICTIONS = CallbackMetric("result_cache_evictions_total", "Number of cached results evicted.", "counter")
+CACHE_BYTES = CallbackMetric("result_cache_bytes", "Size of the cached results in bytes.")
+
+
+def render(
+) -> str:
+    """
+    Returns every metric in the Prometheus text exposition format.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    ``str``
+        The metrics, one HELP and TYPE header per metric followed by its samples.
+
+    Example:
+    --------
+    >>> print(render())
+    ... # HELP http_requests_total Number of HTTP requests.
+    ... # TYPE http_requests_total counter
+    ... http_requests_total{route="/search",method="POST",status="200"} 3
+
+    Author: ``@ChinaiArman``
+    """
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def init_app(
+    app
+) -> None:
+    """
+    Collects the request and stage metrics of a Flask app.
+
+    Args:
+    -----
+    app : ``Flask``
+        The Flask app.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Requests are labelled by their route rule (e.g. "/items/<id>"), not their path, to keep the number of label sets bounded.
+    2. The stage durations are received from the instrumentation spans.
+    3. Nothing is registered if the "METRICS" environment variable is "false".
+
+    Example:
+    --------
+    >>> init_app(app)
+
+    Author: ``@ChinaiArman``
+    """
+    if not ENABLED:
+        return
+    from flask import g, request
+    instrumentation.add_listener(lambda name, duration_ns: STAGE_DURATION.observe(duration_ns / 1e9, stage=name))
+
+    @app.before_request
+    def start_metrics():
+        IN_FLIGHT.inc()
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_metrics(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        REQUEST_DURATION.observe(time.perf_counter() - g.get("metrics_start", time.perf_counter()), route=route, method=request.method)
+        return response
+
+    @app.teardown_request
+    def finish_metrics(exception):
+        if "metrics_start" in g:
+            IN_FLIGHT.dec()
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the metrics.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function records a few observations from several threads and prints the exported metrics.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the metrics in the Prometheus text exposition format.
+
+    Author: ``@ChinaiArman``
+    """
+    def worker():
+        for latency in (0.004, 0.02, 0.3):
+            REQUESTS.inc(route="/keyword_search", method="POST", status=200)
+            REQUEST_DURATION.observe(latency, route="/keyword_search", method="POST")
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    CATALOG_ROWS.set_function(lambda: 2744)
+    print(render())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A short-lived store of ranked search results used to paginate them with cursors.
+The first page of a search stores its ranked ids under a random token, and the following pages are sliced from them without ranking again.
+
+Requirements:
+This module has no third party requirements.
+
+Usage:
+To use this class, create a RankingStore, store a ranking with the put method and read pages with the page method.
+To execute this module from the root directory, run the following command:
+    ``python server/pagination.py``
+"""
+
+from collections import OrderedDict
+import secrets
+import threading
+import time
+
+
+class RankingStore:
+    """
+    Class to store ranked ids under short-lived tokens and slice them into pages.
+
+    Args:
+    -----
+    ttl_seconds : ``float``
+        How long a ranking is kept after it was stored.
+    max_rankings : ``int``
+        The maximum number of rankings kept, the oldest are evicted first.
+
+    Attributes:
+    -----------
+    rankings : ``OrderedDict``
+        The stored rankings, from oldest to newest, mapping each token to (expiry, page_size, ids).
+
+    Methods:
+    --------
+    >>> put(ids, page_size)
+    ... # Stores a ranking and returns its token.
+    >>> page(cursor, page_size)
+    ... # Returns the ids of a page and the cursor of the next page.
+
+    Notes:
+    ------
+    1. A cursor is the token of the ranking followed by the offset of the page, e.g. "Zk3x...:20".
+    2. Every ranking lives for the same TTL, so the oldest ranking always expires first and eviction only looks at the front of the store.
+    3. The store is safe to use from several threads.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_rankings: int = 1024
+    ) -> None:
+        """
+        Initializes the RankingStore class.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_rankings = max_rankings
+        self.rankings = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _evict(
+        self,
+        now: float
+    ) -> None:
+        """
+        Removes the expired rankings and the oldest rankings beyond the maximum count. The lock must be held.
+        """
+        while self.rankings and (len(self.rankings) > self.max_rankings or next(iter(self.rankings.values()))[0] <= now):
+            self.rankings.popitem(last=False)
+
+    def put(
+        self,
+        ids: list,
+        page_size: int
+    ) -> str:
+        """
+        Stores a ranking and returns its token.
+
+        Args:
+        -----
+        ids : ``list``
+            The ranked ids, from best to worst.
+        page_size : ``int``
+            The default number of ids per page.
+
+        Returns:
+        --------
+        ``str``
+            The token of the ranking.
+
+        Example:
+        --------
+        >>> token = store.put(["3", "1", "2"], 2)
+
+        Author: ``@ChinaiArman``
+        """
+        token = secrets.token_urlsafe(12)
+        now = time.monotonic()
+        with self.lock:
+            self.rankings[token] = (now + self.ttl_seconds, page_size, list(ids))
+            self._evict(now)
+        return token
+
+    def page(
+        self,
+        cursor: str,
+        page_size: int = None
+    ) -> tuple[
+            list,
+            str
+        ]:
+        """
+        Returns the ids of a page and the cursor of the next page.
+
+        Args:
+        -----
+        cursor : ``str``
+            The cursor of the page.
+
+        Keyword Args:
+        -------------
+        page_size : ``int``
+            The number of ids of the page. Default is None, which uses the page size of the first request.
+
+        Returns:
+        --------
+        ``tuple``
+            A tuple containing the ids of the page and the cursor of the next page (None on the last page),
+            or None if the cursor is malformed or its ranking has expired.
+
+        Example:
+        --------
+        >>> ids, next_cursor = store.page(f"{token}:0")
+
+        Author: ``@ChinaiArman``
+        """
+        token, _, offset = cursor.rpartition(":")
+        if not offset.isdigit():
+            return None
+        offset = int(offset)
+        with self.lock:
+            self._evict(time.monotonic())
+            ranking = self.rankings.get(token)
+        if ranking is None:
+            return None
+        _, default_page_size, ids = ranking
+        end = offset + (page_size or default_page_size)
+        return ids[offset:end], f"{token}:{end}" if end < len(ids) else None
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the RankingStore class.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function stores a ranking of 10 ids and walks through its pages of 4 ids.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the pages of the ranking.
+
+    Author: ``@ChinaiArman``
+    """
+    store = RankingStore(ttl_seconds=60)
+    cursor = f"{store.put([str(id) for id in range(10)], 4)}:0"
+    while cursor is not None:
+        ids, cursor = store.page(cursor)
+        print(ids, cursor)
+
+
+if __name__ == "__main__":
+    main()
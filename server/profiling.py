@@ -0,0 +1,341 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+On-demand profiling of single requests with cProfile and, optionally, tracemalloc.
+A request is profiled when it carries the admin profiling header with the configured token, or when it is part of the sampled fraction of requests.
+The pstats dump, a readable summary and the allocation report of each profiled request are written to a configured directory.
+
+Requirements:
+This module requires the installation of the flask library.
+The profiling is disabled unless the "PROFILING" environment variable is set to "true".
+
+Usage:
+To profile the requests of a Flask app, call ``init_app(app)`` and send a request with the header ``X-Profile: <PROFILING_TOKEN>``.
+A dump can be inspected with ``python -m pstats profiles/<name>.prof`` or a viewer such as snakeviz.
+To execute this module from the root directory, run the following command:
+    ``python server/profiling.py``
+"""
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+ENABLED = os.getenv("PROFILING", "false").lower() in ("1", "true", "yes")
+HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+TOKEN = os.getenv("PROFILING_TOKEN", "")
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+TRACEMALLOC = os.getenv("PROFILING_TRACEMALLOC", "false").lower() in ("1", "true", "yes")
+DIRECTORY = os.getenv("PROFILING_DIR", "profiles")
+MAX_DUMPS = int(os.getenv("PROFILING_MAX_DUMPS", 50))
+SUMMARY_LINES = 40
+_lock = threading.Lock()
+
+
+class Profile:
+    """
+    Class to profile a block of code with cProfile and optionally tracemalloc, and write its dumps.
+
+    Args:
+    -----
+    name : ``str``
+        The prefix of the dump files, e.g. the method and route of the request.
+
+    Keyword Args:
+    -------------
+    memory : ``bool``
+        Whether the allocations are traced with tracemalloc. Default is the "PROFILING_TRACEMALLOC" environment variable.
+
+    Attributes:
+    -----------
+    profiler : ``cProfile.Profile``
+        The profiler of the block.
+    snapshot : ``tracemalloc.Snapshot``
+        The allocations when the block started, or None if they are not traced.
+    start_time : ``float``
+        The perf_counter value when the block started.
+
+    Methods:
+    --------
+    >>> start()
+    ... # Starts profiling.
+    >>> stop(directory)
+    ... # Stops profiling and writes the dumps.
+
+    Notes:
+    ------
+    1. Only one block is profiled at a time: the profilers are process-wide (on Python 3.12+ cProfile also sees the other threads).
+    2. Three files are written: ``<stem>.prof`` (pstats), ``<stem>.txt`` (the top functions by cumulative time)
+       and, with tracemalloc, ``<stem>.alloc.txt`` (the lines that allocated the most memory during the block).
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        name: str,
+        memory: bool = TRACEMALLOC
+    ) -> None:
+        """
+        Initializes the Profile class.
+        """
+        self.name = name
+        self.memory = memory
+        self.profiler = cProfile.Profile()
+        self.snapshot = None
+
+    def start(
+        self
+    ) -> None:
+        """
+        Starts profiling.
+        """
+        if self.memory:
+            tracemalloc.start()
+            self.snapshot = tracemalloc.take_snapshot()
+        self.start_time = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(
+        self,
+        directory: str = DIRECTORY
+    ) -> str:
+        """
+        Stops profiling and writes the dumps.
+
+        Args:
+        -----
+        directory : ``str``
+            The directory of the dumps, created if missing.
+
+        Returns:
+        --------
+        ``str``
+            The path of the pstats dump.
+
+        Example:
+        --------
+        >>> profile = Profile("POST-search")
+        >>> profile.start()
+        >>> ...
+        >>> profile.stop("profiles")
+        ... 'profiles/20240101-120000-123456-POST-search-812ms.prof'
+
+        Author: ``@ChinaiArman``
+        """
+        self.profiler.disable()
+        elapsed_ms = (time.perf_counter() - self.start_time) * 1000
+        allocations = None
+        if self.snapshot is not None:
+            allocations = tracemalloc.take_snapshot().compare_to(self.snapshot, "lineno")
+            tracemalloc.stop()
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1e6) % 1000000:06d}"
+        stem = os.path.join(directory, f"{stamp}-{re.sub(r'[^A-Za-z0-9_-]+', '-', self.name).strip('-')}-{elapsed_ms:.0f}ms")
+        self.profiler.dump_stats(stem + ".prof")
+        summary = io.StringIO()
+        pstats.Stats(self.profiler, stream=summary).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+        with open(stem + ".txt", "w") as file:
+            file.write(summary.getvalue())
+        if allocations is not None:
+            with open(stem + ".alloc.txt", "w") as file:
+                file.write("\n".join(str(statistic) for statistic in allocations[:SUMMARY_LINES]) + "\n")
+        _prune(directory)
+        return stem + ".prof"
+
+
+def _prune(
+    directory: str
+) -> None:
+    """
+    Deletes the oldest dumps of a directory beyond the "PROFILING_MAX_DUMPS" limit.
+    """
+    for dump in list_dumps(directory)[MAX_DUMPS:]:
+        stem = os.path.join(directory, dump["name"][:-len(".prof")])
+        for extension in (".prof", ".txt", ".alloc.txt"):
+            if os.path.exists(stem + extension):
+                os.remove(stem + extension)
+
+
+def list_dumps(
+    directory: str = DIRECTORY
+) -> list:
+    """
+    Lists the profiling dumps of a directory, most recent first.
+
+    Args:
+    -----
+    directory : ``str``
+        The directory of the dumps.
+
+    Returns:
+    --------
+    ``list``
+        A list of dictionaries with the name, size in bytes, creation time and whether an allocation report exists for each dump.
+
+    Example:
+    --------
+    >>> list_dumps("profiles")
+    ... [{"name": "20240101-120000-123456-POST-search-812ms.prof", "bytes": 48213, "created": 1704110400.0, "allocations": False}]
+
+    Author: ``@ChinaiArman``
+    """
+    if not os.path.isdir(directory):
+        return []
+    dumps = []
+    for name in os.listdir(directory):
+        if name.endswith(".prof"):
+            path = os.path.join(directory, name)
+            dumps.append({
+                "name": name,
+                "bytes": os.path.getsize(path),
+                "created": os.path.getmtime(path),
+                "allocations": os.path.exists(path[:-len(".prof")] + ".alloc.txt"),
+            })
+    return sorted(dumps, key=lambda dump: dump["name"], reverse=True)
+
+
+def should_profile(
+    header: str
+) -> bool:
+    """
+    Returns whether a request is profiled.
+
+    Args:
+    -----
+    header : ``str``
+        The value of the profiling header of the request, or None.
+
+    Returns:
+    --------
+    ``bool``
+        True if the profiling is enabled and either the header matches the "PROFILING_TOKEN" environment variable
+        or the request is drawn in the "PROFILING_SAMPLE_RATE" fraction.
+
+    Notes:
+    ------
+    1. An empty token disables the header, so a request can only be profiled on demand by someone who knows the token.
+
+    Example:
+    --------
+    >>> should_profile(request.headers.get("X-Profile"))
+    ... False
+
+    Author: ``@ChinaiArman``
+    """
+    if not ENABLED:
+        return False
+    if TOKEN and header is not None and hmac.compare_digest(header, TOKEN):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def init_app(
+    app
+) -> None:
+    """
+    Profiles the requests of a Flask app selected by the admin header or by sampling.
+
+    Args:
+    -----
+    app : ``Flask``
+        The Flask app.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. Nothing is registered if the profiling is disabled, so the requests are not slowed down.
+    2. A request selected while another one is being profiled is served without profiling.
+    3. The name of the pstats dump is returned in the "X-Profile-Dump" response header.
+    4. The profile ends before the response is sent, so the body of a streamed (NDJSON) response is not included.
+
+    Example:
+    --------
+    >>> init_app(app)
+
+    Author: ``@ChinaiArman``
+    """
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def start_profile():
+        if should_profile(request.headers.get(HEADER)) and _lock.acquire(blocking=False):
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            g.profile = Profile(f"{request.method}-{route}")
+            g.profile.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            try:
+                response.headers["X-Profile-Dump"] = os.path.basename(profile.stop())
+            finally:
+                _lock.release()
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exception):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            try:
+                profile.stop()
+            finally:
+                _lock.release()
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the profiling module.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function profiles a small computation with tracemalloc, writes the dumps to a temporary directory and lists them.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the summary of the dump and the list of dumps.
+
+    Author: ``@ChinaiArman``
+    """
+    import tempfile
+    directory = tempfile.mkdtemp()
+    profile = Profile("demo", memory=True)
+    profile.start()
+    rows = [{"id": str(i), "keywords": ["black", "shirt"] * 10} for i in range(20000)]
+    sorted(rows, key=lambda row: row["id"])
+    path = profile.stop(directory)
+    with open(path[:-len(".prof")] + ".txt") as file:
+        print("\n".join(file.read().splitlines()[:15]))
+    print(list_dumps(directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Author: ``@ChinaiArman``
+Version: ``1.0.0``
+
+Description:
+A bounded LRU cache of search results, keyed by the normalized request and validated against the catalog version.
+Any change to the catalog bumps the version, which invalidates every cached result at once without scanning the cache.
+
+Requirements:
+This module has no third party requirements.
+
+Usage:
+To use this class, create a ResultCache and wrap the search calls with the get_or_compute method.
+To execute this module from the root directory, run the following command:
+    ``python server/result_cache.py``
+"""
+
+from collections import OrderedDict
+import json
+import threading
+import time
+
+
+class ResultCache:
+    """
+    Class to cache search results with LRU eviction, catalog versioning and optional stale-while-revalidate.
+
+    Args:
+    -----
+    max_entries : ``int``
+        The maximum number of cached results. 0 disables the cache.
+    max_bytes : ``int``
+        The maximum total size of the cached results, measured as their JSON encoding (or their length for bytes).
+    stale_seconds : ``float``
+        How long after it was computed an outdated result may still be served while it is recomputed. 0 disables it.
+
+    Attributes:
+    -----------
+    entries : ``OrderedDict``
+        The cached results, from least to most recently used, mapping each key to (version, created, size, value).
+    hits : ``int``
+        The number of requests served from an up to date result.
+    stale_hits : ``int``
+        The number of requests served from an outdated result while it was recomputed.
+    misses : ``int``
+        The number of requests that computed their result.
+    evictions : ``int``
+        The number of results evicted to respect the bounds.
+
+    Methods:
+    --------
+    >>> get_or_compute(key, version, compute)
+    ... # Returns the cached result of the key, or computes and caches it.
+    >>> stats()
+    ... # Returns the hit rate and the size of the cache.
+    >>> clear()
+    ... # Removes every cached result.
+
+    Notes:
+    ------
+    1. A cached result is only valid for the catalog version it was computed at, so bumping the version is an O(1) invalidation.
+    2. Outdated results are not removed eagerly, they are recomputed on their next use or evicted as least recently used.
+    3. Results larger than `max_bytes` are returned but never cached.
+    4. The cache is safe to use from several threads, the results are computed outside of the lock.
+
+    Author: ``@ChinaiArman``
+    """
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 2 ** 20,
+        stale_seconds: float = 0
+    ) -> None:
+        """
+        Initializes the ResultCache class.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def _store(
+        self,
+        key: tuple,
+        version: int,
+        value: object
+    ) -> None:
+        """
+        Caches a result and evicts the least recently used results until the cache fits its bounds.
+        """
+        size = len(value) if isinstance(value, bytes) else len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[2]
+            self.entries[key] = (version, time.monotonic(), size, value)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.size -= self.entries.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def _refresh(
+        self,
+        key: tuple,
+        version: int,
+        compute: callable
+    ) -> None:
+        """
+        Recomputes an outdated result in the background.
+        """
+        try:
+            self._store(key, version, compute())
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def get_or_compute(
+        self,
+        key: tuple,
+        version: int,
+        compute: callable
+    ) -> object:
+        """
+        Returns the cached result of the key, or computes and caches it.
+
+        Args:
+        -----
+        key : ``tuple``
+            The normalized request.
+        version : ``int``
+            The current catalog version.
+        compute : ``callable``
+            The function computing the result, called without arguments.
+
+        Returns:
+        --------
+        ``object``
+            The result of the request.
+
+        Notes:
+        ------
+        1. An outdated result younger than `stale_seconds` is returned immediately and recomputed by a background thread.
+
+        Example:
+        --------
+        >>> cache.get_or_compute(("keyword_search", ("shirt",), 5), 0, lambda: search(["shirt"], 5))
+
+        Author: ``@ChinaiArman``
+        """
+        if self.max_entries <= 0:
+            return compute()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            if entry is not None and time.monotonic() - entry[1] <= self.stale_seconds:
+                self.entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self.refreshing:
+                    self.refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key, version, compute), daemon=True).start()
+                return entry[3]
+            self.misses += 1
+        value = compute()
+        self._store(key, version, value)
+        return value
+
+    def stats(
+        self
+    ) -> dict:
+        """
+        Returns the hit rate and the size of the cache.
+
+        Args:
+        -----
+        None.
+
+        Returns:
+        --------
+        ``dict``
+            The number of entries, bytes, hits, stale hits, misses, evictions and the hit rate.
+
+        Example:
+        --------
+        >>> cache.stats()["hit_rate"]
+        ... 0.75
+
+        Author: ``@ChinaiArman``
+        """
+        with self.lock:
+            requests = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.stale_hits) / requests if requests else 0.0,
+            }
+
+    def clear(
+        self
+    ) -> None:
+        """
+        Removes every cached result.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def main(
+) -> None:
+    """
+    Demonstrates the usage of the ResultCache class.
+
+    Args:
+    -----
+    None.
+
+    Returns:
+    --------
+    None.
+
+    Notes:
+    ------
+    1. The function caches a slow computation, bumps the version and prints the cache statistics.
+
+    Example:
+    --------
+    >>> main()
+    ... # Prints the cache statistics.
+
+    Author: ``@ChinaiArman``
+    """
+    cache = ResultCache(max_entries=2)
+    slow_search = lambda: time.sleep(0.1) or ["1", "2", "3"]
+    for version in (0, 0, 0, 1, 1):
+        start = time.perf_counter()
+        cache.get_or_compute(("keyword_search", ("shirt",), 3), version, slow_search)
+        print(f"version {version}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()